@@ -0,0 +1,33 @@
+import numpy as np
+from benchmarks.harness import benchmark
+from benchmarks.fixtures import synthetic_returns
+from src.models.student_t import StudentTStrategy
+
+N_SIMS = 20_000
+HORIZON = 252
+
+
+@benchmark(params={"n_workers": [1, 2, 4, 8]}, work=lambda p: N_SIMS * HORIZON, repeat=3)
+def bench_distributed_scaling(n_workers):
+    """Escalamiento de DistributedMonteCarlo.simulate_risk con el número de actores."""
+    import ray
+    from src.models.distributed import DistributedMonteCarlo
+
+    ray.init(num_cpus=n_workers, include_dashboard=False, ignore_reinit_error=True)
+    engine = DistributedMonteCarlo(StudentTStrategy(), n_workers=n_workers, seed=0)
+    engine.train(synthetic_returns(10))
+    prices = np.full(10, 100.0)
+    # El warmup crea el pool persistente: se mide el estado estable de la API
+    return lambda: engine.simulate_risk(prices, HORIZON, N_SIMS)
+
+
+@benchmark(params={"max_threads": [1, 2, 4, 8]}, work=lambda p: N_SIMS * HORIZON, repeat=3)
+def bench_thread_scaling(max_threads):
+    """Mismo job en el backend de threads del scheduler (referencia frente a Ray)."""
+    from src.models.monte_carlo import MonteCarloEngine
+
+    strategy = StudentTStrategy()
+    strategy.train(synthetic_returns(10))
+    engine = MonteCarloEngine(strategy, seed=0, n_threads=max_threads)
+    prices = np.full(10, 100.0)
+    return lambda: engine.simulate_risk(prices, HORIZON, N_SIMS)
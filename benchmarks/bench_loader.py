@@ -0,0 +1,35 @@
+import os
+import shutil
+import pandas as pd
+from benchmarks.harness import benchmark
+from benchmarks.fixtures import FIXTURES_DIR, N_DAYS, synthetic_lake, synthetic_returns
+from src.data.loader import MarketDataLoader
+from src.data.returns_store import ReturnsStore
+
+
+@benchmark(params={"n_tickers": [10, 100, 1000]}, work=lambda p: p["n_tickers"] * N_DAYS)
+def bench_load_for_simulation(n_tickers):
+    """Lectura de la matriz consolidada (mmap) para un universo de n_tickers (parquet sintético)."""
+    data_dir, tickers, start, end = synthetic_lake(n_tickers)
+    loader = MarketDataLoader(tickers, start, end, data_dir=data_dir)
+    return loader.load_for_simulation
+
+
+@benchmark(params={"history_days": [N_DAYS, 10 * N_DAYS]}, work=lambda p: 1)
+def bench_returns_store_refresh(history_days):
+    """Refresco de un día de la matriz de retornos (100 tickers): no debe crecer con el historial."""
+    root = os.path.join(FIXTURES_DIR, f"returns_refresh_{history_days}")
+    shutil.rmtree(root, ignore_errors=True)
+    store = ReturnsStore(root)
+    tickers = [f"T{i:04d}" for i in range(100)]
+    index = pd.bdate_range("1990-01-01", periods=history_days + 100)
+    returns = synthetic_returns(len(tickers), len(index)).set_axis(index)
+    store.update({ticker: pd.DataFrame({"price": 1.0, "log_return": returns[ticker]}).iloc[:history_days]
+                  for ticker in tickers})
+    days = iter(range(history_days, len(index)))
+
+    def refresh():
+        day = next(days)
+        store.update({ticker: pd.DataFrame({"price": 1.0, "log_return": returns[ticker]}).iloc[day:day + 1]
+                      for ticker in tickers})
+    return refresh
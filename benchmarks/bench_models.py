@@ -0,0 +1,76 @@
+import numpy as np
+from benchmarks.harness import benchmark
+from benchmarks.fixtures import synthetic_returns
+from src.models.gbm import GeometricBrownianMotionStrategy
+from src.models.student_t import StudentTStrategy
+from src.models.monte_carlo import MonteCarloEngine
+
+STRATEGIES = {"gbm": GeometricBrownianMotionStrategy, "student_t": StudentTStrategy}
+
+
+def _trained(model: str, n_assets: int):
+    strategy = STRATEGIES[model]()
+    strategy.train(synthetic_returns(n_assets))
+    return strategy, np.full(n_assets, 100.0)
+
+
+@benchmark(params={"model": ["gbm", "student_t"], "n_assets": [10, 100, 300]},
+           work=lambda p: p["n_assets"])
+def bench_train(model, n_assets):
+    """Calibración completa (covarianza, Cholesky y, en t-Student, nu por activo)."""
+    returns = synthetic_returns(n_assets)
+    return lambda: STRATEGIES[model]().train(returns)
+
+
+@benchmark(params={"model": ["gbm", "student_t"], "n_sims": [1000, 5000], "horizon": [21, 252],
+                   "n_assets": [4, 20]},
+           work=lambda p: p["n_sims"] * p["horizon"])
+def bench_simulate(model, n_sims, horizon, n_assets):
+    """Tensor completo de trayectorias (kernel fusionado de la estrategia)."""
+    strategy, prices = _trained(model, n_assets)
+    rng = np.random.default_rng(0)
+    return lambda: strategy.simulate(prices, horizon, n_sims, rng=rng)
+
+
+@benchmark(params={"model": ["student_t"], "n_sims": [10_000, 50_000], "n_assets": [4, 20]},
+           work=lambda p: p["n_sims"] * 252, repeat=3)
+def bench_simulate_pnl(model, n_sims, n_assets):
+    """Ruta de la API: modo streaming reducido a PnL terminal (un thread)."""
+    strategy, prices = _trained(model, n_assets)
+    engine = MonteCarloEngine(strategy, seed=0)
+    return lambda: engine.simulate_pnl(prices, horizon=252, n_sims=n_sims)
+
+
+@benchmark(params={"covariance": ["sample", "factor"], "n_assets": [500, 2000]},
+           work=lambda p: 1024 * 21 * p["n_assets"], repeat=3)
+def bench_large_universe(covariance, n_assets):
+    """Bloque streaming de 21 días x 1024 sims: Cholesky denso O(n²) vs factores O(n * k)."""
+    strategy = GeometricBrownianMotionStrategy(covariance=covariance, n_factors=20)
+    strategy.train(synthetic_returns(n_assets))
+    prices = np.full(n_assets, 100.0)
+    rng = np.random.default_rng(0)
+    return lambda: strategy.simulate_streaming(prices, horizon=21, n_sims=1024, rng=rng)
+
+
+@benchmark(params={"horizons": ["1,10,21", "1,10,21,252"], "n_sims": [10_000]},
+           work=lambda p: p["n_sims"] * max(int(h) for h in p["horizons"].split(",")), repeat=3)
+def bench_simulate_horizons(horizons, n_sims):
+    """Grilla multi-horizonte en una pasada: el costo lo fija el horizonte máximo, no la cantidad."""
+    strategy, prices = _trained("student_t", 4)
+    engine = MonteCarloEngine(strategy, seed=0)
+    horizons = [int(h) for h in horizons.split(",")]
+    return lambda: engine.simulate_horizons(prices, horizons, n_sims=n_sims)
+
+
+@benchmark(params={"n_assets": [300, 1000]}, work=lambda p: p["n_assets"] ** 2, repeat=3)
+def bench_update(n_assets):
+    """
+    Recalibración incremental de un día (update + downdate rank-one, O(n²)).
+    Con pocos activos el loop de rotaciones no le gana a BLAS/LAPACK; la diferencia
+    aparece con universos grandes (comparar con bench_train / bench_large_universe).
+    """
+    returns = synthetic_returns(n_assets)
+    strategy = GeometricBrownianMotionStrategy()
+    strategy.train(returns.iloc[:-1])
+    new_day = returns.iloc[-1:].to_numpy()
+    return lambda: strategy.update(new_day)
@@ -0,0 +1,11 @@
+import numpy as np
+from benchmarks.harness import benchmark
+from src.utils.reporter import RiskReporter
+
+
+@benchmark(params={"n_scenarios": [10_000, 100_000, 1_000_000]}, work=lambda p: p["n_scenarios"])
+def bench_calculate_metrics(n_scenarios):
+    """VaR / CVaR 95% y 99% sobre un vector de escenarios de PnL."""
+    pnl = np.random.default_rng(0).standard_t(4, size=n_scenarios) * 0.02
+    reporter = RiskReporter(output_dir="output")
+    return lambda: reporter.calculate_metrics(pnl)
@@ -0,0 +1,59 @@
+import os
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+# Fixtures reutilizables entre corridas (generarlas no forma parte de la medición)
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), ".fixtures")
+
+N_DAYS = 504  # ~2 años bursátiles, como el pipeline de la API
+
+
+def synthetic_returns(n_assets: int, n_days: int = N_DAYS, seed: int = 0) -> pd.DataFrame:
+    """Log-retornos t(5) correlacionados por un factor de mercado común."""
+    rng = np.random.default_rng(seed)
+    market = rng.standard_t(5, size=(n_days, 1)) * 0.008
+    idio = rng.standard_t(5, size=(n_days, n_assets)) * 0.012
+    return pd.DataFrame(market + idio, columns=[f"T{i:04d}" for i in range(n_assets)])
+
+
+def synthetic_market(n_tickers: int, n_days: int = N_DAYS, seed: int = 0) -> str:
+    """
+    Directorio con {ticker}.parquet en formato yf.download (Close / Volume, índice Date),
+    listo para LocalFileDataSource. Se genera una sola vez por tamaño.
+    """
+    root = os.path.join(FIXTURES_DIR, f"market_{n_tickers}")
+    marker = os.path.join(root, "_complete")
+    if os.path.exists(marker):
+        return root
+
+    os.makedirs(root, exist_ok=True)
+    index = pd.bdate_range("2023-01-02", periods=n_days, name="Date")
+    prices = 100 * np.exp(np.cumsum(synthetic_returns(n_tickers, n_days, seed).values, axis=0))
+    for i in range(n_tickers):
+        pd.DataFrame({"Close": prices[:, i], "Volume": 1000}, index=index).to_parquet(
+            os.path.join(root, f"T{i:04d}.parquet"))
+    open(marker, "w").close()
+    return root
+
+
+def synthetic_lake(n_tickers: int, n_days: int = N_DAYS):
+    """
+    Data lake (Bronce -> Plata -> matriz consolidada) construido desde synthetic_market().
+    Retorna (data_dir, tickers, start, end) para instanciar MarketDataLoader.
+    """
+    # Import diferido: el harness no necesita src/ para listar casos
+    from src.data.loader import MarketDataLoader
+    from src.data.sources import LocalFileDataSource
+
+    tickers = [f"T{i:04d}" for i in range(n_tickers)]
+    start, end = datetime(2023, 1, 2), datetime(2025, 1, 1)
+    data_dir = os.path.join(FIXTURES_DIR, f"lake_{n_tickers}")
+    marker = os.path.join(data_dir, "_complete")
+    if not os.path.exists(marker):
+        loader = MarketDataLoader(tickers, start, end, data_dir=data_dir,
+                                  source=LocalFileDataSource(synthetic_market(n_tickers, n_days)))
+        loader.ingest_data()
+        loader.transform_to_silver()
+        open(marker, "w").close()
+    return data_dir, tickers, start, end
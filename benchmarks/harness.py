@@ -0,0 +1,183 @@
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from datetime import datetime
+import numpy as np
+
+# Registro global de benchmarks (lo llenan los módulos bench_*.py al importarse)
+BENCHMARKS = []
+
+# Historial de corridas para detectar regresiones entre noches
+DEFAULT_HISTORY = os.path.join(os.path.dirname(__file__), "results", "history.json")
+
+# Un caso es regresión si su latencia p50 crece más que esta fracción respecto a la base
+DEFAULT_TOLERANCE = 0.10
+
+
+def benchmark(params: dict = None, work=None, repeat: int = 5, warmup: int = 1):
+    """
+    Registra un benchmark estilo asv: la función recibe un punto de la grilla de
+    parámetros, hace su setup (no medido) y retorna el callable a medir.
+
+    Args:
+        params: Grilla {nombre: [valores]}; se mide el producto cartesiano.
+        work: f(params) -> unidades de trabajo por llamada (ej. paths * días) para el throughput.
+        repeat: Mediciones por caso (percentiles de latencia).
+        warmup: Llamadas previas descartadas (caches, JIT, pools).
+    """
+    def register(fn):
+        BENCHMARKS.append({"name": f"{fn.__module__.split('.')[-1]}.{fn.__name__}", "fn": fn,
+                           "params": params or {}, "work": work, "repeat": repeat, "warmup": warmup})
+        return fn
+    return register
+
+
+def expand_cases(quick: bool = False):
+    """Casos (id, benchmark, params). quick=True toma solo el primer valor de cada parámetro."""
+    cases = []
+    for bench in BENCHMARKS:
+        names = list(bench["params"])
+        grids = [bench["params"][name][:1] if quick else bench["params"][name] for name in names]
+        for values in itertools.product(*grids):
+            params = dict(zip(names, values))
+            suffix = ",".join(f"{k}={v}" for k, v in params.items())
+            cases.append((f"{bench['name']}[{suffix}]" if suffix else bench["name"], bench, params))
+    return cases
+
+
+def _current_rss() -> int:
+    """RSS actual en bytes (Linux: /proc/self/statm), 0 si no está disponible."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def _peak_rss() -> int:
+    """Pico de RSS del proceso en bytes (ru_maxrss: KiB en Linux, bytes en macOS)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def summarize(latencies, work: float = None) -> dict:
+    """Percentiles de latencia (segundos) y throughput (unidades de trabajo / s al p50)."""
+    latencies = np.asarray(latencies, dtype=float)
+    p50, p90, p99 = np.percentile(latencies, [50, 90, 99])
+    stats = {"p50": float(p50), "p90": float(p90), "p99": float(p99),
+             "mean": float(latencies.mean()), "min": float(latencies.min()), "runs": int(len(latencies))}
+    if work:
+        stats["work"] = float(work)
+        stats["throughput"] = float(work / p50) if p50 > 0 else None
+    return stats
+
+
+def measure(bench: dict, params: dict, quick: bool = False) -> dict:
+    """Ejecuta un caso en el proceso actual: setup, warmup y repeticiones medidas."""
+    baseline_rss = _current_rss()
+    run = bench["fn"](**params)
+    for _ in range(bench["warmup"]):
+        run()
+
+    latencies = []
+    for _ in range(min(bench["repeat"], 3) if quick else bench["repeat"]):
+        start = time.perf_counter()
+        run()
+        latencies.append(time.perf_counter() - start)
+
+    work = bench["work"](params) if bench["work"] else None
+    stats = summarize(latencies, work)
+    peak = _peak_rss()
+    stats["peak_rss_mb"] = round(peak / 2 ** 20, 1)
+    stats["peak_rss_delta_mb"] = round(max(0, peak - baseline_rss) / 2 ** 20, 1)
+    return stats
+
+
+def _child(conn, bench_index: int, params: dict, quick: bool):
+    try:
+        conn.send(("ok", measure(BENCHMARKS[bench_index], params, quick)))
+    except Exception as e:
+        conn.send(("error", f"{type(e).__name__}: {str(e)}"))
+    finally:
+        conn.close()
+
+
+def measure_isolated(bench: dict, params: dict, quick: bool = False) -> dict:
+    """
+    Mide el caso en un proceso hijo (fork): el pico de RSS es del caso, no de
+    todos los anteriores. Sin fork (Windows / macOS spawn) se mide en proceso.
+    """
+    if "fork" not in multiprocessing.get_all_start_methods():
+        return measure(bench, params, quick)
+
+    ctx = multiprocessing.get_context("fork")
+    parent, child = ctx.Pipe(duplex=False)
+    process = ctx.Process(target=_child, args=(child, BENCHMARKS.index(bench), params, quick))
+    process.start()
+    child.close()
+    status, payload = parent.recv()
+    process.join()
+    if status != "ok":
+        raise RuntimeError(payload)
+    return payload
+
+
+def machine_info() -> dict:
+    """Identifica la máquina: solo se comparan corridas del mismo host / cores."""
+    return {"host": platform.node(), "cpus": os.cpu_count(), "python": platform.python_version(),
+            "numpy": np.__version__, "machine": platform.machine()}
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(__file__), timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def load_history(path: str = DEFAULT_HISTORY) -> list:
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return json.load(f)
+
+
+def append_history(record: dict, path: str = DEFAULT_HISTORY):
+    """Agrega una corrida al historial (escritura atómica: tmp + os.replace)."""
+    history = load_history(path)
+    history.append(record)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(history, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def compare(record: dict, history: list, tolerance: float = DEFAULT_TOLERANCE) -> list:
+    """
+    Compara cada caso con su última medición previa en la misma máquina (host y cores):
+    [(case_id, commit_base, p50_base, p50_actual, ratio, es_regresión)].
+    """
+    same_machine = [previous for previous in history
+                    if all(previous["machine"].get(k) == record["machine"].get(k) for k in ("host", "cpus"))]
+    rows = []
+    for case_id, stats in record["results"].items():
+        previous = next((run for run in reversed(same_machine) if run["results"].get(case_id, {}).get("p50")), None)
+        if previous is None:
+            continue
+        before = previous["results"][case_id]["p50"]
+        ratio = stats["p50"] / before
+        rows.append((case_id, previous["commit"], before, stats["p50"], ratio, ratio > 1 + tolerance))
+    return rows
+
+
+def new_record(results: dict) -> dict:
+    return {"timestamp": datetime.now().isoformat(timespec="seconds"), "commit": git_commit(),
+            "machine": machine_info(), "results": results}
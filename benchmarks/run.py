@@ -0,0 +1,88 @@
+"""
+Runner de la suite de benchmarks (no la recolecta pytest: los archivos son bench_*.py).
+
+Uso:
+    python -m benchmarks.run                      # suite completa, guarda en el historial
+    python -m benchmarks.run -k simulate --quick  # filtro por nombre, un punto por grilla
+    python -m benchmarks.run --fail-on-regression # nightly: exit 1 si algo empeoró
+"""
+import argparse
+import fnmatch
+import glob
+import importlib
+import os
+import sys
+
+from benchmarks import harness
+
+
+def discover(pattern: str = "bench_*.py"):
+    """Importa los módulos bench_*.py del directorio (cada uno registra sus benchmarks)."""
+    for path in sorted(glob.glob(os.path.join(os.path.dirname(__file__), pattern))):
+        importlib.import_module(f"benchmarks.{os.path.splitext(os.path.basename(path))[0]}")
+
+
+def _format(stats: dict) -> str:
+    line = (f"p50 {stats['p50'] * 1e3:9.2f} ms | p90 {stats['p90'] * 1e3:9.2f} ms | "
+            f"p99 {stats['p99'] * 1e3:9.2f} ms | RSS pico {stats['peak_rss_mb']:8.1f} MB")
+    if stats.get("throughput"):
+        line += f" | {stats['throughput']:.3e} u/s"
+    return line
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks de CL-RiskEngine")
+    parser.add_argument("-k", "--filter", default="*", help="Patrón (fnmatch) sobre el id del caso")
+    parser.add_argument("--quick", action="store_true", help="Solo el primer valor de cada parámetro")
+    parser.add_argument("--history", default=harness.DEFAULT_HISTORY, help="Archivo JSON de historial")
+    parser.add_argument("--no-save", action="store_true", help="No agregar la corrida al historial")
+    parser.add_argument("--tolerance", type=float, default=harness.DEFAULT_TOLERANCE,
+                        help="Aumento relativo de p50 considerado regresión")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Exit code 1 si hay regresiones")
+    parser.add_argument("--in-process", action="store_true", help="No aislar cada caso en un proceso hijo")
+    args = parser.parse_args(argv)
+
+    discover()
+    pattern = args.filter if any(c in args.filter for c in "*?[") else f"*{args.filter}*"
+    cases = [case for case in harness.expand_cases(args.quick) if fnmatch.fnmatch(case[0], pattern)]
+    print(f"⏱️ [Bench] {len(cases)} casos")
+
+    results, failures = {}, []
+    for case_id, bench, params in cases:
+        try:
+            measure = harness.measure if args.in_process else harness.measure_isolated
+            results[case_id] = measure(bench, params, quick=args.quick)
+            print(f"  {case_id:<76} {_format(results[case_id])}")
+        except Exception as e:
+            failures.append(case_id)
+            print(f"❌ {case_id}: {str(e)}")
+
+    record = harness.new_record(results)
+    history = harness.load_history(args.history)
+
+    regressions = []
+    rows = harness.compare(record, history, args.tolerance)
+    if rows:
+        print("\n📊 Comparación contra la última medición de cada caso en esta máquina:")
+        for case_id, commit, before, after, ratio, regressed in rows:
+            flag = "🔴" if regressed else "🟢"
+            print(f"  {flag} {case_id:<76} {before * 1e3:9.2f} -> {after * 1e3:9.2f} ms "
+                  f"(x{ratio:.2f} vs {commit})")
+            if regressed:
+                regressions.append(case_id)
+
+    if not args.no_save:
+        harness.append_history(record, args.history)
+        print(f"💾 Historial actualizado: {args.history}")
+
+    if failures:
+        print(f"❌ {len(failures)} casos fallaron")
+        return 1
+    if regressions and args.fail_on_regression:
+        print(f"🔴 {len(regressions)} regresiones sobre la tolerancia de {args.tolerance:.0%}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
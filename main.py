@@ -1,7 +1,6 @@
 # Entry Point
 import sys
 import os
-import multiprocessing
 from datetime import datetime, timedelta
 
 sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
@@ -9,14 +8,18 @@ sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 # IMPORTS ACTUALIZADOS
 from src.config.settings import settings  # Singleton
 from src.data.loader import MarketDataLoader
-from src.models.distributed import DistributedMonteCarlo
+from src.models.scheduler import AdaptiveMonteCarlo
 from src.utils.reporter import RiskReporter
 from src.models.student_t import StudentTStrategy
 from src.models.gbm import GeometricBrownianMotionStrategy # Nuevo Modelo
+from src.models.sampling import make_sampler
+from src.models.calibration_cache import CalibrationCache
+from src.utils.instrumentation import recording
 
 def main():
     print("🚀 Iniciando CL-RiskEngine v4.0 (Enterprise Compliance)...")
     print("=" * 40)
+    settings.ensure_directories()
 
     # 1. FECHAS (Desde Settings)
     end_date = datetime.now()
@@ -38,27 +41,41 @@ def main():
     
     print("\n[PASO 2] Selección de Modelo")
     # strategy = GeometricBrownianMotionStrategy() # Descomentar para probar GBM
-    strategy = StudentTStrategy()
+    strategy = StudentTStrategy(sampler=make_sampler(settings.SAMPLING), cache=CalibrationCache(),
+                                covariance=settings.COVARIANCE, n_factors=settings.N_FACTORS,
+                                shrinkage=settings.COVARIANCE_SHRINKAGE,
+                                halflife=settings.CALIBRATION_HALFLIFE)
     model_name = strategy.__class__.__name__
     print(f"🧠 Estrategia Activa: {model_name}")
 
-    # 4. SIMULACIÓN DISTRIBUIDA
-    n_cores = multiprocessing.cpu_count()
-    engine = DistributedMonteCarlo(strategy, n_workers=n_cores)
+    # 4. SIMULACIÓN (el scheduler elige local / threads / Ray según el tamaño del job)
+    engine = AdaptiveMonteCarlo(strategy, seed=settings.SEED)
     
     engine.train(log_returns)
-    simulated_paths = engine.simulate(
-        last_prices.values, 
-        horizon=settings.HORIZON, 
-        total_sims=settings.N_SIMS
-    )
+    reporter = RiskReporter(output_dir=settings.OUTPUT_DIR, gold_dir=os.path.join(settings.DATA_DIR, "gold"))
+    horizons = sorted(set(settings.RISK_HORIZONS) | {settings.HORIZON})
+    horizon_metrics = None
+    if len(horizons) > 1:
+        # Multi-horizonte: una sola pasada evaluada en cada checkpoint (grilla horizonte x confianza)
+        pnl_matrix = engine.simulate_horizons(last_prices.values, horizons, n_sims=settings.N_SIMS)
+        horizon_metrics = reporter.calculate_horizon_metrics(pnl_matrix, horizons, settings.CONFIDENCE_LEVEL,
+                                                             weights=engine.weights)
+        metrics = horizon_metrics[settings.HORIZON]
+    else:
+        # Con Ray, cada worker reduce su chunk a su cola de PnL: solo estadísticos parciales cruzan al Driver
+        confidences = (settings.CONFIDENCE_LEVEL, 0.99)
+        if settings.SAMPLING == "importance":
+            confidences += (0.999,)
+        metrics = engine.simulate_risk(
+            last_prices.values, 
+            horizon=settings.HORIZON, 
+            n_sims=settings.N_SIMS,
+            confidences=confidences
+        )
+    engine.shutdown()
     
     # 5. REPORTING (Capa Oro)
     print("\n[PASO 3] Reporting & Gold Layer")
-    reporter = RiskReporter(output_dir=settings.OUTPUT_DIR, gold_dir=os.path.join(settings.DATA_DIR, "gold"))
-    
-    pnl_scenarios = reporter.compute_pnl(simulated_paths)
-    metrics = reporter.calculate_metrics(pnl_scenarios, confidence=settings.CONFIDENCE_LEVEL)
     
     params = {
         'tickers': settings.TICKERS,
@@ -67,9 +84,13 @@ def main():
         'model_name': model_name
     }
     
-    reporter.generate_report(metrics, params)
+    reporter.generate_report(metrics, params, horizon_metrics=horizon_metrics)
 
     print("\n✅ PROCESO COMPLETADO EXITOSAMENTE")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    # Tiempo y memoria por etapa: ¿la latencia es descarga de datos o Monte Carlo?
+    with recording() as recorder:
+        main()
+    print("\n⏱️ Tiempos por etapa:")
+    print(recorder.format())
\ No newline at end of file
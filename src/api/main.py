@@ -1,6 +1,23 @@
-from fastapi import FastAPI
+import threading
+import time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from src.api.routers import simulation
+from src.config.settings import settings
+from src.utils.instrumentation import METRIC_PREFIX, REGISTRY
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Calentamiento en segundo plano: /health responde sin esperar imports ni calibraciones
+    if settings.API_WARMUP:
+        threading.Thread(target=simulation.warm_up, name="api-warmup", daemon=True).start()
+    yield
+    # Apagado ordenado del pool de cálculo (cancela jobs en cola)
+    simulation.job_manager.shutdown(wait=False)
+
 
 # Metadatos para la documentación automática (Swagger UI)
 app = FastAPI(
@@ -11,6 +28,7 @@ app = FastAPI(
         "name": "Equipo de Ingeniería Financiera",
         "email": "engineering@cl-risk.com",
     },
+    lifespan=lifespan,
 )
 
 app.include_router(simulation.router, prefix="/v1/risk", tags=["Risk Engine"])
@@ -24,6 +42,25 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Latencia y conteo por endpoint (ruta plantilla, no la URL concreta: cardinalidad acotada)."""
+    start = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    endpoint = getattr(route, "path", "unmatched")
+    REGISTRY.observe(f"{METRIC_PREFIX}_http_request_seconds", "Latencia de los requests HTTP",
+                     time.perf_counter() - start, method=request.method, endpoint=endpoint)
+    REGISTRY.inc(f"{METRIC_PREFIX}_http_requests_total", "Requests HTTP por endpoint y código",
+                 method=request.method, endpoint=endpoint, code=str(response.status_code))
+    return response
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics():
+    """Métricas en formato Prometheus (etapas del pipeline, jobs, caché y HTTP)."""
+    REGISTRY.set(f"{METRIC_PREFIX}_jobs_active", "Jobs en cola o en ejecución", simulation.job_manager.active_count())
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/")
 async def root():
     """Endpoint raíz para verificar que la API respira."""
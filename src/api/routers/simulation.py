@@ -1,78 +1,153 @@
+import asyncio
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
 from fastapi import APIRouter, HTTPException
-from datetime import datetime, timedelta
-import numpy as np
 
 # Importamos tus esquemas (Contratos de datos)
-from src.api.schemas.risk import RiskRequest, RiskResponse
+from src.api.schemas.risk import (RiskRequest, RiskResponse, BatchRiskRequest, BatchRiskResponse,
+                                  JobAccepted, JobStatusResponse)
 
 # Importamos EL NÚCLEO (Tu lógica de negocio existente)
-from src.data.loader import MarketDataLoader
-from src.models.monte_carlo import MonteCarloEngine
-from src.utils.reporter import RiskReporter
+# (módulo liviano: los imports de cálculo se difieren al proceso del pool)
+from src.api.services.risk import (NoMarketDataError, preload_hot_universes, run_batch_pipeline,
+                                   run_risk_pipeline)
+from src.api.services.jobs import JobManager, JobQueueFull
+from src.api.services.result_cache import ResultCache
+from src.utils.instrumentation import METRIC_PREFIX, REGISTRY, observe_stages
 
 router = APIRouter()
 
-@router.post("/simulate", response_model=RiskResponse)
-def run_simulation(payload: RiskRequest):
+# Pool de procesos acotado compartido por todos los endpoints (se crea al primer job o en warm_up).
+# Cada proceso nace cargando el núcleo de cálculo y las calibraciones del universo caliente.
+job_manager = JobManager(run_risk_pipeline, initializer=preload_hot_universes)
+
+# Resultados recientes por (request normalizado, versión de Plata, fecha)
+result_cache = ResultCache()
+
+
+def warm_up():
     """
-    Endpoint principal: Recibe un portafolio y devuelve métricas de riesgo.
+    Hook de arranque (lifespan, en segundo plano): ingesta y calibración del universo
+    caliente una sola vez en el servidor (Plata + caché en disco) y luego el pool,
+    cuyos workers solo leen esos resultados y los dejan en su registro en memoria.
+    """
+    try:
+        preload_hot_universes(ingest=True)
+        job_manager.start()
+    except Exception as e:
+        print(f"⚠️ Warmup incompleto: {str(e)}")
+
+
+def _data_version():
+    """Versión de la Capa Plata (import diferido: el loader trae pandas)."""
+    from src.data.loader import MarketDataLoader
+    return MarketDataLoader.data_version()
+
+
+def _cache_key(request: dict, data_version) -> str:
+    return ResultCache.key(request, data_version, datetime.now().strftime('%Y-%m-%d'))
+
+
+def _on_job_done(keyed_request: dict, key: str, future):
+    """
+    Callback de job terminado: métricas del job (sus etapas se midieron en el
+    proceso del pool y llegan en la metadata) y caché de resultados exitosos.
+    """
+    status = "cancelled" if future.cancelled() else "failed" if future.exception() is not None else "completed"
+    REGISTRY.inc(f"{METRIC_PREFIX}_jobs_total", "Jobs terminados por pipeline y estado",
+                 pipeline=keyed_request["pipeline"], status=status)
+    if status != "completed":
+        return
+
+    result = future.result()
+    metadata = result["metadata"]
+    REGISTRY.observe(f"{METRIC_PREFIX}_job_seconds", "Duración de los jobs en el pool de cálculo",
+                     metadata.get("execution_time", 0.0), pipeline=keyed_request["pipeline"])
+    observe_stages(metadata.get("stages"))
+
+    result_cache.put(key, result)
+    # La ingesta del propio job puede avanzar la versión de Plata: se indexa también con la nueva
+    data_version = metadata.get("data_version")
+    if data_version is not None:
+        result_cache.put(_cache_key(keyed_request, data_version), result)
+
+
+def _submit(payload: RiskRequest, fn=None):
     """
+    Resuelve un request: caché de resultados -> job en curso idéntico (single-flight)
+    -> nuevo job en el pool con admission control.
+
+    Args:
+        fn: Pipeline a ejecutar (default: el del JobManager, run_risk_pipeline).
+    """
+    request = payload.model_dump()
+    keyed_request = {"pipeline": fn.__name__ if fn else "default", **request}
+    key = _cache_key(keyed_request, _data_version())
+    cached = result_cache.get(key)
+    if cached is not None:
+        REGISTRY.inc(f"{METRIC_PREFIX}_result_cache_hits_total", "Requests servidos desde la caché de resultados")
+        return job_manager.completed({**cached, "metadata": {**cached["metadata"], "cached": True}})
+
     try:
-        # 1. Configuración de Fechas (Dinámica)
-        end_date = datetime.now()
-        # Usamos 2 años de historia para entrenar, como en tu script original
-        start_date = end_date - timedelta(days=365 * 2) 
-
-        # 2. Ingesta de Datos (Reutilizando tu Loader)
-        print(f"📡 API Request: Descargando datos para {payload.tickers}")
-        loader = MarketDataLoader(payload.tickers, start_date, end_date)
-        loader.download_data()
-        log_returns = loader.calculate_returns()
-        last_prices = loader.get_last_prices()
-
-        if log_returns is None or log_returns.empty:
-            raise HTTPException(status_code=400, detail="No se pudieron descargar datos para los tickers proporcionados.")
-
-        # 3. Motor de Simulación (Reutilizando tu Engine)
-        print(f"🎲 API Request: Iniciando Monte Carlo ({payload.n_sims} sims)")
-        engine = MonteCarloEngine(payload.n_sims, payload.horizon)
-        engine.train(log_returns)
-        simulated_paths = engine.simulate(last_prices.values)
-
-        # 4. Cálculo de Métricas (Reutilizando tu Reporter)
-        # OJO: Instanciamos el reporter solo para usar sus fórmulas, no para escribir TXT
-        reporter = RiskReporter(output_dir="output") # El directorio no importa aquí
-        pnl_scenarios = reporter.compute_pnl(simulated_paths)
-        metrics = reporter.calculate_metrics(pnl_scenarios)
-
-        # 5. Formatear la Respuesta JSON (Adaptar al Schema)
-        response_metrics = {}
-        
-        # Mapeo manual para asegurar que coincida con lo que el frontend espera
-        metric_descriptions = {
-            "VaR 95%": "Pérdida máxima esperada con 95% de confianza",
-            "CVaR 95%": "Pérdida promedio en el peor 5% de los casos",
-            "VaR 99%": "Pérdida máxima esperada con 99% de confianza (Estrés)",
-            "CVaR 99%": "Pérdida promedio en el peor 1% de los casos (Colapso)"
-        }
-
-        for key, value in metrics.items():
-            if key in metric_descriptions:
-                response_metrics[key] = {
-                    "value": round(float(value), 4), # Redondear a 4 decimales
-                    "description": metric_descriptions[key]
-                }
-
-        return {
-            "status": "success",
-            "metadata": {
-                "start_date": start_date.strftime('%Y-%m-%d'),
-                "end_date": end_date.strftime('%Y-%m-%d'),
-                "execution_time": 0.0 # TODO: Medir tiempo real si se desea
-            },
-            "metrics": response_metrics
-        }
+        job = job_manager.submit(request, key=key, fn=fn)
+    except JobQueueFull as e:
+        raise HTTPException(status_code=429, detail=f"Motor saturado: {str(e)}",
+                            headers={"Retry-After": "5"})
+    except BrokenProcessPool:
+        raise HTTPException(status_code=503, detail="Pool de cálculo no disponible, reintente.",
+                            headers={"Retry-After": "1"})
+    job.future.add_done_callback(lambda future: _on_job_done(keyed_request, key, future))
+    return job
 
+
+async def _await_result(job):
+    try:
+        return await asyncio.wrap_future(job.future)
+    except NoMarketDataError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         print(f"❌ Error Interno: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Error en el motor de cálculo: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error en el motor de cálculo: {str(e)}")
+
+
+@router.post("/simulate", response_model=RiskResponse)
+async def run_simulation(payload: RiskRequest):
+    """
+    Endpoint principal: Recibe un portafolio y devuelve métricas de riesgo.
+    El cálculo corre en el pool de jobs; el handler solo espera el resultado (no bloquea el servidor).
+    """
+    return await _await_result(_submit(payload))
+
+
+@router.post("/simulate/batch", response_model=BatchRiskResponse)
+async def run_batch_simulation(payload: BatchRiskRequest):
+    """
+    Riesgo de N portafolios sobre el mismo universo de tickers.
+    Una sola simulación del universo; cada portafolio es una fila de posiciones.
+    """
+    return await _await_result(_submit(payload, fn=run_batch_pipeline))
+
+
+@router.post("/jobs", response_model=JobAccepted, status_code=202)
+async def submit_job(payload: RiskRequest):
+    """Encola una simulación y retorna inmediatamente su id para polling."""
+    job = _submit(payload)
+    return {"job_id": job.id, "status": job.status, "status_url": f"/v1/risk/jobs/{job.id}"}
+
+
+@router.get("/jobs/{job_id}", response_model=JobStatusResponse)
+async def get_job(job_id: str):
+    """Estado de un job: queued | running | completed (con resultado) | failed (con error)."""
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} no encontrado")
+
+    status = job.status
+    return {
+        "job_id": job.id,
+        "status": status,
+        "submitted_at": job.submitted_at,
+        "finished_at": job.finished_at,
+        "result": job.future.result() if status == "completed" else None,
+        "error": job.error,
+    }
@@ -1,5 +1,5 @@
-from pydantic import BaseModel, Field, field_validator
-from typing import List, Optional
+from pydantic import BaseModel, Field, field_validator, model_validator
+from typing import Dict, List, Literal, Optional, Union
 
 # --- INPUT MODEL (Lo que nos envían) ---
 class RiskRequest(BaseModel):
@@ -27,23 +27,107 @@ class RiskRequest(BaseModel):
         lt=1, 
         description="Nivel de confianza para el VaR (ej. 0.95 o 0.99)"
     )
+    seed: Optional[int] = Field(
+        None,
+        ge=0,
+        description="Semilla para resultados reproducibles (None = aleatoria)"
+    )
+    sampling: Literal["pseudo", "antithetic", "sobol", "importance"] = Field(
+        "pseudo",
+        description="Reducción de varianza: pseudo-aleatorio, antitéticas, Sobol (QMC) o importancia (colas)"
+    )
+
+    horizons: Optional[List[int]] = Field(
+        None,
+        min_length=1,
+        max_length=20,
+        description="Horizontes adicionales de evaluación en días (ej. [1, 10, 21]); "
+                    "se calculan en la misma simulación que 'horizon'",
+        json_schema_extra={"example": [1, 10, 21]}
+    )
 
     @field_validator('tickers')
     def validate_tickers(cls, v):
         # Convertir a mayúsculas para estandarizar
         return [t.upper() for t in v]
 
+    @field_validator('horizons')
+    def validate_horizons(cls, v):
+        if v is None:
+            return v
+        if any(h < 1 or h > 1260 for h in v):
+            raise ValueError("Cada horizonte debe estar entre 1 y 1260 días.")
+        return sorted(set(v))
+
+class BatchRiskRequest(RiskRequest):
+    portfolios: List[List[float]] = Field(
+        ...,
+        min_length=1,
+        max_length=1000,
+        description="Matriz de posiciones (unidades por ticker, mismo orden que 'tickers'); una fila por portafolio",
+        json_schema_extra={"example": [[1, 1, 1], [10, 0, 5]]}
+    )
+    portfolio_ids: Optional[List[str]] = Field(
+        None,
+        description="Identificadores de cada portafolio (default: índice de la fila)"
+    )
+
+    @model_validator(mode='after')
+    def validate_portfolios(self):
+        n_assets = len(self.tickers)
+        if any(len(row) != n_assets for row in self.portfolios):
+            raise ValueError(f"Cada portafolio debe tener {n_assets} posiciones (una por ticker).")
+        if self.portfolio_ids is not None and len(self.portfolio_ids) != len(self.portfolios):
+            raise ValueError("portfolio_ids debe tener un id por portafolio.")
+        if self.horizons is not None:
+            raise ValueError("El batch de portafolios evalúa un solo horizonte ('horizon').")
+        return self
+
 # --- OUTPUT MODEL (Lo que respondemos) ---
 class RiskMetric(BaseModel):
     value: float
     description: str
 
+class StageTiming(BaseModel):
+    seconds: float
+    peak_rss_mb: float
+    rss_delta_mb: float
+
 class SimulationMetadata(BaseModel):
     start_date: str
     end_date: str
     execution_time: float
+    data_version: Optional[str] = None
+    cached: bool = False
+    stages: Optional[Dict[str, StageTiming]] = None
 
 class RiskResponse(BaseModel):
     status: str
     metadata: SimulationMetadata
-    metrics: dict[str, RiskMetric]
\ No newline at end of file
+    metrics: dict[str, RiskMetric]
+    standard_errors: Optional[dict[str, float]] = None
+    # Grilla horizonte x confianza (solo si el request trae 'horizons'); claves = días
+    horizon_metrics: Optional[dict[str, dict[str, RiskMetric]]] = None
+
+class PortfolioRisk(BaseModel):
+    portfolio_id: str
+    metrics: dict[str, RiskMetric]
+
+class BatchRiskResponse(BaseModel):
+    status: str
+    metadata: SimulationMetadata
+    portfolios: List[PortfolioRisk]
+
+# --- JOBS (Ejecución asíncrona) ---
+class JobAccepted(BaseModel):
+    job_id: str
+    status: str
+    status_url: str
+
+class JobStatusResponse(BaseModel):
+    job_id: str
+    status: Literal["queued", "running", "completed", "failed"]
+    submitted_at: float
+    finished_at: Optional[float] = None
+    result: Optional[Union[RiskResponse, BatchRiskResponse]] = None
+    error: Optional[str] = None
@@ -0,0 +1,165 @@
+import multiprocessing
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from src.config.settings import settings
+
+
+def _noop():
+    """Job vacío (picklable) para forzar el arranque de los procesos del pool."""
+
+
+class JobQueueFull(RuntimeError):
+    """Admisión rechazada: hay demasiados jobs en cola o en ejecución (HTTP 429)."""
+
+
+class Job:
+    """Estado de un cálculo enviado al pool (envoltorio de un concurrent.futures.Future)."""
+
+    def __init__(self, job_id: str, future):
+        self.id = job_id
+        self.future = future
+        self.submitted_at = time.time()
+        self.finished_at = None
+        future.add_done_callback(self._on_done)
+
+    def _on_done(self, _future):
+        self.finished_at = time.time()
+
+    @property
+    def status(self) -> str:
+        if not self.future.done():
+            return "running" if self.future.running() else "queued"
+        return "failed" if self.future.exception() is not None else "completed"
+
+    @property
+    def error(self):
+        if not self.future.done() or self.future.exception() is None:
+            return None
+        exc = self.future.exception()
+        return f"{type(exc).__name__}: {str(exc)}"
+
+
+class JobManager:
+    """
+    Cola de cálculos acotada sobre un pool de procesos.
+    - Los handlers HTTP solo encolan: nunca bloquean un thread del servidor.
+    - Admission control: con max_pending jobs activos, submit() lanza JobQueueFull.
+    - Single-flight: submits con la misma clave mientras hay uno en curso
+      comparten el mismo Job (un solo cálculo para N requests idénticos).
+    - Los jobs terminados se conservan (LRU) hasta max_finished para su consulta.
+    El pool se crea al primer submit o con start() (importar la API no lanza procesos).
+    """
+
+    def __init__(self, fn, max_workers: int = None, max_pending: int = None, max_finished: int = None,
+                 initializer=None, initargs: tuple = ()):
+        """
+        Args:
+            fn: Función de módulo (picklable) que ejecuta un job.
+            max_workers: Procesos del pool (default: settings.API_MAX_WORKERS).
+            max_pending: Jobs en cola + en ejecución admitidos (default: settings.API_MAX_PENDING_JOBS).
+            max_finished: Jobs terminados retenidos para polling (default: settings.API_MAX_FINISHED_JOBS).
+            initializer: Función de módulo (picklable) ejecutada al nacer cada proceso del pool
+                         (ej. precarga de imports y calibraciones).
+            initargs: Argumentos del initializer.
+        """
+        self.fn = fn
+        self.initializer = initializer
+        self.initargs = tuple(initargs)
+        self.max_workers = max_workers or settings.API_MAX_WORKERS
+        self.max_pending = max_pending or settings.API_MAX_PENDING_JOBS
+        self.max_finished = max_finished or settings.API_MAX_FINISHED_JOBS
+        self._executor = None
+        self._jobs = OrderedDict()
+        self._inflight = {}
+        # RLock: los callbacks de futures ya resueltos corren en el thread que los registra
+        self._lock = threading.RLock()
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: el servidor tiene threads vivos, fork no es seguro
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                 mp_context=multiprocessing.get_context("spawn"),
+                                                 initializer=self.initializer, initargs=self.initargs)
+        return self._executor
+
+    def start(self):
+        """
+        Levanta el pool por adelantado (hook de arranque): con spawn cada submit sin
+        procesos libres lanza uno, así que un job vacío por worker los crea todos y
+        corren su initializer antes de recibir requests reales.
+        """
+        with self._lock:
+            pool = self._pool()
+            for _ in range(self.max_workers):
+                pool.submit(_noop)
+
+    def active_count(self) -> int:
+        with self._lock:
+            return sum(not job.future.done() for job in self._jobs.values())
+
+    def _evict(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.future.done()]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job_id]
+
+    def _register(self, future) -> Job:
+        job = Job(uuid.uuid4().hex, future)
+        self._jobs[job.id] = job
+        self._evict()
+        return job
+
+    def submit(self, *args, key: str = None, fn=None) -> Job:
+        """
+        Encola un job. Lanza JobQueueFull (backpressure) o BrokenProcessPool
+        (pool caído; se recrea en el siguiente submit).
+
+        Args:
+            key: Clave de coalescing opcional. Si ya hay un job activo con esa clave,
+                 se retorna ese job sin encolar otro cálculo.
+            fn: Función alternativa (picklable) para este job (default: self.fn).
+        """
+        with self._lock:
+            if key is not None and key in self._inflight:
+                return self._inflight[key]
+
+            active = sum(not job.future.done() for job in self._jobs.values())
+            if active >= self.max_pending:
+                raise JobQueueFull(f"{active} jobs activos (máximo {self.max_pending})")
+            try:
+                future = self._pool().submit(fn or self.fn, *args)
+            except BrokenProcessPool:
+                self._executor = None
+                raise
+            job = self._register(future)
+            if key is not None:
+                self._inflight[key] = job
+                future.add_done_callback(lambda _f: self._release(key, job))
+        return job
+
+    def _release(self, key: str, job: Job):
+        with self._lock:
+            if self._inflight.get(key) is job:
+                del self._inflight[key]
+
+    def completed(self, result) -> Job:
+        """Registra un job ya resuelto (ej. resultado servido desde caché) para polling uniforme."""
+        future = Future()
+        future.set_result(result)
+        with self._lock:
+            return self._register(future)
+
+    def get(self, job_id: str):
+        """Job por id, o None si no existe (o ya fue descartado)."""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        # Fuera del lock: los callbacks de los jobs pendientes también lo toman
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
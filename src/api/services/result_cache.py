@@ -0,0 +1,56 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from src.config.settings import settings
+
+
+class ResultCache:
+    """
+    Caché de resultados de simulación (TTL + LRU) para payloads repetidos.
+    Clave = request normalizado + versión de datos de Plata + fecha de cálculo:
+    nuevos datos de mercado invalidan automáticamente las entradas anteriores.
+    """
+
+    def __init__(self, ttl: float = None, max_entries: int = None):
+        """
+        Args:
+            ttl: Segundos de validez de un resultado (default: settings.API_RESULT_CACHE_TTL).
+            max_entries: Tamaño máximo del LRU (default: settings.API_RESULT_CACHE_SIZE).
+        """
+        self.ttl = settings.API_RESULT_CACHE_TTL if ttl is None else ttl
+        self.max_entries = max_entries or settings.API_RESULT_CACHE_SIZE
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(request: dict, data_version, as_of: str) -> str:
+        """Huella del request normalizado (model_dump() con defaults, claves ordenadas)."""
+        normalized = json.dumps({"request": request, "data_version": data_version, "as_of": as_of},
+                                sort_keys=True, default=str)
+        return hashlib.sha256(normalized.encode()).hexdigest()
+
+    def get(self, key: str):
+        """Resultado vigente o None (las entradas vencidas se descartan)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, result = entry
+            if time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return result
+
+    def put(self, key: str, result: dict):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
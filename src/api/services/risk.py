@@ -0,0 +1,280 @@
+import os
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from src.api.schemas.risk import BatchRiskRequest, RiskRequest
+from src.config.settings import settings
+from src.utils.instrumentation import StageRecorder, recording, stage
+
+# Los módulos de cálculo (loader, modelos, reporter: pandas + scipy) se importan al primer uso.
+# El proceso del servidor solo encola jobs: importar la API no debe pagar ese costo.
+
+# Registro de calibraciones compartido entre requests del proceso (LRU en memoria + disco).
+# Se crea al primer uso; los workers del pool lo precargan con el universo caliente.
+_calibration_cache = None
+
+
+# Engines calibrados del proceso por (universo, sampler): (engine, ventana, updates acumulados).
+# Cuando Plata suma días, la ventana nueva es la anterior desplazada: mu / Sigma se recalibran
+# con engine.update() solo sobre los días nuevos y nu se re-ajusta sobre la ventana desplazada
+# (ajustes por ticker en caché), igual que train(). Tras API_MAX_INCREMENTAL_UPDATES se
+# re-entrena desde cero: el redondeo de los rank-one no se acumula en procesos longevos.
+# Los procesos del JobManager ejecutan un job a la vez: no requiere lock.
+_live_engines = OrderedDict()
+
+
+def get_calibration_cache():
+    """Caché de calibraciones del proceso (singleton perezoso)."""
+    global _calibration_cache
+    if _calibration_cache is None:
+        from src.models.calibration_cache import CalibrationCache
+        _calibration_cache = CalibrationCache()
+    return _calibration_cache
+
+
+# Mapeo manual para asegurar que coincida con lo que el frontend espera
+METRIC_DESCRIPTIONS = {
+    "VaR 95%": "Pérdida máxima esperada con 95% de confianza",
+    "CVaR 95%": "Pérdida promedio en el peor 5% de los casos",
+    "VaR 99%": "Pérdida máxima esperada con 99% de confianza (Estrés)",
+    "CVaR 99%": "Pérdida promedio en el peor 1% de los casos (Colapso)",
+    "VaR 99.9%": "Pérdida máxima esperada con 99.9% de confianza (Estrés extremo)",
+    "CVaR 99.9%": "Pérdida promedio en el peor 0.1% de los casos",
+    "Mean PnL (CV)": "PnL esperado (estimador con variable de control GBM)"
+}
+
+
+class NoMarketDataError(ValueError):
+    """No hay datos de mercado para los tickers solicitados (error del cliente, HTTP 400)."""
+
+
+def _strategy(sampling: str = "pseudo"):
+    """
+    Estrategia de la API. Requests y precarga usan los mismos hiperparámetros
+    (misma clave en la caché de calibraciones).
+    """
+    from src.models.sampling import make_sampler
+    from src.models.student_t import StudentTStrategy
+    return StudentTStrategy(sampler=make_sampler(sampling), cache=get_calibration_cache(),
+                            covariance=settings.COVARIANCE, n_factors=settings.N_FACTORS,
+                            shrinkage=settings.COVARIANCE_SHRINKAGE,
+                            halflife=settings.CALIBRATION_HALFLIFE)
+
+
+def _market_data(tickers, ingest: bool = True):
+    """
+    Ingesta (Bronce -> Plata) y lectura de la ventana de entrenamiento.
+    Retorna: (loader, log_returns, last_prices, start_date, end_date)
+    """
+    from src.data.loader import MarketDataLoader
+
+    # 1. Configuración de Fechas (Dinámica)
+    end_date = datetime.now()
+    # Misma ventana de calibración que main.py (settings.YEARS_BACK)
+    start_date = end_date - timedelta(days=settings.YEARS_BACK*365)
+
+    # 2. Ingesta de Datos (Pipeline Lakehouse: Bronce -> Plata)
+    loader = MarketDataLoader(tickers, start_date, end_date)
+    if ingest:
+        print(f"📡 API Request: Descargando datos para {tickers}")
+        loader.ingest_data()
+        loader.transform_to_silver()
+    log_returns, last_prices = loader.load_for_simulation()
+    return loader, log_returns, last_prices, start_date, end_date
+
+
+def _new_days(previous, current):
+    """
+    Días nuevos de `current` si es la ventana `previous` desplazada: mismas columnas y largo,
+    y el historial compartido sin cambios. None si hace falta una calibración completa.
+    """
+    if list(previous.columns) != list(current.columns) or len(previous) != len(current):
+        return None
+    shift = int((current.index > previous.index[-1]).sum())
+    if shift >= len(current) or not current.iloc[:len(current) - shift].equals(previous.iloc[shift:]):
+        return None
+    return current.iloc[len(current) - shift:]
+
+
+def _calibrated_engine(payload: RiskRequest):
+    """
+    Pasos comunes: Ingesta (Bronce -> Plata), lectura y calibración.
+    Un engine del mismo universo ya calibrado en el proceso se actualiza con los días
+    nuevos (engine.update(), con nu re-ajustado en la ventana desplazada); si la ventana
+    no es un desplazamiento o se alcanzó API_MAX_INCREMENTAL_UPDATES, se re-entrena.
+    Retorna: (engine, loader, last_prices, start_date, end_date)
+    """
+    from src.models.scheduler import AdaptiveMonteCarlo
+
+    loader, log_returns, last_prices, start_date, end_date = _market_data(payload.tickers)
+    if log_returns is None or log_returns.empty:
+        raise NoMarketDataError("No se pudieron descargar datos para los tickers proporcionados.")
+
+    key = (tuple(log_returns.columns), payload.sampling)
+    live = _live_engines.pop(key, None)
+    new_days = None if live is None else _new_days(live[1], log_returns)
+    updates = 0 if live is None else live[2] + (1 if new_days is not None and len(new_days) else 0)
+    if new_days is None or updates > settings.API_MAX_INCREMENTAL_UPDATES:
+        updates = 0
+        strategy = _strategy(payload.sampling)
+        # Threads por job: los cores se reparten entre los procesos del JobManager (sin Ray por request)
+        threads = max(1, (os.cpu_count() or 1) // settings.API_MAX_WORKERS)
+        engine = AdaptiveMonteCarlo(strategy, seed=payload.seed, max_threads=threads, allow_ray=False)
+        engine.train(log_returns)
+    else:
+        engine = live[0]
+        engine.seed = payload.seed
+        if len(new_days):
+            engine.update(new_days, window=log_returns)
+
+    _live_engines[key] = (engine, log_returns, updates)
+    while len(_live_engines) > settings.API_LIVE_CALIBRATIONS:
+        _live_engines.popitem(last=False)
+    return engine, loader, last_prices, start_date, end_date
+
+
+def preload_hot_universes(universes=None, ingest: bool = False) -> list:
+    """
+    Hook de arranque: carga los módulos de cálculo y calibra las estrategias del
+    universo caliente en el registro del proceso (get_calibration_cache), para que
+    el primer request real no pague imports ni calibración en frío.
+    Un universo sin datos (o sin red) se reporta y se omite: nunca impide el arranque.
+
+    Args:
+        universes: Listas de tickers (default: settings.API_HOT_UNIVERSES).
+        ingest: True actualiza Plata antes de calibrar (una vez, en el servidor);
+                los workers del pool solo leen lo ya ingerido y la caché en disco.
+    Retorna: universos calibrados.
+    """
+    universes = settings.API_HOT_UNIVERSES if universes is None else universes
+    warmed = []
+    for tickers in universes:
+        try:
+            _, log_returns, _, _, _ = _market_data(list(tickers), ingest=ingest)
+            if log_returns is None or log_returns.empty:
+                print(f"⚠️ Precarga: sin datos locales para {list(tickers)}")
+                continue
+            # La clave de calibración no depende del sampler: sirve a cualquier request del universo
+            _strategy().train(log_returns)
+            warmed.append(list(tickers))
+        except Exception as e:
+            print(f"⚠️ Precarga de {list(tickers)} fallida: {str(e)}")
+    print(f"🔥 [Warmup] PID {os.getpid()}: {len(warmed)}/{len(universes)} universos calibrados")
+    return warmed
+
+
+def _metadata(loader, start_date, end_date, recorder: StageRecorder) -> dict:
+    return {
+        "start_date": start_date.strftime('%Y-%m-%d'),
+        "end_date": end_date.strftime('%Y-%m-%d'),
+        "execution_time": round(recorder.elapsed, 4),
+        "data_version": loader.returns_store.version,
+        "stages": recorder.summary()
+    }
+
+
+def _describe(metrics: dict) -> dict:
+    """Formatear la Respuesta JSON (Adaptar al Schema)."""
+    response_metrics = {}
+    for key, value in metrics.items():
+        if key in METRIC_DESCRIPTIONS:
+            response_metrics[key] = {
+                "value": round(float(value), 4), # Redondear a 4 decimales
+                "description": METRIC_DESCRIPTIONS[key]
+            }
+    return response_metrics
+
+
+def run_risk_pipeline(request: dict) -> dict:
+    """
+    Pipeline completo de un request: Ingesta -> Calibración -> Monte Carlo -> Métricas.
+    Función de módulo (picklable): se ejecuta en los procesos del JobManager.
+
+    Args:
+        request: RiskRequest serializado (model_dump()).
+    Retorna: dict compatible con RiskResponse.
+    """
+    from src.utils.reporter import RiskReporter
+
+    payload = RiskRequest(**request)
+    # Tiempos por etapa (ingest, transform, load, train, simulate, reduce) para la metadata
+    with recording() as recorder:
+        engine, loader, last_prices, start_date, end_date = _calibrated_engine(payload)
+
+        # 3. Motor de Simulación (Modo streaming: solo precios terminales)
+        # El PnL solo necesita el último día, no materializamos el tensor de trayectorias.
+        print(f"🎲 API Request: Iniciando Monte Carlo ({payload.n_sims} sims)")
+        horizon_grid = None
+        if payload.horizons:
+            # Multi-horizonte: una simulación evaluada en cada checkpoint (sin variable de control,
+            # que solo existe para el terminal)
+            horizons = sorted(set(payload.horizons) | {payload.horizon})
+            pnl_matrix = engine.simulate_horizons(last_prices.values, horizons, n_sims=payload.n_sims)
+            pnl_scenarios = pnl_matrix[:, horizons.index(payload.horizon)]
+        else:
+            pnl_scenarios = engine.simulate_pnl(last_prices.values, horizon=payload.horizon,
+                                                n_sims=payload.n_sims, control_variate=True)
+
+        # 4. Cálculo de Métricas (Reutilizando tu Reporter)
+        # OJO: Instanciamos el reporter solo para usar sus fórmulas, no para escribir TXT
+        with stage("reduce"):
+            reporter = RiskReporter(output_dir="output") # El directorio no importa aquí
+            if payload.horizons:
+                horizon_grid = reporter.calculate_horizon_metrics(pnl_matrix, horizons, weights=engine.weights)
+            if engine.weights is not None:
+                # Muestreo por importancia: métricas ponderadas por likelihood ratio (incluye 99.9%)
+                metrics = reporter.calculate_weighted_metrics(pnl_scenarios, engine.weights)
+                standard_errors = {}
+            else:
+                metrics = reporter.calculate_metrics(pnl_scenarios)
+                standard_errors = reporter.calculate_standard_errors(
+                    pnl_scenarios, paired=engine.strategy.sampler.paired,
+                    control=engine.control_pnl, control_mean=engine.control_mean)
+                if engine.control_pnl is not None:
+                    metrics["Mean PnL (CV)"] = standard_errors.pop("Mean PnL (CV)")
+
+    return {
+        "status": "success",
+        "metadata": _metadata(loader, start_date, end_date, recorder),
+        "metrics": _describe(metrics),
+        "standard_errors": {k: round(float(v), 6) for k, v in standard_errors.items()} or None,
+        "horizon_metrics": None if horizon_grid is None else
+                           {str(h): _describe(m) for h, m in horizon_grid.items()}
+    }
+
+
+def run_batch_pipeline(request: dict) -> dict:
+    """
+    Riesgo de muchos portafolios sobre el mismo universo: una calibración,
+    una simulación y un matmul (MonteCarloEngine.simulate_portfolios).
+
+    Args:
+        request: BatchRiskRequest serializado (model_dump()).
+    Retorna: dict compatible con BatchRiskResponse.
+    """
+    from src.utils.reporter import RiskReporter
+
+    payload = BatchRiskRequest(**request)
+    with recording() as recorder:
+        engine, loader, last_prices, start_date, end_date = _calibrated_engine(payload)
+
+        # Las posiciones son por ticker: sin datos para alguno, el portafolio no es evaluable
+        missing = [ticker for ticker in payload.tickers if ticker not in last_prices.index]
+        if missing:
+            raise NoMarketDataError(f"No hay datos para {missing}: las posiciones no pueden evaluarse.")
+
+        print(f"🎲 API Request: Monte Carlo batch ({len(payload.portfolios)} portafolios, {payload.n_sims} sims)")
+        pnl_matrix = engine.simulate_portfolios(last_prices[payload.tickers].values, payload.portfolios,
+                                                horizon=payload.horizon, n_sims=payload.n_sims)
+
+        with stage("reduce"):
+            reporter = RiskReporter(output_dir="output")
+            all_metrics = reporter.calculate_batch_metrics(pnl_matrix, weights=engine.weights)
+    ids = payload.portfolio_ids or [str(i) for i in range(len(payload.portfolios))]
+
+    return {
+        "status": "success",
+        "metadata": _metadata(loader, start_date, end_date, recorder),
+        "portfolios": [{"portfolio_id": pid, "metrics": _describe(metrics)}
+                       for pid, metrics in zip(ids, all_metrics)]
+    }
@@ -21,15 +21,43 @@ class Settings:
         # --- Parámetros de Simulación ---
         self.N_SIMS = 5000       # Universos paralelos
         self.HORIZON = 252       # 1 año bursátil
+        self.RISK_HORIZONS = []  # Horizontes extra en la misma simulación (opt-in, ej. [1, 10, 21]; [] = solo HORIZON)
         self.INITIAL_CAP = 100   # Base 100
         self.CONFIDENCE_LEVEL = 0.95
+        self.SEED = None         # Semilla raíz (None = aleatoria, se reporta en el log)
+        self.SAMPLING = "pseudo" # Reducción de varianza: "pseudo" | "antithetic" | "sobol" | "importance"
+        self.COVARIANCE = "sample"         # "sample" (Cholesky denso) | "factor" (PCA + idiosincrático, O(n*k))
+        self.N_FACTORS = 10                # Factores del modelo "factor"
+        self.COVARIANCE_SHRINKAGE = False  # Ledoit-Wolf sobre la covarianza estimada
+        self.CALIBRATION_HALFLIFE = None   # Vida media EWMA (días) de mu / covarianza (None = ventana equiponderada)
+        
+        # --- API (Cola de Jobs) ---
+        self.API_MAX_WORKERS = max(1, (os.cpu_count() or 2) // 2)  # Procesos de cálculo
+        self.API_MAX_PENDING_JOBS = 64      # Jobs en cola + en ejecución antes de responder 429
+        self.API_MAX_FINISHED_JOBS = 1000   # Resultados retenidos para polling
+        self.API_RESULT_CACHE_TTL = 300     # Segundos de validez de un resultado cacheado
+        self.API_RESULT_CACHE_SIZE = 512    # Requests distintos retenidos (LRU)
+        self.API_WARMUP = True              # Precarga al arrancar (en segundo plano, no retrasa /health)
+        self.API_HOT_UNIVERSES = [list(self.TICKERS)]  # Universos cuya calibración se precarga
+        self.API_LIVE_CALIBRATIONS = 16     # Engines calibrados retenidos por proceso para update() diario (LRU)
+        self.API_MAX_INCREMENTAL_UPDATES = 20  # update() consecutivos antes de re-entrenar desde cero
+        
+        # --- Scheduler de Ejecución (local / threads / Ray) ---
+        self.SCHEDULER_LOCAL_MAX_COST = 2e7       # n_sims * horizon * n_assets: por debajo, un solo thread
+        self.SCHEDULER_RAY_MIN_COST = 2e10        # Desde aquí compensa el arranque del pool de Ray
+        self.SCHEDULER_CACHE_BYTES = 2 * 1024 ** 2  # Working set objetivo por bloque (L2 / porción de L3)
+        self.SCHEDULER_MEMORY_FRACTION = 0.5      # Fracción de la RAM disponible para working sets
         
         # --- Rutas de Infraestructura ---
         self.BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
         self.DATA_DIR = os.path.join(self.BASE_DIR, "data")
         self.OUTPUT_DIR = os.path.join(self.BASE_DIR, "output")
-        
-        # Garantizar existencia de carpetas clave
+
+    def ensure_directories(self):
+        """
+        Garantizar existencia de carpetas clave.
+        Explícito (no en el import): cada worker / contenedor de la API no toca el disco al arrancar.
+        """
         os.makedirs(os.path.join(self.DATA_DIR, "gold"), exist_ok=True)
         os.makedirs(self.OUTPUT_DIR, exist_ok=True)
 
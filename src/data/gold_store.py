@@ -0,0 +1,223 @@
+import os
+import json
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin lock entre procesos (el lock de threads sigue activo)
+    fcntl = None
+
+# Layout de una tabla de Capa Oro (particionada por fecha de ejecución):
+#   gold/{table}/date=YYYY-MM-DD/part-{HHMMSS}-{uuid}.parquet
+#   gold/{table}/manifest.json  -> partes vigentes con su rango de timestamps
+# Cada escritura crea partes nuevas inmutables: costo O(filas nuevas), nunca O(historial).
+
+PARTITION_FORMAT = "%Y-%m-%d"
+
+
+class GoldStore:
+    """
+    Tabla append-only de la Capa Oro (ej. historial de métricas de riesgo).
+    - append(): una parte por partición de fecha y por lote; escritura atómica (tmp + os.replace).
+    - Manifest con lock entre procesos: jobs concurrentes no se pisan registros.
+    - query(): poda de particiones con el manifest y predicate pushdown de pyarrow
+      (estadísticas de row groups) para lecturas por rango de tiempo.
+    - compact(): fusiona las partes pequeñas de cada día (corridas intradía).
+    """
+
+    MANIFEST = "manifest.json"
+    LOCK_FILE = ".lock"
+
+    def __init__(self, root_dir: str, table: str = "risk_metrics_history", time_column: str = "execution_date"):
+        self.root_dir = root_dir
+        self.table = table
+        self.time_column = time_column
+        self.table_dir = os.path.join(root_dir, table)
+        self._lock = threading.Lock()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.table_dir, name)
+
+    def manifest(self) -> dict:
+        """Manifest vigente: {"parts": [{"path", "date", "rows", "min_time", "max_time"}]}."""
+        try:
+            with open(self._path(self.MANIFEST)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"parts": []}
+
+    def _write_manifest(self, manifest: dict):
+        tmp_path = self._path(f"{self.MANIFEST}.{os.getpid()}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, self._path(self.MANIFEST))
+
+    @contextmanager
+    def _exclusive(self):
+        """Sección crítica read-modify-write del manifest (threads + procesos)."""
+        with self._lock:
+            os.makedirs(self.table_dir, exist_ok=True)
+            with open(self._path(self.LOCK_FILE), "a") as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _write_part(self, df: pd.DataFrame, date: str) -> dict:
+        partition_dir = self._path(f"date={date}")
+        os.makedirs(partition_dir, exist_ok=True)
+        name = f"part-{datetime.now().strftime('%H%M%S')}-{uuid.uuid4().hex[:12]}.parquet"
+        path = os.path.join(partition_dir, name)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        # Ordenado por tiempo: las estadísticas min/max de cada row group permiten el pushdown
+        df.sort_values(self.time_column).to_parquet(tmp_path, engine="pyarrow", index=False, compression="snappy")
+        os.replace(tmp_path, path)
+        times = df[self.time_column]
+        return {"path": os.path.relpath(path, self.table_dir), "date": date, "rows": len(df),
+                "min_time": times.min().isoformat(), "max_time": times.max().isoformat()}
+
+    def append(self, records) -> int:
+        """
+        Agrega un lote de registros (lista de dicts o DataFrame) con columna de tiempo.
+        Los datos se escriben fuera del lock; solo el registro en el manifest es exclusivo.
+        Retorna el número de filas agregadas.
+        """
+        df = records if isinstance(records, pd.DataFrame) else pd.DataFrame(list(records))
+        if df.empty:
+            return 0
+        new_parts = self._write_partitions(df)
+        with self._exclusive():
+            self._register(new_parts)
+        return len(df)
+
+    def _write_partitions(self, df: pd.DataFrame) -> list:
+        """Escribe una parte por fecha (aún invisibles para los lectores: no están en el manifest)."""
+        df = df.copy()
+        df[self.time_column] = pd.to_datetime(df[self.time_column])
+        partitions = df[self.time_column].dt.strftime(PARTITION_FORMAT)
+        return [self._write_part(group, date) for date, group in df.groupby(partitions, sort=True)]
+
+    def _register(self, parts: list):
+        """Publica partes en el manifest (llamar dentro de _exclusive)."""
+        manifest = self.manifest()
+        manifest["parts"].extend(parts)
+        self._write_manifest(manifest)
+
+    @contextmanager
+    def writer(self, batch_size: int = 500):
+        """
+        Escritura por lotes: acumula registros y los persiste cada batch_size (y al salir).
+        Uso: with store.writer() as write: write(record) ...
+        """
+        buffer = []
+
+        def write(record: dict):
+            buffer.append(record)
+            if len(buffer) >= batch_size:
+                self.append(buffer)
+                buffer.clear()
+
+        try:
+            yield write
+        finally:
+            if buffer:
+                self.append(buffer)
+
+    def _select_parts(self, manifest: dict, start, end) -> list:
+        """Poda por manifest: solo las partes cuyo rango de tiempo intersecta [start, end]."""
+        parts = []
+        for part in manifest["parts"]:
+            if start is not None and pd.Timestamp(part["max_time"]) < start:
+                continue
+            if end is not None and pd.Timestamp(part["min_time"]) > end:
+                continue
+            parts.append(self._path(part["path"]))
+        return parts
+
+    def query(self, start=None, end=None, columns=None, predicate=None) -> pd.DataFrame:
+        """
+        Registros con time_column en [start, end] (ambos inclusivos, opcionales).
+
+        Args:
+            columns: Proyección de columnas (solo esas se leen del disco).
+            predicate: Expresión pyarrow.dataset adicional (ej. ds.field("model") == "StudentTStrategy").
+        """
+        start = pd.Timestamp(start) if start is not None else None
+        end = pd.Timestamp(end) if end is not None else None
+        for attempt in range(2):
+            paths = self._select_parts(self.manifest(), start, end)
+            if not paths:
+                return pd.DataFrame(columns=columns)
+            expression = predicate
+            field = ds.field(self.time_column)
+            for bound in ((field >= start.to_pydatetime()) if start is not None else None,
+                          (field <= end.to_pydatetime()) if end is not None else None):
+                if bound is not None:
+                    expression = bound if expression is None else expression & bound
+            try:
+                table = ds.dataset(paths, format="parquet").to_table(columns=columns, filter=expression)
+                break
+            except FileNotFoundError:
+                # Una compactación concurrente reemplazó las partes: se relee el manifest
+                if attempt:
+                    raise
+        df = table.to_pandas()
+        if self.time_column in df.columns:
+            df = df.sort_values(self.time_column, kind="stable").reset_index(drop=True)
+        return df
+
+    def compact(self, min_parts: int = 2) -> int:
+        """
+        Fusiona las partes de cada fecha con al menos min_parts partes en una sola.
+        Los lectores usan el manifest: las partes antiguas se borran después de publicarlo.
+        Retorna el número de partes fusionadas.
+        """
+        with self._exclusive():
+            manifest = self.manifest()
+            by_date = {}
+            for part in manifest["parts"]:
+                by_date.setdefault(part["date"], []).append(part)
+
+            merged, obsolete, parts = 0, [], []
+            for date, group in sorted(by_date.items()):
+                if len(group) < min_parts:
+                    parts.extend(group)
+                    continue
+                tables = [pq.read_table(self._path(part["path"])) for part in group]
+                df = pa.concat_tables(tables, promote_options="default").to_pandas()
+                parts.append(self._write_part(df, date))
+                obsolete.extend(self._path(part["path"]) for part in group)
+                merged += len(group)
+
+            if merged:
+                self._write_manifest({**manifest, "parts": parts})
+                for path in obsolete:
+                    os.remove(path)
+        return merged
+
+    def migrate_legacy(self, legacy_path: str) -> int:
+        """
+        Importa un historial de un solo archivo (formato anterior) y lo renombra a *.migrated.
+        Bajo el lock: si varios jobs arrancan a la vez, solo uno migra.
+        Retorna las filas importadas (0 si no había archivo).
+        """
+        if not os.path.exists(legacy_path):
+            return 0
+        with self._exclusive():
+            if not os.path.exists(legacy_path):
+                return 0
+            df = pd.read_parquet(legacy_path)
+            if not df.empty:
+                self._register(self._write_partitions(df))
+            os.replace(legacy_path, f"{legacy_path}.migrated")
+        return len(df)
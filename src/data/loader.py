@@ -1,31 +1,143 @@
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 import pandas as pd
-import yfinance as yf
 import numpy as np
 from datetime import datetime
+from src.data.sources import MarketDataSource, YahooDataSource
+from src.data import silver_store
+from src.data.returns_store import ReturnsStore
+from src.utils.instrumentation import timed
+
+
+def _transform_ticker(ticker: str, raw_path: str, silver_path: str, max_parts: int = 64) -> tuple:
+    """
+    Bronce -> Plata para un ticker. Función de módulo (picklable) para el pool de procesos.
+    Incremental: solo agrega las filas posteriores a la última fecha almacenada.
+    Retorna: (mensaje de log, filas nuevas o None). El proceso principal imprime en orden
+    y consolida las filas nuevas en la matriz de retornos.
+    """
+    try:
+        _migrate_legacy_silver(silver_path)
+        last_date, last_price = silver_store.last_stored(silver_path)
+
+        if not os.path.exists(raw_path):
+            if last_date is not None:
+                return f"⏩ [Plata] {ticker} al día ({last_date.date()})", None
+            return f"⚠️ No se encontró raw data para {ticker}, saltando...", None
+
+        # Cargar CSV crudo (puede contener basura en los headers)
+        df = pd.read_csv(raw_path, index_col=0, parse_dates=[0])
+
+        # Selección de Columna
+        if 'Adj Close' in df.columns:
+            series = df['Adj Close']
+        elif 'Close' in df.columns:
+            series = df['Close']
+        else:
+            # Intento de fallback: si la columna se llama diferente (ej. ticker)
+            # Esto pasa a veces con yfinance multi-index
+            series = df.iloc[:, 0]
+
+        # === 🛡️ CORRECCIÓN DE INGENIERÍA DE DATOS 🛡️ ===
+        # 1. Forzar conversión a NUMÉRICO.
+        # 'errors=coerce' convierte cualquier texto (como headers repetidos) en NaN
+        series = pd.to_numeric(series, errors='coerce')
+
+        # 2. Limpieza de NaNs (incluyendo los generados por la conversión)
+        series = series.ffill().dropna()
+
+        # Verificar si quedó vacío después de limpiar
+        if series.empty:
+            return f"⚠️ {ticker}: Datos vacíos tras limpieza. Revisar CSV Bronce.", None
+
+        # Solo filas nuevas: el primer retorno se ancla en el último precio almacenado
+        if last_date is not None:
+            series = series[series.index > last_date]
+            if series.empty:
+                return f"⏩ [Plata] {ticker} al día ({last_date.date()})", None
+
+        # Crear DataFrame limpio para Silver
+        df_silver = pd.DataFrame(series)
+        df_silver.columns = ['price']
+
+        # Calcular Retornos Logarítmicos
+        previous = df_silver['price'].shift(1)
+        if last_price is not None:
+            previous.iloc[0] = last_price
+        df_silver['log_return'] = np.log(df_silver['price'] / previous)
+        df_silver = df_silver.dropna()
+        if df_silver.empty:
+            return f"⏩ [Plata] {ticker}: sin retornos nuevos", None
+
+        # PERSISTENCIA PLATA (append de una parte inmutable)
+        part_path = silver_store.append_part(silver_path, df_silver)
+        if len(silver_store.list_parts(silver_path)) > max_parts:
+            silver_store.compact(silver_path)
+        return f"💎 [Plata] +{len(df_silver)} filas: {ticker} -> {part_path}", df_silver
+
+    except Exception as e:
+        return f"❌ Error transformando {ticker}: {str(e)}", None
+
+
+def _migrate_legacy_silver(silver_path: str):
+    """Convierte el formato antiguo ({ticker}.parquet) en la primera parte del directorio."""
+    legacy_path = f"{silver_path}.parquet"
+    if os.path.exists(legacy_path) and not silver_store.list_parts(silver_path):
+        silver_store.append_part(silver_path, pd.read_parquet(legacy_path, engine='pyarrow'))
+        os.remove(legacy_path)
+
 
 class MarketDataLoader:
-    def __init__(self, tickers, start_date, end_date, data_dir="data"):
+    # Debajo de este tamaño el arranque del pool de procesos cuesta más que transformar en serie
+    PARALLEL_MIN_TICKERS = 16
+
+    # Partes por ticker antes de compactar automáticamente
+    COMPACT_MAX_PARTS = 64
+
+    # Subdirectorio de Plata con la matriz consolidada de retornos
+    RETURNS_MATRIX_DIR = "_returns_matrix"
+
+    def __init__(self, tickers, start_date, end_date, data_dir="data",
+                 source: MarketDataSource = None, max_workers: int = 8,
+                 max_retries: int = 3, backoff: float = 0.5):
         """
         Inicializa el gestor de datos siguiendo la arquitectura Lakehouse.
         
         Directorios:
         - data/bronze: Datos crudos (csv/json) - Auditoría
-        - data/silver: Datos procesados (parquet) - Rendimiento
+        - data/silver: Datos procesados (parquet append-only, un directorio por ticker)
+
+        Args:
+            source: Fuente de mercado (default: Yahoo Finance).
+            max_workers: Descargas concurrentes (acotado para no saturar al proveedor).
+            max_retries: Reintentos por ticker ante errores transitorios.
+            backoff: Espera base en segundos (exponencial: backoff * 2^intento).
         """
         self.tickers = tickers
         self.start = start_date
         self.end = end_date
         self.base_dir = data_dir
+        self.source = source or YahooDataSource()
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.backoff = backoff
         
         # Definición de capas del Lakehouse
         self.bronze_dir = os.path.join(self.base_dir, "bronze")
         self.silver_dir = os.path.join(self.base_dir, "silver")
+        # Matriz consolidada (fechas x tickers) para lecturas del motor
+        self.returns_store = ReturnsStore(os.path.join(self.silver_dir, self.RETURNS_MATRIX_DIR))
         
         # Garantizar que existan las carpetas
         os.makedirs(self.bronze_dir, exist_ok=True)
         os.makedirs(self.silver_dir, exist_ok=True)
 
+    @classmethod
+    def data_version(cls, data_dir="data"):
+        """Versión vigente de la Capa Plata consolidada (None si aún no existe). No crea carpetas."""
+        return ReturnsStore(os.path.join(data_dir, "silver", cls.RETURNS_MATRIX_DIR)).version
+
     def _get_bronze_path(self, ticker):
         """Genera ruta particionada por fecha de ingestión."""
         today = datetime.now().strftime("%Y-%m-%d")
@@ -34,125 +146,158 @@ class MarketDataLoader:
         return os.path.join(path, f"{ticker}.csv")
 
     def _get_silver_path(self, ticker):
-        """Ruta al archivo Parquet optimizado."""
-        return os.path.join(self.silver_dir, f"{ticker}.parquet")
+        """Directorio de partes Parquet del ticker."""
+        return os.path.join(self.silver_dir, ticker)
 
-    def ingest_data(self):
+    def _fetch_start(self, ticker):
         """
-        Paso 1 (EL): Extracción y Carga a Capa Bronce.
-        Descarga datos de Yahoo y los guarda CRUDOS sin tocar.
+        Inicio de la descarga: día siguiente a la última fecha en Plata (o start_date).
+        Retorna: (inicio, es_incremental)
         """
-        print(f"📡 INGESTA: Iniciando descarga para {len(self.tickers)} activos...")
-        
-        for ticker in self.tickers:
+        silver_path = self._get_silver_path(ticker)
+        _migrate_legacy_silver(silver_path)
+        last_date, _ = silver_store.last_stored(silver_path)
+        if last_date is None:
+            return self.start, False
+        return max(pd.Timestamp(self.start), last_date + pd.Timedelta(days=1)), True
+
+    def _fetch_end(self) -> pd.Timestamp:
+        """
+        Fin (exclusivo) de la descarga: end_date acotado a la última sesión cerrada.
+        La barra de hoy puede ser parcial (intradía) y Plata es append-only: un precio
+        parcial quedaría persistido para siempre. Se descarga en la próxima corrida.
+        """
+        return min(pd.Timestamp(self.end), pd.Timestamp.now().normalize())
+
+    def _fetch_with_retry(self, ticker, start) -> pd.DataFrame:
+        """Descarga un ticker con reintentos y backoff exponencial."""
+        for attempt in range(self.max_retries + 1):
             try:
-                # Descarga individual para evitar problemas de MultiIndex de Yahoo
-                df = yf.download(ticker, start=self.start, end=self.end, progress=False)
-                
-                if df.empty:
-                    print(f"⚠️ Advertencia: No hay datos para {ticker}")
-                    continue
-                
-                # PERSISTENCIA BRONCE (Schema-on-Read)
-                # Guardamos CSV crudo para auditoría
-                raw_path = self._get_bronze_path(ticker)
-                df.to_csv(raw_path)
-                print(f"✅ [Bronce] Guardado: {ticker} -> {raw_path}")
-                
+                return self.source.fetch(ticker, start, self._fetch_end())
             except Exception as e:
-                print(f"❌ Error descargando {ticker}: {str(e)}")
+                if attempt == self.max_retries:
+                    raise
+                wait = self.backoff * 2 ** attempt
+                print(f"🔁 Reintento {attempt + 1}/{self.max_retries} para {ticker} en {wait:.1f}s ({str(e)})")
+                time.sleep(wait)
+
+    def _ingest_ticker(self, ticker):
+        """Descarga + persistencia Bronce de un ticker (ejecutado en el pool de threads)."""
+        try:
+            start, incremental = self._fetch_start(ticker)
+            if incremental and start >= self._fetch_end():
+                print(f"⏩ [Bronce] {ticker} al día")
+                return ticker
+
+            df = self._fetch_with_retry(ticker, start)
+
+            if df.empty:
+                if incremental:
+                    print(f"⏩ [Bronce] {ticker}: sin datos nuevos desde {start.date()}")
+                    return ticker
+                print(f"⚠️ Advertencia: No hay datos para {ticker}")
+                return None
 
+            # PERSISTENCIA BRONCE (Schema-on-Read)
+            # Guardamos CSV crudo para auditoría
+            raw_path = self._get_bronze_path(ticker)
+            df.to_csv(raw_path)
+            print(f"✅ [Bronce] Guardado: {ticker} -> {raw_path}")
+            return ticker
+
+        except Exception as e:
+            print(f"❌ Error descargando {ticker}: {str(e)}")
+            return None
+
+    @timed("ingest")
+    def ingest_data(self):
+        """
+        Paso 1 (EL): Extracción y Carga a Capa Bronce.
+        Descarga datos de la fuente y los guarda CRUDOS sin tocar.
+        Incremental: si el ticker ya está en Plata, solo se pide el rango faltante.
+        La descarga es I/O-bound: pool de threads acotado por max_workers.
+        Retorna: lista de tickers ingestados.
+        """
+        print(f"📡 INGESTA: Iniciando descarga para {len(self.tickers)} activos "
+              f"({self.source.name}, {self.max_workers} conexiones)...")
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            results = list(pool.map(self._ingest_ticker, self.tickers))
+        return [ticker for ticker in results if ticker is not None]
+
+    @timed("transform")
     def transform_to_silver(self):
         """
         Paso 2 (T): Transformación y Carga a Capa Plata.
         Lee de Bronce, fuerza tipos numéricos, limpia y guarda en Parquet.
+        El parseo es CPU-bound: universos grandes se reparten en un pool de procesos.
         """
         print(f"⚙️ TRANSFORMACIÓN: Generando capa Plata (Parquet)...")
-        
-        for ticker in self.tickers:
-            try:
-                raw_path = self._get_bronze_path(ticker)
-                if not os.path.exists(raw_path):
-                    print(f"⚠️ No se encontró raw data para {ticker}, saltando...")
-                    continue
-                
-                # Cargar CSV crudo (puede contener basura en los headers)
-                df = pd.read_csv(raw_path, index_col=0, parse_dates=[0])
-                
-                # Selección de Columna
-                if 'Adj Close' in df.columns:
-                    series = df['Adj Close']
-                elif 'Close' in df.columns:
-                    series = df['Close']
-                else:
-                    # Intento de fallback: si la columna se llama diferente (ej. ticker)
-                    # Esto pasa a veces con yfinance multi-index
-                    series = df.iloc[:, 0] 
-
-                # === 🛡️ CORRECCIÓN DE INGENIERÍA DE DATOS 🛡️ ===
-                # 1. Forzar conversión a NUMÉRICO.
-                # 'errors=coerce' convierte cualquier texto (como headers repetidos) en NaN
-                series = pd.to_numeric(series, errors='coerce')
-
-                # 2. Limpieza de NaNs (incluyendo los generados por la conversión)
-                series = series.ffill().dropna()
-
-                # Verificar si quedó vacío después de limpiar
-                if series.empty:
-                    print(f"⚠️ {ticker}: Datos vacíos tras limpieza. Revisar CSV Bronce.")
-                    continue
-                
-                # Crear DataFrame limpio para Silver
-                df_silver = pd.DataFrame(series)
-                df_silver.columns = ['price']
-                
-                # Calcular Retornos Logarítmicos
-                df_silver['log_return'] = np.log(df_silver['price'] / df_silver['price'].shift(1))
-                df_silver = df_silver.dropna()
-
-                # PERSISTENCIA PLATA
-                silver_path = self._get_silver_path(ticker)
-                df_silver.to_parquet(silver_path, engine='pyarrow', compression='snappy')
-                
-                print(f"💎 [Plata] Optimizado: {ticker} -> {silver_path}")
-                
-            except Exception as e:
-                print(f"❌ Error transformando {ticker}: {str(e)}")
 
-    def load_for_simulation(self):
-        """
-        Paso 3: Lectura para el Motor.
-        Lee exclusivamente desde la Capa Plata (Parquet).
-        Retorna: (DataFrame retornos, Series últimos precios)
-        """
-        returns_list = []
-        last_prices = {}
-        
-        print(f"🚀 LEER: Cargando datos desde Data Lake (Silver Layer)...")
-        
+        jobs = [(ticker, self._get_bronze_path(ticker), self._get_silver_path(ticker), self.COMPACT_MAX_PARTS)
+                for ticker in self.tickers]
+        if len(jobs) < self.PARALLEL_MIN_TICKERS:
+            results = [_transform_ticker(*job) for job in jobs]
+        else:
+            with ProcessPoolExecutor(max_workers=min(len(jobs), os.cpu_count() or 1)) as pool:
+                results = list(pool.map(_transform_ticker, *zip(*jobs)))
+
+        new_rows = {}
+        for ticker, (message, rows) in zip(self.tickers, results):
+            print(message)
+            if rows is not None:
+                new_rows[ticker] = rows
+
+        # Solo las filas nuevas se escriben en la matriz consolidada
+        self.returns_store.update(new_rows)
+
+    def compact_silver(self):
+        """Mantenimiento: fusiona las partes de cada ticker en un único Parquet."""
         for ticker in self.tickers:
+            merged = silver_store.compact(self._get_silver_path(ticker))
+            if merged:
+                print(f"🧹 [Plata] Compactado: {ticker} ({merged} partes -> 1)")
+
+    def _backfill_returns_store(self, tickers):
+        """Carga en la matriz consolidada tickers con Plata que aún no están en ella."""
+        frames = {}
+        for ticker in tickers:
             silver_path = self._get_silver_path(ticker)
-            if not os.path.exists(silver_path):
+            _migrate_legacy_silver(silver_path)
+            if not silver_store.list_parts(silver_path):
                 print(f"❌ Error Crítico: No existe capa plata para {ticker}. Ejecute ingest primero.")
                 continue
-            
-            # Lectura ultra-rápida con Parquet
-            df = pd.read_parquet(silver_path, engine='pyarrow')
-            
+
+            df = silver_store.read_silver(silver_path)
+
             # Validar integridad
             if 'log_return' not in df.columns or 'price' not in df.columns:
                  print(f"❌ Integridad de datos fallida en {ticker}")
                  continue
+            frames[ticker] = df
+        self.returns_store.update(frames)
+
+    @timed("load")
+    def load_for_simulation(self, start=None, end=None):
+        """
+        Paso 3: Lectura para el Motor.
+        Lee la matriz consolidada de Plata (memory-mapped) proyectando solo
+        los tickers y la ventana de fechas solicitados.
+        Plata es append-only: sin ventana explícita se usa la del loader
+        (start_date / end_date, ej. YEARS_BACK), no todo el historial acumulado.
+
+        Args:
+            start, end: Ventana de fechas (inclusiva). Default: start_date / end_date.
+        Retorna: (DataFrame retornos, Series precios al cierre de la ventana)
+        """
+        start = self.start if start is None else start
+        end = self.end if end is None else end
+        print(f"🚀 LEER: Cargando datos desde Data Lake (Silver Layer)...")
+
+        stored = set(self.returns_store.tickers)
+        missing = [ticker for ticker in self.tickers if ticker not in stored]
+        if missing:
+            self._backfill_returns_store(missing)
 
-            # Agregar al dataset final
-            returns_list.append(df['log_return'].rename(ticker))
-            last_prices[ticker] = df['price'].iloc[-1]
-            
-        if not returns_list:
-            return None, None
-            
         # Consolidar matriz de retornos (Inner Join por fecha)
-        all_returns = pd.concat(returns_list, axis=1).dropna()
-        last_prices_series = pd.Series(last_prices)
-        
-        return all_returns, last_prices_series
\ No newline at end of file
+        return self.returns_store.load(self.tickers, start=start, end=end)
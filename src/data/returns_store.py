@@ -0,0 +1,243 @@
+import os
+import glob
+import json
+import threading
+import uuid
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin lock entre procesos (el lock de threads sigue activo)
+    fcntl = None
+
+
+class ReturnsStore:
+    """
+    Matriz consolidada de retornos logarítmicos (fechas x tickers) alineada por fecha.
+    Mantenida por la transformación a Plata; leída por load_for_simulation.
+
+    Layout (versionado, escritura atómica vía manifest), en segmentos de SEGMENT_ROWS fechas:
+    - returns-{version}-{j}.npy: float64 en orden Fortran (cada ticker es una columna contigua),
+      NaN donde el ticker no tiene dato. Un segmento escrito antes de que llegara un ticker
+      tiene menos columnas (los tickers solo se agregan al final).
+    - dates-{version}-{j}.npy: datetime64[ns] ordenadas; cada segmento sigue al anterior.
+    - manifest.json: versión vigente, segmentos (archivos, filas y última fecha), tickers y
+      último precio por ticker.
+
+    Una actualización reescribe solo desde el segmento de la fecha más antigua que toca:
+    el refresco diario reescribe el segmento abierto (<= SEGMENT_ROWS filas) y reutiliza
+    los demás archivos, así que su costo no crece con el historial.
+    La lectura es un np.load(mmap_mode='r') por segmento: solo se tocan las páginas de las
+    columnas y la ventana solicitadas.
+    """
+
+    MANIFEST = "manifest.json"
+    LOCK_FILE = ".lock"
+
+    # Fechas por segmento (~1 año bursátil): cota del costo de un refresco
+    SEGMENT_ROWS = 256
+
+    def __init__(self, root_dir: str):
+        self.root_dir = root_dir
+        self._lock = threading.Lock()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.root_dir, name)
+
+    def manifest(self) -> dict:
+        """Manifest vigente (o None si el store está vacío)."""
+        try:
+            with open(self._path(self.MANIFEST)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    @property
+    def version(self):
+        """Identificador de la versión de datos vigente (None si vacío)."""
+        manifest = self.manifest()
+        return manifest["version"] if manifest else None
+
+    @property
+    def tickers(self) -> list:
+        manifest = self.manifest()
+        return manifest["tickers"] if manifest else []
+
+    @contextmanager
+    def _exclusive(self):
+        """
+        Sección crítica read-modify-write-publish del manifest (threads + procesos):
+        cada proceso del JobManager tiene su propio MarketDataLoader.
+        """
+        with self._lock:
+            os.makedirs(self.root_dir, exist_ok=True)
+            with open(self._path(self.LOCK_FILE), "a") as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _sequence(version: str) -> int:
+        return int(version.split("-")[0])
+
+    @staticmethod
+    def _segments(manifest: dict) -> list:
+        # Manifest de una sola matriz (layout anterior a los segmentos): un único segmento
+        return manifest.get("segments") or [manifest]
+
+    @classmethod
+    def _files(cls, manifest: dict) -> set:
+        return {segment[key] for segment in cls._segments(manifest) for key in ("returns_file", "dates_file")}
+
+    def _collect_garbage(self, current: dict, previous: dict):
+        """
+        Elimina los archivos que no referencian ni la versión vigente ni la recién reemplazada
+        (se conserva para lectores en curso). Corre dentro de _exclusive(): no hay escritores
+        concurrentes con archivos aún sin publicar.
+        """
+        referenced = self._files(current) | self._files(previous)
+        for path in glob.glob(self._path("returns-*.npy")) + glob.glob(self._path("dates-*.npy")):
+            if os.path.basename(path) not in referenced:
+                os.remove(path)
+
+    def _open(self, segment: dict):
+        returns = np.load(self._path(segment["returns_file"]), mmap_mode="r")
+        dates = np.load(self._path(segment["dates_file"]), mmap_mode="r")
+        return returns, dates
+
+    def _span(self, segment: dict):
+        """(filas, última fecha) de un segmento; sin abrir archivos salvo en el layout anterior."""
+        if "last_date" in segment:
+            return segment["rows"], np.datetime64(segment["last_date"], "ns")
+        _, dates = self._open(segment)
+        return len(dates), dates[-1]
+
+    @staticmethod
+    def _take(segments: list, lo: int, hi: int, cols: list) -> np.ndarray:
+        """
+        Filas globales [lo, hi) de las columnas `cols` a través de los segmentos abiertos
+        (NaN en segmentos escritos antes de que existiera el ticker).
+        """
+        parts, offset = [], 0
+        for returns, dates in segments:
+            a, b = max(lo - offset, 0), min(hi - offset, len(dates))
+            offset += len(dates)
+            if a >= b:
+                continue
+            part = np.full((b - a, len(cols)), np.nan)
+            present = [k for k, col in enumerate(cols) if col < returns.shape[1]]
+            if present:
+                part[:, present] = returns[a:b, [cols[k] for k in present]]
+            parts.append(part)
+        return np.concatenate(parts) if parts else np.empty((0, len(cols)))
+
+    def update(self, frames: dict):
+        """
+        Inserta filas (nuevas o corregidas) por ticker; las demás celdas se conservan.
+        Solo se reescriben los segmentos desde la fecha más antigua recibida (o el segmento
+        abierto, si aún tiene espacio); los anteriores se reutilizan sin copiarse.
+
+        Args:
+            frames: {ticker: DataFrame Plata con columnas 'price' y 'log_return'}.
+                    El último precio de cada frame pasa a ser el último precio del ticker.
+        """
+        if not frames:
+            return
+        with self._exclusive():
+            manifest = self.manifest()
+            tickers = list(manifest["tickers"]) if manifest else []
+            last_prices = dict(manifest["last_prices"]) if manifest else {}
+            segments = self._segments(manifest) if manifest else []
+
+            new_dates = np.unique(np.concatenate([df.index.values.astype("datetime64[ns]")
+                                                  for df in frames.values()]))
+            spans = [self._span(segment) for segment in segments]
+            # Primer segmento afectado: el que llega hasta la fecha nueva más antigua; si todas
+            # son posteriores, el último segmento mientras no esté lleno
+            first = next((i for i, (_, last) in enumerate(spans) if last >= new_dates[0]), len(segments))
+            if first == len(segments) and spans and spans[-1][0] < self.SEGMENT_ROWS:
+                first -= 1
+
+            rewritten = [self._open(segment) for segment in segments[first:]]
+            dates = np.unique(np.concatenate([new_dates] + [np.asarray(d) for _, d in rewritten]))
+            tickers += [ticker for ticker in frames if ticker not in tickers]
+            returns = np.full((len(dates), len(tickers)), np.nan, order="F")
+            for old_returns, old_dates in rewritten:
+                rows = np.searchsorted(dates, old_dates)
+                returns[rows, :old_returns.shape[1]] = old_returns
+
+            for ticker, df in frames.items():
+                col = tickers.index(ticker)
+                rows = np.searchsorted(dates, df.index.values.astype("datetime64[ns]"))
+                returns[rows, col] = df["log_return"].to_numpy(dtype=float)
+                last_prices[ticker] = float(df["price"].iloc[-1])
+
+            previous = (manifest or {}).get("version", "0")
+            version = f"{self._sequence(previous) + 1:06d}-{uuid.uuid4().hex[:8]}"
+            written = []
+            for j, lo in enumerate(range(0, len(dates), self.SEGMENT_ROWS)):
+                segment_dates = dates[lo:lo + self.SEGMENT_ROWS]
+                segment = {"returns_file": f"returns-{version}-{j:03d}.npy",
+                           "dates_file": f"dates-{version}-{j:03d}.npy",
+                           "rows": len(segment_dates), "last_date": str(segment_dates[-1])}
+                np.save(self._path(segment["returns_file"]),
+                        np.asfortranarray(returns[lo:lo + self.SEGMENT_ROWS]))
+                np.save(self._path(segment["dates_file"]), segment_dates)
+                written.append(segment)
+
+            kept = [{"returns_file": segment["returns_file"], "dates_file": segment["dates_file"],
+                     "rows": rows, "last_date": str(last)}
+                    for segment, (rows, last) in zip(segments[:first], spans)]
+            new_manifest = {
+                "version": version,
+                "segments": kept + written,
+                "tickers": tickers,
+                "last_prices": last_prices,
+            }
+            tmp_path = self._path(f"{self.MANIFEST}.{os.getpid()}.tmp")
+            with open(tmp_path, "w") as f:
+                json.dump(new_manifest, f)
+            os.replace(tmp_path, self._path(self.MANIFEST))
+
+            # Se conserva la versión anterior para lectores en curso; solo se eliminan las previas
+            if manifest:
+                self._collect_garbage(new_manifest, manifest)
+
+    def load(self, tickers: list, start=None, end=None):
+        """
+        Proyección de columnas y ventana de fechas.
+        Retorna: (DataFrame retornos con inner join por fecha, Series precios al cierre de la
+        ventana), o (None, None) si ningún ticker está en el store.
+        """
+        manifest = self.manifest()
+        if manifest is None:
+            return None, None
+        positions = {ticker: i for i, ticker in enumerate(manifest["tickers"])}
+        selected = [ticker for ticker in tickers if ticker in positions]
+        if not selected:
+            return None, None
+
+        segments = [self._open(segment) for segment in self._segments(manifest)]
+        dates = np.concatenate([dates for _, dates in segments])
+        lo = 0 if start is None else int(np.searchsorted(dates, np.datetime64(pd.Timestamp(start), "ns")))
+        hi = len(dates) if end is None else int(np.searchsorted(dates, np.datetime64(pd.Timestamp(end), "ns"), side="right"))
+
+        cols = [positions[ticker] for ticker in selected]
+        block = self._take(segments, lo, hi, cols)
+        complete = ~np.isnan(block).any(axis=1)
+
+        all_returns = pd.DataFrame(block[complete], index=pd.DatetimeIndex(dates[lo:hi][complete]),
+                                   columns=selected)
+        last_prices = pd.Series({ticker: manifest["last_prices"][ticker] for ticker in selected})
+        if hi < len(dates):
+            # Precio al último día de la ventana: se descuentan los log-retornos posteriores
+            # (Plata encadena cada retorno al precio anterior del mismo ticker)
+            later = np.nansum(self._take(segments, hi, len(dates), cols), axis=0)
+            last_prices = last_prices * np.exp(-later)
+        return all_returns, last_prices
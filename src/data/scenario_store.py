@@ -0,0 +1,199 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+import numpy as np
+from src.config.settings import settings
+
+# Layout de un set de escenarios (uno por clave = parámetros del modelo + semilla + job):
+#   scenarios/{key}/manifest.json          -> metadatos, forma y chunks (se escribe al final)
+#   scenarios/{key}/chunk-00000.npy        -> escenarios del bloque canónico 0 (mmap)
+#   scenarios/{key}/log_weights-00000.npy  -> log-likelihood ratios (solo samplers ponderados)
+# Con compress=True cada chunk es un .npz comprimido (menos disco, sin mmap).
+# El set se escribe en un directorio temporal y se publica con un rename atómico:
+# un set visible siempre está completo.
+
+SCENARIO_MODES = ("terminal", "paths")
+
+
+def _chunk_name(prefix: str, index: int, compress: bool) -> str:
+    return f"{prefix}-{index:05d}.{'npz' if compress else 'npy'}"
+
+
+class ScenarioSet:
+    """
+    Set de escenarios persistido (solo lectura). Se recorre chunk a chunk:
+    la memoria pico es la de un bloque canónico, no la del tensor completo.
+    """
+
+    def __init__(self, path: str, manifest: dict):
+        self.path = path
+        self.manifest = manifest
+        self.key = manifest["key"]
+        self.mode = manifest["mode"]
+        self.n_sims = manifest["n_sims"]
+        self.horizon = manifest["horizon"]
+        self.initial_prices = np.asarray(manifest["initial_prices"], dtype=float)
+        self.weighted = manifest["weighted"]
+
+    def __len__(self):
+        return len(self.manifest["chunks"])
+
+    def _read(self, name: str) -> np.ndarray:
+        path = os.path.join(self.path, name)
+        if name.endswith(".npz"):
+            with np.load(path, allow_pickle=False) as data:
+                return data["values"]
+        return np.load(path, mmap_mode="r", allow_pickle=False)
+
+    def iter_chunks(self):
+        """
+        Genera (escenarios, log_weights) por chunk, en el orden de los bloques.
+        escenarios: (rows, n_assets) en modo "terminal" o (rows, horizon, n_assets) en "paths";
+        log_weights: (rows,) o None. Los .npy se abren como memmap (lectura perezosa).
+        """
+        for chunk in self.manifest["chunks"]:
+            log_weights = self._read(chunk["log_weights"]) if self.weighted else None
+            yield self._read(chunk["values"]), log_weights
+
+    def terminal_chunks(self):
+        """Igual que iter_chunks(), reducido a precios terminales (último día en modo "paths")."""
+        for values, log_weights in self.iter_chunks():
+            yield (values[:, -1, :] if self.mode == "paths" else values), log_weights
+
+    def load(self) -> np.ndarray:
+        """Materializa todos los escenarios en memoria (equivalente a engine.simulations)."""
+        return np.concatenate([np.asarray(values) for values, _ in self.iter_chunks()])
+
+
+class ScenarioStore:
+    """
+    Persistencia de escenarios Monte Carlo para re-uso y análisis what-if.
+    Un set se identifica por key(): parámetros calibrados, configuración de la estrategia,
+    semilla y forma del job. Misma clave = mismos escenarios (streams por bloque canónico),
+    por lo que evaluar pesos o métricas nuevas sobre el set de la mañana es una lectura.
+    """
+
+    MANIFEST = "manifest.json"
+
+    def __init__(self, root_dir: str = None, compress: bool = False):
+        """
+        Args:
+            root_dir: Directorio raíz (default: {DATA_DIR}/scenarios).
+            compress: Chunks .npz comprimidos en lugar de .npy (memory-mappable).
+        """
+        self.root_dir = root_dir or os.path.join(settings.DATA_DIR, "scenarios")
+        self.compress = compress
+
+    @staticmethod
+    def key(strategy, initial_prices: np.ndarray, horizon: int, n_sims: int, seed: int,
+            bit_generator: str, mode: str = "terminal", block_days: int = None) -> str:
+        """
+        Huella SHA-256 del job: parámetros calibrados (get_params), clase, sampler (con sus
+        hiperparámetros, sampler.config()),
+        estimador de covarianza, días por bloque (orden del stream) y precisión de la estrategia,
+        más precios iniciales, horizonte, n_sims, semilla y generador de bits.
+        block_days: Días por bloque del engine (None = STREAM_BLOCK_DAYS de la estrategia).
+        """
+        digest = hashlib.sha256()
+        for name, value in strategy.get_params().items():
+            digest.update(name.encode())
+            digest.update(np.ascontiguousarray(value, dtype=float).tobytes())
+        config = {
+            "model": strategy.__class__.__name__,
+            "sampler": strategy.sampler.config(),
+            "covariance": [strategy.covariance, strategy.n_factors, strategy.shrinkage],
+            "block_days": block_days or strategy.STREAM_BLOCK_DAYS,
+            "dtype": np.dtype(strategy.dtype).name,
+            "initial_prices": np.asarray(initial_prices, dtype=float).tolist(),
+            "horizon": int(horizon), "n_sims": int(n_sims), "seed": int(seed),
+            "bit_generator": bit_generator, "mode": mode,
+        }
+        digest.update(json.dumps(config, sort_keys=True).encode())
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root_dir, key)
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(os.path.join(self._path(key), self.MANIFEST))
+
+    def open(self, key: str) -> ScenarioSet:
+        """Abre un set completo. KeyError si la clave no fue persistida."""
+        try:
+            with open(os.path.join(self._path(key), self.MANIFEST)) as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            raise KeyError(f"Set de escenarios inexistente: {key[:12]}")
+        return ScenarioSet(self._path(key), manifest)
+
+    def keys(self) -> list:
+        """Claves de los sets completos disponibles."""
+        if not os.path.isdir(self.root_dir):
+            return []
+        return sorted(name for name in os.listdir(self.root_dir) if self.exists(name))
+
+    def delete(self, key: str):
+        shutil.rmtree(self._path(key), ignore_errors=True)
+
+    @contextmanager
+    def writer(self, key: str, mode: str, initial_prices: np.ndarray, horizon: int, n_sims: int,
+               weighted: bool = False, metadata: dict = None):
+        """
+        Escritura de un set chunk a chunk: yield write(block_index, values, log_weights=None).
+        write() es thread-safe (un archivo por chunk). Al salir sin errores se escribe el
+        manifest y se publica el set (rename atómico); si ya existía, se conserva el existente.
+        """
+        if mode not in SCENARIO_MODES:
+            raise ValueError(f"Modo de escenarios desconocido: {mode}")
+        os.makedirs(self.root_dir, exist_ok=True)
+        tmp_dir = os.path.join(self.root_dir, f".{key}.{uuid.uuid4().hex[:12]}.tmp")
+        os.makedirs(tmp_dir)
+        chunks = {}
+        lock = threading.Lock()
+
+        def save(name: str, array: np.ndarray):
+            path = os.path.join(tmp_dir, name)
+            if self.compress:
+                np.savez_compressed(path, values=array)
+            else:
+                np.save(path, array, allow_pickle=False)
+
+        def write(block_index: int, values: np.ndarray, log_weights: np.ndarray = None):
+            if weighted and log_weights is None:
+                raise ValueError("Set ponderado: cada chunk necesita sus log_weights.")
+            entry = {"index": int(block_index), "rows": int(len(values)),
+                     "values": _chunk_name("chunk", block_index, self.compress)}
+            save(entry["values"], np.asarray(values))
+            if weighted:
+                entry["log_weights"] = _chunk_name("log_weights", block_index, self.compress)
+                save(entry["log_weights"], np.asarray(log_weights, dtype=float))
+            with lock:
+                chunks[entry["index"]] = entry
+
+        try:
+            yield write
+            manifest = {
+                "key": key, "mode": mode, "horizon": int(horizon), "n_sims": int(n_sims),
+                "initial_prices": np.asarray(initial_prices, dtype=float).tolist(),
+                "weighted": weighted, "compress": self.compress,
+                "created_at": datetime.now().isoformat(),
+                "chunks": [chunks[i] for i in sorted(chunks)],
+                "metadata": metadata or {},
+            }
+            if sum(c["rows"] for c in manifest["chunks"]) != n_sims:
+                raise ValueError("El set de escenarios no cubre todas las simulaciones.")
+            with open(os.path.join(tmp_dir, self.MANIFEST), "w") as f:
+                json.dump(manifest, f)
+            try:
+                os.rename(tmp_dir, self._path(key))
+            except OSError:
+                # Otro proceso publicó la misma clave (mismos escenarios): se conserva el existente
+                if not self.exists(key):
+                    raise
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
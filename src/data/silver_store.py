@@ -0,0 +1,70 @@
+import os
+import glob
+import pandas as pd
+
+# Layout append-only de la Capa Plata (un directorio por ticker):
+#   silver/{ticker}/part-{YYYYMMDD}-{YYYYMMDD}.parquet
+# El rango de fechas va en el nombre: la última fecha almacenada se obtiene
+# listando archivos, sin leer el historial.
+
+PART_PATTERN = "part-*.parquet"
+DATE_FORMAT = "%Y%m%d"
+
+
+def list_parts(ticker_dir: str) -> list:
+    """Partes de un ticker ordenadas cronológicamente (el nombre es ordenable)."""
+    return sorted(glob.glob(os.path.join(ticker_dir, PART_PATTERN)))
+
+
+def last_stored(ticker_dir: str):
+    """(última fecha, último precio) almacenados, o (None, None). Lee solo la última parte."""
+    parts = list_parts(ticker_dir)
+    if not parts:
+        return None, None
+    tail = pd.read_parquet(parts[-1], columns=["price"], engine="pyarrow")
+    return tail.index[-1], float(tail["price"].iloc[-1])
+
+
+def read_silver(ticker_dir: str) -> pd.DataFrame:
+    """Historial completo de un ticker (concatenación de partes)."""
+    parts = list_parts(ticker_dir)
+    if not parts:
+        return pd.DataFrame(columns=["price", "log_return"])
+    frames = [pd.read_parquet(path, engine="pyarrow") for path in parts]
+    if len(frames) == 1:
+        return frames[0]
+    merged = pd.concat(frames)
+    return merged[~merged.index.duplicated(keep="last")]
+
+
+def _write_atomic(df: pd.DataFrame, path: str):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    df.to_parquet(tmp_path, engine="pyarrow", compression="snappy")
+    os.replace(tmp_path, path)
+
+
+def append_part(ticker_dir: str, df: pd.DataFrame) -> str:
+    """Agrega filas nuevas como una parte inmutable. Retorna la ruta escrita."""
+    os.makedirs(ticker_dir, exist_ok=True)
+    name = f"part-{df.index[0].strftime(DATE_FORMAT)}-{df.index[-1].strftime(DATE_FORMAT)}.parquet"
+    path = os.path.join(ticker_dir, name)
+    _write_atomic(df, path)
+    return path
+
+
+def compact(ticker_dir: str) -> int:
+    """
+    Fusiona todas las partes de un ticker en una sola.
+    Escribe primero la parte compactada y luego borra las antiguas: un lector concurrente
+    puede ver filas duplicadas por un instante, nunca filas faltantes (read_silver deduplica).
+    Retorna el número de partes fusionadas.
+    """
+    parts = list_parts(ticker_dir)
+    if len(parts) <= 1:
+        return 0
+    merged = read_silver(ticker_dir)
+    new_path = append_part(ticker_dir, merged)
+    for path in parts:
+        if path != new_path:
+            os.remove(path)
+    return len(parts)
@@ -0,0 +1,55 @@
+import os
+from abc import ABC, abstractmethod
+import pandas as pd
+
+
+class MarketDataSource(ABC):
+    """
+    Interfaz de fuentes de mercado (Strategy intercambiable del MarketDataLoader).
+    Cada fuente retorna el DataFrame crudo de un ticker (índice fecha, columnas OHLC),
+    vacío si no hay datos. Los errores transitorios deben propagarse como excepción
+    para que el loader aplique reintentos con backoff.
+    """
+    name = "abstract"
+
+    @abstractmethod
+    def fetch(self, ticker: str, start, end) -> pd.DataFrame:
+        pass
+
+
+class YahooDataSource(MarketDataSource):
+    """Yahoo Finance vía yfinance (una descarga por ticker, sin MultiIndex)."""
+    name = "yahoo"
+
+    def fetch(self, ticker, start, end):
+        import yfinance as yf
+        return yf.download(ticker, start=start, end=end, progress=False, threads=False)
+
+
+class LocalFileDataSource(MarketDataSource):
+    """
+    Fuente respaldada por archivos locales ({root_dir}/{ticker}.csv o .parquet).
+    Sustituto determinista de Yahoo para tests, backfills y entornos sin red.
+    """
+    name = "local"
+
+    def __init__(self, root_dir: str):
+        self.root_dir = root_dir
+
+    def fetch(self, ticker, start, end):
+        parquet_path = os.path.join(self.root_dir, f"{ticker}.parquet")
+        csv_path = os.path.join(self.root_dir, f"{ticker}.csv")
+        if os.path.exists(parquet_path):
+            df = pd.read_parquet(parquet_path)
+        elif os.path.exists(csv_path):
+            df = pd.read_csv(csv_path, index_col=0, parse_dates=[0])
+        else:
+            return pd.DataFrame()
+
+        # Misma semántica que yf.download: start inclusivo, end exclusivo
+        mask = pd.Series(True, index=df.index)
+        if start is not None:
+            mask &= df.index >= pd.Timestamp(start)
+        if end is not None:
+            mask &= df.index < pd.Timestamp(end)
+        return df[mask.values]
@@ -1,6 +1,12 @@
 from abc import ABC, abstractmethod
+import copy
 import pandas as pd
 import numpy as np
+from src.models.sampling import ShockSampler
+from src.models import jit
+from src.models.covariance import (COVARIANCE_METHODS, DEFAULT_N_FACTORS, cholesky_factor,
+                                   factor_model, sample_covariance)
+from src.models.online import OnlineMoments, cholesky_update
 
 class StochasticModel(ABC):
     """
@@ -9,6 +15,43 @@ class StochasticModel(ABC):
     Cumple con el Principio de Inversión de Dependencias (DIP).
     """
 
+    # Días procesados por iteración en modo streaming.
+    # Acota la memoria pico a O(block_days * n_sims * n_assets).
+    STREAM_BLOCK_DAYS = 21
+
+    # Parámetros calibrados que definen el estado entrenado del modelo.
+    # Se transportan entre procesos (Ray object store) sin re-serializar la estrategia.
+    # chol_matrix es la raíz A de Sigma usada en _correlate(): Cholesky L (n_assets x n_assets)
+    # o cargas B (n_assets x k) del modelo de factores, con idio_vol = d (vacío si es denso).
+    PARAM_NAMES = ("mu", "chol_matrix", "idio_vol", "n_assets")
+    idio_vol = None
+
+    # Estimador de covarianza (ver src/models/covariance.py): "sample" o "factor",
+    # con k = n_factors y shrinkage de Ledoit-Wolf opcional.
+    covariance = "sample"
+    n_factors = DEFAULT_N_FACTORS
+    shrinkage = False
+
+    # Calibración incremental (update(), ver src/models/online.py): ventana móvil con los
+    # días de train(), o EWMA con vida media `halflife` días (también en train()).
+    halflife = None
+    _online = None
+    _online_source = None
+
+    # Derivados de los parámetros, precalculados al calibrar (no se transportan:
+    # set_params() los recalcula).
+    DERIVED_NAMES = ("sigma_sq", "drift")
+    sigma_sq = None
+    drift = None
+
+    # Precisión del kernel de trayectorias completas. np.float32 reduce a la mitad
+    # memoria y ancho de banda (los shocks se generan en float64 y se convierten).
+    dtype = np.float64
+
+    # Backend del modo streaming: "numpy" (vectorizado por bloques) o "numba"
+    # (loop fusionado y paralelo por simulación, ver src/models/jit.py).
+    backend = "numpy"
+
     @abstractmethod
     def train(self, log_returns: pd.DataFrame):
         """
@@ -18,9 +61,406 @@ class StochasticModel(ABC):
         pass
 
     @abstractmethod
-    def simulate(self, initial_prices: np.ndarray, horizon: int, n_sims: int) -> np.ndarray:
+    def simulate(self, initial_prices: np.ndarray, horizon: int, n_sims: int,
+                 rng: np.random.Generator = None) -> np.ndarray:
         """
         Genera trayectorias de precios futuras.
         Debe retornar un array 3D: (n_sims, days, n_assets)
+        rng: Stream aleatorio (numpy Generator). None -> stream nuevo sin semilla.
+        """
+        pass
+
+    # Capa de muestreo de shocks (pseudo-aleatorio, antitético, Sobol...).
+    # Las estrategias concretas la reciben en su constructor.
+    sampler = ShockSampler()
+
+    def _mixing_scale(self, days: int, n_sims: int, rng: np.random.Generator,
+                      sampler: ShockSampler = None, log_weights: np.ndarray = None):
+        """
+        Factor de escala por (día, simulación) para mezclas de normales (ej. cópula t).
+        Retorna None si el modelo es puramente Gaussiano.
+        """
+        return None
+
+    def _sample_shocks(self, days: int, n_sims: int, rng: np.random.Generator,
+                       with_gaussian: bool = False, sampler: ShockSampler = None,
+                       log_weights: np.ndarray = None):
+        """
+        Genera los shocks correlacionados de un bloque temporal desde `rng`.
+        Retorna un array 3D: (days, n_sims, n_assets).
+        Con with_gaussian=True retorna además la componente Gaussiana A·Z
+        (misma Z, sin variable de mezcla), base de la variable de control GBM.
+        sampler: Sampler preparado para esta simulación (default: self.sampler).
+        log_weights: Acumulador (n_sims,) de log-likelihood ratios (muestreo por importancia).
+        """
+        sampler = sampler or self.sampler
+        Z = sampler.normals(rng, days, n_sims, self.n_shocks, log_weights=log_weights)
+
+        # Inducir Correlación: X = Z * A^T (BLAS sobre la vista 2D)
+        gaussian = self._correlate(Z)
+
+        scale = self._mixing_scale(days, n_sims, rng, sampler=sampler, log_weights=log_weights)
+        shocks = gaussian if scale is None else gaussian * scale
+        if with_gaussian:
+            return shocks, gaussian
+        return shocks
+
+    def _simulate_paths(self, initial_prices: np.ndarray, horizon: int, n_sims: int,
+                        rng: np.random.Generator = None) -> np.ndarray:
+        """
+        Kernel fusionado de simulate(): tres buffers del tamaño del resultado
+        (Z, shocks, salida) en lugar de un temporal por operación.
+        - Correlación con un matmul BLAS sobre la vista 2D (days * n_sims, n_assets).
+        - Escala de mezcla, drift, cumsum y exp in-place.
+        - El cumsum escribe directo en el layout (n_sims, days, n_assets) de la interfaz.
+        Consume el stream igual que _sample_shocks(): misma semilla, mismas trayectorias.
+        Los samplers ponderados no aplican: el tensor no lleva likelihood ratios.
+        """
+        if getattr(self, "chol_matrix", None) is None:
+            raise ValueError("El modelo no ha sido entrenado. Ejecute .train() primero.")
+        if self.sampler.weighted:
+            raise ValueError(f"El sampler '{self.sampler.name}' requiere pesos: el tensor de trayectorias "
+                             "no los lleva. Use simulate_streaming() (modo terminal / PnL).")
+
+        rng = rng if rng is not None else np.random.default_rng()
+        dtype = self.dtype
+        n_assets = self.n_assets
+
+        # 1-2. Shocks Z ~ N(0, I) correlacionados: X = Z * A^T
+        Z = self.sampler.normals(rng, horizon, n_sims, self.n_shocks).astype(dtype, copy=False)
+        shocks = np.empty((horizon, n_sims, n_assets), dtype=dtype)
+        self._correlate(Z, out=shocks)
+        del Z
+
+        # Variable de mezcla (cópula t): T = X / sqrt(W / nu)
+        scale = self._mixing_scale(horizon, n_sims, rng)
+        if scale is not None:
+            shocks *= scale
+
+        # 3. Trayectorias: S_t = S_0 * exp(sum (drift + shocks))
+        shocks += self._daily_drift()
+        paths = np.empty((n_sims, horizon, n_assets), dtype=dtype)
+        np.cumsum(shocks, axis=0, out=paths.transpose(1, 0, 2))
+        del shocks
+        np.exp(paths, out=paths)
+        paths *= np.asarray(initial_prices, dtype=dtype)
+        return paths
+
+    @property
+    def n_shocks(self) -> int:
+        """Normales estándar por (día, simulación): n_assets (Cholesky) o k + n_assets (factores)."""
+        return self.chol_matrix.shape[1] + len(self.idio_vol)
+
+    def _correlate(self, Z: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+        """
+        Induce la correlación: X = Z * A^T con A A^T = Sigma.
+        - Denso: A = L (Cholesky), un matmul O(n_assets²) por trayectoria-día.
+        - Factores: Z = [Z_factores | Z_idiosincráticos] y X = Z_f * B^T + Z_e * d,
+          O(n_assets * k) por trayectoria-día.
+
+        Args:
+            Z: Normales (..., n_shocks).
+            out: Buffer contiguo opcional (..., n_assets) para el resultado.
+        Retorna: shocks correlacionados (..., n_assets).
+        """
+        flat = Z.reshape(-1, Z.shape[-1])
+        loadings = self.chol_matrix.astype(Z.dtype, copy=False)
+        k = loadings.shape[1]
+        idiosyncratic = len(self.idio_vol) > 0
+        result = np.matmul(flat[:, :k] if idiosyncratic else flat, loadings.T,
+                           out=None if out is None else out.reshape(-1, self.n_assets))
+        if idiosyncratic:
+            result += flat[:, k:] * self.idio_vol.astype(Z.dtype, copy=False)
+        return result.reshape(Z.shape[:-1] + (self.n_assets,))
+
+    def shock_exposure(self, exposure: np.ndarray) -> np.ndarray:
+        """
+        Sensibilidad de sum_i e_i X_i a cada shock estándar: A^T e (layout de Z en _correlate).
+        La usa el muestreo por importancia para orientar el desplazamiento de media.
+        """
+        direction = self.chol_matrix.T @ exposure
+        if len(self.idio_vol):
+            direction = np.concatenate([direction, self.idio_vol * exposure])
+        return direction
+
+    def _fit_covariance(self, log_returns: pd.DataFrame):
+        """
+        Calibra la raíz de Sigma según self.covariance (ver src/models/covariance.py):
+        - "sample": Cholesky de la covarianza muestral (Ledoit-Wolf con shrinkage=True).
+        - "factor": n_factors componentes principales + varianza idiosincrática diagonal,
+          bien condicionada aunque haya más activos que días de historia.
+        """
+        if self.covariance not in COVARIANCE_METHODS:
+            raise ValueError(f"Estimador de covarianza desconocido: {self.covariance}")
+        if self.covariance == "factor":
+            loadings, idio_var = factor_model(log_returns.to_numpy(dtype=float), self.n_factors,
+                                              shrinkage=self.shrinkage)
+            self.chol_matrix, self.idio_vol = loadings, np.sqrt(idio_var)
+            return
+        if self.shrinkage:
+            cov_matrix = sample_covariance(log_returns.to_numpy(dtype=float), shrinkage=True)
+        else:
+            cov_matrix = log_returns.cov().values
+        self.chol_matrix, self.idio_vol = cholesky_factor(cov_matrix), np.empty(0)
+
+    def _fit_moments(self, log_returns: pd.DataFrame):
+        """
+        Calibra mu y la raíz de Sigma, y deja listo el estado de update().
+        Sin halflife: media muestral + _fit_covariance(). Con halflife: media y
+        covarianza EWMA (solo estimador "sample" sin shrinkage).
+        """
+        if self.halflife is None:
+            self.mu = log_returns.mean().values
+            self._fit_covariance(log_returns)
+            self._track_online(log_returns)
+            return
+        if self.covariance != "sample" or self.shrinkage:
+            raise ValueError("El EWMA (halflife) requiere covariance='sample' sin shrinkage.")
+        moments = OnlineMoments.from_returns(log_returns.to_numpy(dtype=float), halflife=self.halflife)
+        self.mu = moments.mean.copy()
+        self.chol_matrix, self.idio_vol = cholesky_factor(moments.cov), np.empty(0)
+        self._track_online(log_returns, moments)
+
+    def _fit_tail(self, log_returns: pd.DataFrame):
+        """Parámetros de cola (ej. nu de la t-Student). El modelo normal no tiene."""
+
+    def _track_online(self, log_returns: pd.DataFrame, moments: OnlineMoments = None):
+        """
+        Registra la ventana de calibración para update(). Los momentos en línea se
+        construyen recién en la primera actualización (train() no paga ese costo).
+        """
+        self._online = moments
+        self._online_source = None if moments is not None else log_returns
+
+    def update(self, new_returns, window: pd.DataFrame = None):
+        """
+        Recalibración incremental con días nuevos (filas con las columnas de train()):
+        O(n_assets²) por día en lugar de O(T * n_assets² + n_assets³).
+        - mu y Sigma: ventana móvil (entra el día nuevo, sale el más antiguo) o EWMA.
+        - Cholesky denso: update/downdate rank-one; si el downdate pierde la definición
+          positiva se refactoriza la covarianza en línea.
+        - Factores o shrinkage: se re-estiman sobre la ventana móvil (sin rank-one).
+        - Parámetros de cola (nu): solo cambian si se entrega `window` (_fit_tail()).
+        Los arrays calibrados se reemplazan, nunca se modifican in-place: pueden estar
+        compartidos con la caché de calibraciones.
+
+        Args:
+            new_returns: DataFrame o array (días, n_assets) de log-retornos nuevos.
+            window: Ventana completa ya desplazada (incluye new_returns). Si se entrega,
+                    la cola se re-estima sobre ella, como lo haría train().
+        """
+        if getattr(self, "chol_matrix", None) is None:
+            raise ValueError("El modelo no ha sido entrenado. Ejecute .train() primero.")
+        if self._online is None and self._online_source is None:
+            raise ValueError("update() requiere la ventana de train() (no basta con set_params()).")
+
+        if isinstance(new_returns, pd.DataFrame):
+            rows = new_returns.to_numpy(dtype=float)
+        else:
+            rows = np.atleast_2d(np.asarray(new_returns, dtype=float))
+        if rows.shape[1] != self.n_assets:
+            raise ValueError(f"Se esperaban {self.n_assets} activos por día, se recibieron {rows.shape[1]}.")
+
+        if self._online is None:
+            source = self._online_source
+            self._online = OnlineMoments.from_returns(source.to_numpy(dtype=float), window=len(source),
+                                                      halflife=self.halflife)
+            self._online_source = None
+        moments = self._online
+
+        rank_one = self.covariance == "sample" and not self.shrinkage
+        chol = self.chol_matrix
+        for x in rows:
+            steps = moments.update(x)
+            if not rank_one or chol is None:
+                continue
+            if steps is None:
+                # Ventana demasiado corta para expresarlo como rank-one: refactorización al final
+                chol = None
+                continue
+            try:
+                for scale, coef, v in steps:
+                    chol = cholesky_update(chol * np.sqrt(scale), np.sqrt(abs(coef)) * v, downdate=coef < 0)
+            except np.linalg.LinAlgError:
+                chol = None
+
+        if rank_one:
+            self.chol_matrix = chol if chol is not None else cholesky_factor(moments.cov)
+        else:
+            self._fit_covariance(pd.DataFrame(moments.window_returns()))
+        self.mu = moments.mean.copy()
+        if window is not None:
+            self._fit_tail(window)
+        self._set_derived()
+        print(f"🔄 [Strategy] Recalibración incremental: {len(rows)} día(s) nuevo(s), "
+              f"ventana de {moments.count} días.")
+        return self
+
+    def _set_derived(self):
+        """Precalcula sigma^2 y el drift de Itô (llamado al calibrar o restaurar parámetros)."""
+        if getattr(self, "chol_matrix", None) is None:
+            self.sigma_sq = self.drift = None
+            return
+        self.sigma_sq = np.einsum('ij,ij->i', self.chol_matrix, self.chol_matrix)
+        if len(self.idio_vol):
+            self.sigma_sq = self.sigma_sq + self.idio_vol ** 2
+        self.drift = self.mu - 0.5 * self.sigma_sq
+
+    def get_params(self) -> dict:
+        """Exporta los parámetros calibrados (arrays NumPy) como diccionario plano."""
+        return {name: getattr(self, name) for name in self.PARAM_NAMES}
+
+    def set_params(self, params: dict):
+        """Restaura un estado entrenado previamente exportado con get_params()."""
+        for name in self.PARAM_NAMES:
+            setattr(self, name, params[name])
+        self._set_derived()
+        # Parámetros externos: el estado en línea de un train() previo ya no corresponde
+        self._online = self._online_source = None
+        return self
+
+    def without_params(self) -> "StochasticModel":
+        """
+        Copia liviana de la estrategia sin parámetros calibrados.
+        Conserva la configuración (hiperparámetros) para instanciar workers remotos.
+        """
+        blank = copy.copy(self)
+        for name in self.PARAM_NAMES + self.DERIVED_NAMES:
+            setattr(blank, name, None)
+        blank._online = blank._online_source = None
+        return blank
+
+    def _daily_drift(self) -> np.ndarray:
+        """Drift diario de Itô: mu - 0.5 * sigma^2 (precalculado en train)."""
+        if self.drift is None:
+            self._set_derived()
+        return self.drift
+
+    def expected_gbm_terminal(self, initial_prices: np.ndarray, horizon: int) -> np.ndarray:
+        """E[S_T] analítico bajo la dinámica GBM calibrada: S0 * exp(mu * T)."""
+        return np.asarray(initial_prices, dtype=float) * np.exp(self.mu * horizon)
+
+    def _stream_blocks(self, horizon: int, block_days: int, cuts=()) -> list:
+        """
+        Bloques temporales (start, days) del modo streaming.
+        cuts: días adicionales donde termina un bloque (checkpoints de evaluación),
+        de modo que el acumulador de log-precios coincide con ese día al cerrar el bloque.
+        """
+        ends = set(range(block_days, horizon, block_days)) | {int(c) for c in cuts if 0 < c < horizon}
+        ends = sorted(ends | {horizon})
+        return [(start, end - start) for start, end in zip([0] + ends[:-1], ends)]
+
+    def simulate_streaming(self, initial_prices: np.ndarray, horizon: int, n_sims: int,
+                           output: str = "terminal", weights: np.ndarray = None,
+                           block_days: int = None, rng: np.random.Generator = None,
+                           control: bool = False, log_weights: np.ndarray = None,
+                           checkpoints=None):
         """
-        pass
\ No newline at end of file
+        Modo streaming: recorre el horizonte en bloques temporales manteniendo
+        solo un acumulador de log-precios (n_sims, n_assets).
+        Nunca materializa el tensor completo de trayectorias.
+        Con backend "numba" cada bloque se procesa con el kernel fusionado de
+        src/models/jit.py (mismo stream aleatorio; la variable de control usa NumPy).
+
+        Args:
+            output: "terminal"    -> precios al final del horizonte (n_sims, n_assets)
+                    "portfolio"   -> valor del portafolio por día (n_sims, horizon)
+                    "checkpoints" -> valor del portafolio solo en los días de `checkpoints`
+                                     (n_sims, len(checkpoints)), en el orden recibido
+            weights: Unidades por activo para los modos "portfolio" y "checkpoints"
+                     (default: 1 c/u, equivalente al equiponderado por precio de RiskReporter).
+            block_days: Días por bloque (default: STREAM_BLOCK_DAYS).
+            rng: Stream aleatorio (numpy Generator). Con block_days >= horizon se
+                 consume el stream igual que simulate(): misma semilla, mismos precios.
+            control: Solo modo "terminal". Retorna además los precios terminales GBM
+                     generados con las mismas Z (variable de control con media analítica
+                     expected_gbm_terminal()): (terminal, control_terminal).
+            log_weights: Array (n_sims,) donde se acumula in-place el log-likelihood ratio
+                         de samplers ponderados (ImportanceSampler). Ignorado si es None.
+            checkpoints: Días de evaluación (1..horizon) del modo "checkpoints". Con samplers
+                         streaming los bloques se cortan en esos días: el checkpoint menor
+                         consume el stream igual que una corrida con ese horizonte (salvo
+                         ImportanceSampler, cuyo desplazamiento se orienta a `horizon`).
+        """
+        if getattr(self, "chol_matrix", None) is None:
+            raise ValueError("El modelo no ha sido entrenado. Ejecute .train() primero.")
+        if output not in ("terminal", "portfolio", "checkpoints"):
+            raise ValueError(f"Modo de salida desconocido: {output}")
+        if control and output != "terminal":
+            raise ValueError("La variable de control solo está disponible en modo 'terminal'.")
+        if output == "checkpoints":
+            checkpoints = np.asarray(checkpoints if checkpoints is not None else [horizon], dtype=int)
+            if checkpoints.size == 0 or checkpoints.min() < 1 or checkpoints.max() > horizon:
+                raise ValueError(f"Los checkpoints deben estar entre 1 y {horizon} días.")
+
+        initial_prices = np.asarray(initial_prices, dtype=float)
+        block_days = block_days or self.STREAM_BLOCK_DAYS
+        sampler = self.sampler.prepare(self, initial_prices, horizon, weights)
+        cuts = checkpoints if output == "checkpoints" else ()
+        if not sampler.supports_streaming:
+            # QMC + puente Browniano necesita la trayectoria completa
+            block_days, cuts = horizon, ()
+        blocks = self._stream_blocks(horizon, block_days, cuts)
+        rng = rng if rng is not None else np.random.default_rng()
+        drift = self._daily_drift()
+
+        # Acumulador de log-retornos: único estado que sobrevive entre bloques
+        log_acc = np.zeros((n_sims, self.n_assets))
+        control_acc = np.zeros((n_sims, self.n_assets)) if control else None
+
+        if output in ("portfolio", "checkpoints"):
+            units = np.ones(self.n_assets) if weights is None else np.asarray(weights, dtype=float)
+            exposure = units * initial_prices
+        if output == "portfolio":
+            portfolio = np.empty((n_sims, horizon))
+        if output == "checkpoints":
+            values = np.empty((n_sims, len(checkpoints)))
+
+        if self.backend == "numba" and not control and (output != "checkpoints" or len(cuts)):
+            # Kernel JIT: mismos números aleatorios que NumPy, sin tensores intermedios.
+            # Checkpoints: cada uno cierra un bloque, se leen del acumulador.
+            kernel_exposure = exposure if output == "portfolio" else np.empty(0)
+            portfolio = portfolio if output == "portfolio" else np.empty((0, 0))
+            chol = np.ascontiguousarray(self.chol_matrix, dtype=float)
+            idio = np.ascontiguousarray(self.idio_vol, dtype=float)
+            for start, days in blocks:
+                Z = np.ascontiguousarray(sampler.normals(rng, days, n_sims, self.n_shocks, log_weights=log_weights))
+                scale = self._mixing_scale(days, n_sims, rng, sampler=sampler, log_weights=log_weights)
+                scale = np.empty((0, 0)) if scale is None else np.ascontiguousarray(scale[..., 0])
+                jit.advance_block(Z, scale, chol, idio, drift, log_acc, kernel_exposure, portfolio, start)
+                if output == "checkpoints":
+                    hits = np.flatnonzero(checkpoints == start + days)
+                    if hits.size:
+                        values[:, hits] = (np.exp(log_acc) @ exposure)[:, None]
+            if output == "terminal":
+                return initial_prices * np.exp(log_acc)
+            return portfolio if output == "portfolio" else values
+
+        for start, days in blocks:
+            # Bloque (days, n_sims, n_assets): difusión + drift acumulados in-place
+            if control:
+                block, gaussian = self._sample_shocks(days, n_sims, rng, with_gaussian=True,
+                                                      sampler=sampler, log_weights=log_weights)
+                control_acc += gaussian.sum(axis=0) + days * drift
+            else:
+                block = self._sample_shocks(days, n_sims, rng, sampler=sampler, log_weights=log_weights)
+            block += drift
+            np.cumsum(block, axis=0, out=block)
+            block += log_acc
+            log_acc = block[-1].copy()
+
+            if output == "portfolio":
+                np.exp(block, out=block)
+                # V_t = sum_j w_j * S0_j * exp(X_tj)
+                portfolio[:, start:start + days] = (block @ exposure).T
+            elif output == "checkpoints":
+                # Solo los días evaluados pasan a precios: O(n_sims * n_assets) por checkpoint
+                for i in np.flatnonzero((checkpoints > start) & (checkpoints <= start + days)):
+                    values[:, i] = np.exp(block[checkpoints[i] - start - 1]) @ exposure
+
+        if output == "terminal":
+            terminal = initial_prices * np.exp(log_acc)
+            if control:
+                return terminal, initial_prices * np.exp(control_acc)
+            return terminal
+        return portfolio if output == "portfolio" else values
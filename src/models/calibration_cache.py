@@ -0,0 +1,85 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from src.config.settings import settings
+
+
+class CalibrationCache:
+    """
+    Caché de calibraciones direccionada por contenido.
+    Clave = hash(datos + clase del modelo + hiperparámetros): si los datos no cambian,
+    recalibrar cuesta O(hash) en lugar de O(MLE * n_assets).
+
+    Dos niveles:
+    - Memoria: LRU acotado (compartido por los requests del proceso).
+    - Disco: un .npz por clave bajo {DATA_DIR}/cache/calibration (sobrevive reinicios).
+    """
+
+    def __init__(self, cache_dir: str = None, max_entries: int = 256):
+        self.cache_dir = cache_dir or os.path.join(settings.DATA_DIR, "cache", "calibration")
+        self.max_entries = max_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+    # --- Serialización (Ray / multiprocessing): el nivel en memoria no viaja ---
+    def __getstate__(self):
+        return {"cache_dir": self.cache_dir, "max_entries": self.max_entries}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    @staticmethod
+    def fingerprint(data, **hyperparams) -> str:
+        """
+        Huella SHA-256 de un DataFrame/Series (valores + fechas + columnas) y metadatos.
+        hash_pandas_object es vectorizado: O(n) sin copiar a Python.
+        """
+        digest = hashlib.sha256()
+        digest.update(pd.util.hash_pandas_object(data, index=True).values.tobytes())
+        columns = list(data.columns) if isinstance(data, pd.DataFrame) else [data.name]
+        digest.update(json.dumps([str(c) for c in columns]).encode())
+        digest.update(json.dumps(hyperparams, sort_keys=True, default=str).encode())
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.npz")
+
+    def _remember(self, key: str, params: dict):
+        with self._lock:
+            self._memory[key] = params
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def get(self, key: str):
+        """Retorna los parámetros cacheados o None. Un hit en disco se promueve a memoria."""
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                params = {name: (data[name].item() if data[name].ndim == 0 else data[name])
+                          for name in data.files}
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Caché de calibración corrupta ({key[:12]}): {str(e)}")
+            return None
+
+        self._remember(key, params)
+        return params
+
+    def put(self, key: str, params: dict):
+        """Guarda en ambos niveles. La escritura en disco es atómica (tmp + rename)."""
+        self._remember(key, params)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = f"{self._path(key)}.{os.getpid()}.{threading.get_ident()}.tmp.npz"
+        np.savez(tmp_path, **{name: np.asarray(value) for name, value in params.items()})
+        os.replace(tmp_path, self._path(key))
@@ -0,0 +1,104 @@
+import numpy as np
+
+# Estimadores de la matriz de covarianza de las estrategias
+#   "sample": covarianza muestral + Cholesky denso (O(n_assets²) por trayectoria-día)
+#   "factor": k componentes principales + varianza idiosincrática diagonal (O(n_assets * k))
+COVARIANCE_METHODS = ("sample", "factor")
+
+DEFAULT_N_FACTORS = 10
+
+# Regularización del Cholesky denso cuando la covarianza no es definida positiva
+JITTER = 1e-6
+
+# Piso de la varianza idiosincrática (fracción de la varianza total de cada activo):
+# mantiene Sigma = B B^T + diag(d^2) definida positiva aunque los factores expliquen todo
+IDIO_FLOOR = 1e-4
+
+
+def _centered(X: np.ndarray) -> np.ndarray:
+    X = np.asarray(X, dtype=float)
+    return X - X.mean(axis=0)
+
+
+def ledoit_wolf_intensity(X: np.ndarray) -> float:
+    """
+    Intensidad de shrinkage de Ledoit-Wolf (2004) hacia mu * I (mu = varianza promedio).
+    Se calcula con la matriz de Gram (T x T): O(T² n_assets) sin formar la covarianza
+    n_assets x n_assets, por lo que sirve también para universos mayores que la ventana.
+
+    Args:
+        X: Matriz (T, n_assets) de retornos.
+    Retorna: delta en [0, 1] (0 = covarianza muestral, 1 = objetivo diagonal).
+    """
+    Xc = _centered(X)
+    n_obs, n_assets = Xc.shape
+    c = n_obs - 1
+    gram = Xc @ Xc.T
+    gram_sq = np.einsum('ij,ij->', gram, gram)
+
+    s_sq = gram_sq / c ** 2                 # ||S||_F^2
+    mu = np.trace(gram) / c / n_assets
+    d_sq = s_sq - n_assets * mu ** 2        # ||S - mu I||_F^2
+    if d_sq <= 0:
+        return 0.0
+    # sum_t ||x_t x_t^T - S||_F^2 = sum_t G_tt^2 - 2 sum_t x_t^T S x_t + T ||S||_F^2
+    b_sq = (np.sum(np.diag(gram) ** 2) - 2.0 * gram_sq / c + n_obs * s_sq) / n_obs ** 2
+    return float(np.clip(min(b_sq, d_sq) / d_sq, 0.0, 1.0))
+
+
+def sample_covariance(X: np.ndarray, shrinkage: bool = False) -> np.ndarray:
+    """
+    Covarianza muestral (ddof=1, igual que DataFrame.cov()).
+    Con shrinkage=True: (1 - delta) S + delta mu I (Ledoit-Wolf), bien condicionada
+    aunque haya más activos que observaciones.
+    """
+    Xc = _centered(X)
+    cov = Xc.T @ Xc / (Xc.shape[0] - 1)
+    if shrinkage:
+        delta = ledoit_wolf_intensity(Xc)
+        mu = np.trace(cov) / cov.shape[0]
+        cov *= 1.0 - delta
+        cov[np.diag_indices_from(cov)] += delta * mu
+    return cov
+
+
+def cholesky_factor(cov: np.ndarray) -> np.ndarray:
+    """Cholesky L (L L^T = cov); regulariza con JITTER si la matriz no es definida positiva."""
+    try:
+        return np.linalg.cholesky(cov)
+    except np.linalg.LinAlgError:
+        print("⚠️ Advertencia: Regularizando matriz de covarianza.")
+        return np.linalg.cholesky(cov + np.eye(len(cov)) * JITTER)
+
+
+def factor_model(X: np.ndarray, n_factors: int = DEFAULT_N_FACTORS, shrinkage: bool = False):
+    """
+    Modelo de factores estadísticos: Sigma = B B^T + diag(d^2).
+    - B (n_assets, k): cargas de los k componentes principales (B = V_k sqrt(lambda_k)).
+    - d^2 (n_assets,): varianza residual de cada activo (con piso IDIO_FLOOR).
+    Los componentes salen de la SVD de los retornos (T x n_assets): O(T² n_assets),
+    sin formar ni factorizar la matriz densa.
+
+    Args:
+        X: Matriz (T, n_assets) de retornos.
+        n_factors: k (se acota a min(n_assets, T) - 1).
+        shrinkage: Aplica Ledoit-Wolf antes de separar factores (mismos vectores propios,
+                   autovalores y varianzas contraídos hacia la varianza promedio).
+    Retorna: (loadings (n_assets, k), idio_var (n_assets,))
+    """
+    Xc = _centered(X)
+    n_obs, n_assets = Xc.shape
+    k = max(1, min(n_factors, n_assets - 1, n_obs - 1))
+
+    _, singular, Vt = np.linalg.svd(Xc, full_matrices=False)
+    eigvals = singular[:k] ** 2 / (n_obs - 1)
+    variances = np.einsum('ij,ij->j', Xc, Xc) / (n_obs - 1)
+    if shrinkage:
+        delta = ledoit_wolf_intensity(Xc)
+        mu = variances.mean()
+        eigvals = (1.0 - delta) * eigvals + delta * mu
+        variances = (1.0 - delta) * variances + delta * mu
+
+    loadings = Vt[:k].T * np.sqrt(eigvals)
+    idio_var = np.maximum(variances - np.einsum('ij,ij->i', loadings, loadings), IDIO_FLOOR * variances)
+    return loadings, idio_var
@@ -1,70 +1,218 @@
 import ray
 import numpy as np
 from src.models.base import StochasticModel
+from src.models import random_streams
+from src.utils.reporter import RiskReporter
+from src.utils.risk_stats import DEFAULT_CONFIDENCES, TailBuffer, format_metrics
 
 @ray.remote
 class RiskWorker:
     """
     ACTOR DISTRIBUIDO (Ray)
     Este componente vive en un proceso separado (Quantum Arquitectónico).
-    Mantiene su propia copia de la estrategia y estado.
+    Recibe una estrategia SIN parámetros (solo configuración) una única vez;
+    los parámetros calibrados llegan por referencia desde el Object Store.
     """
     def __init__(self, strategy: StochasticModel):
         self.strategy = strategy
+        self.params_version = None
 
-    def run_simulation_chunk(self, current_prices: np.ndarray, horizon: int, n_sims: int):
+    def _sync_params(self, params: dict, version: int):
         """
-        Ejecuta una fracción del total de simulaciones.
+        Ray resuelve la ObjectRef a arrays de solo lectura en memoria compartida
+        (zero-copy). Solo re-asignamos si el driver re-entrenó el modelo.
         """
+        if version != self.params_version:
+            self.strategy.set_params(params)
+            self.params_version = version
+
+    def run_simulation_chunk(self, params: dict, version: int, current_prices: np.ndarray,
+                             horizon: int, blocks: list, seed: int, bit_generator: str):
+        """
+        Ejecuta una fracción del total de simulaciones (tensor completo).
+        blocks: [(block_index, n_sims), ...] cada uno con su stream derivado de `seed`.
+        """
+        self._sync_params(params, version)
         # Delega a la estrategia (que ya contiene la lógica matemática)
-        return self.strategy.simulate(current_prices, horizon, n_sims)
+        simulate_fn = lambda count, rng: self.strategy.simulate(current_prices, horizon, count, rng=rng)
+        return random_streams.run_blocks(simulate_fn, blocks, seed, bit_generator)
+
+    def run_pnl_chunk(self, params: dict, version: int, current_prices: np.ndarray,
+                      horizon: int, blocks: list, seed: int, bit_generator: str, block_days: int = None):
+        """
+        Simula en modo streaming y reduce localmente a escenarios de PnL.
+        Solo un vector (n_sims,) cruza la red hacia el Driver
+        (o (n_sims, 2) con el log-peso si el sampler es ponderado).
+        block_days: Días por bloque streaming del Driver (None = el de la estrategia).
+        """
+        self._sync_params(params, version)
+        weighted = self.strategy.sampler.weighted
+
+        def simulate_fn(count, rng):
+            log_weights = np.zeros(count) if weighted else None
+            terminal_prices = self.strategy.simulate_streaming(
+                current_prices, horizon, count, output="terminal", block_days=block_days, rng=rng,
+                log_weights=log_weights)
+            pnl = RiskReporter.compute_terminal_pnl(terminal_prices, current_prices)
+            return np.column_stack([pnl, log_weights]) if weighted else pnl
+
+        return random_streams.run_blocks(simulate_fn, blocks, seed, bit_generator)
+
+    def run_tail_chunk(self, params: dict, version: int, current_prices: np.ndarray,
+                       horizon: int, blocks: list, seed: int, bit_generator: str,
+                       tail_prob: float, total_sims: int, block_days: int = None):
+        """
+        Reduce el chunk a un TailBuffer: solo los peores escenarios necesarios
+        para el nivel más extremo cruzan la red (estadísticos parciales combinables).
+        """
+        pnl = self.run_pnl_chunk(params, version, current_prices, horizon, blocks, seed, bit_generator,
+                                 block_days)
+        weighted = self.strategy.sampler.weighted
+        buffer = TailBuffer(tail_prob, total_sims, weighted=weighted)
+        if weighted:
+            return buffer.update(pnl[:, 0], np.exp(pnl[:, 1]))
+        return buffer.update(pnl)
 
 class DistributedMonteCarlo:
     """
     Orquestador del Clúster (Driver).
     Divide el trabajo y recolecta resultados (Map-Reduce).
+    El pool de actores se crea una sola vez y se reutiliza entre llamadas.
     """
-    def __init__(self, strategy: StochasticModel, n_workers: int = 4):
+    def __init__(self, strategy: StochasticModel, n_workers: int = 4, seed: int = None,
+                 bit_generator: str = random_streams.DEFAULT_BIT_GENERATOR, block_days: int = None):
         self.strategy = strategy
         self.n_workers = n_workers
-        
+        # Días por bloque streaming (None = STREAM_BLOCK_DAYS de la estrategia), igual que MonteCarloEngine
+        self.block_days = block_days
+
+        # Reproducibilidad: los streams dependen de (seed, bloque), no del worker
+        self.seed = seed
+        self.bit_generator = bit_generator
+        self.last_seed = None
+        self.weights = None
+
+        # Estado del pool persistente (creación perezosa)
+        self.workers = None
+        self.params_ref = None
+        self.params_version = 0
+
         # Inicializar Ray (si no está corriendo ya)
         if not ray.is_initialized():
             ray.init(ignore_reinit_error=True)
 
     def train(self, log_returns):
         # El entrenamiento es rápido, se hace en el Driver (centralizado)
-        # y luego se envia la estrategia entrenada a los workers.
+        # y luego se publican los parámetros en el Object Store (una vez).
         self.strategy.train(log_returns)
+        self._broadcast_params()
+
+    def update(self, new_returns, window=None):
+        # Recalibración incremental en el Driver; los workers reciben la nueva versión
+        self.strategy.update(new_returns, window=window)
+        self._broadcast_params()
+        return self
+
+    def _broadcast_params(self):
+        """Publica mu / chol_matrix / nu en el Object Store con ray.put (una sola copia)."""
+        self.params_ref = ray.put(self.strategy.get_params())
+        self.params_version += 1
+
+    def _ensure_pool(self):
+        """Crea los actores la primera vez; las llamadas siguientes los reutilizan."""
+        if self.workers is None:
+            blank_strategy = self.strategy.without_params()
+            self.workers = [RiskWorker.remote(blank_strategy) for _ in range(self.n_workers)]
+        if self.params_ref is None:
+            # Estrategia entrenada fuera del engine: publicamos sus parámetros ahora
+            self._broadcast_params()
+
+    def _shard_blocks(self, total_sims: int):
+        """
+        Divide el trabajo (Sharding) en bloques canónicos de simulaciones.
+        Cada bloque lleva su propio stream, así que el reparto no altera el resultado.
+        """
+        blocks = random_streams.stream_blocks(total_sims)
+        return random_streams.split_blocks(blocks, self.n_workers)
+
+    def _map(self, method_name: str, current_prices: np.ndarray, horizon: int, total_sims: int,
+             *extra_args):
+        """Lanza tareas asíncronas (Non-blocking) y espera a todos (Barrier)."""
+        self._ensure_pool()
+
+        # Los precios también viajan una sola vez por el Object Store
+        prices_ref = ray.put(np.asarray(current_prices, dtype=float))
+
+        self.last_seed = random_streams.resolve_seed(self.seed)
 
-    def simulate(self, current_prices: np.ndarray, horizon: int, total_sims: int):
-        print(f"⚡ [Ray] Distribuyendo {total_sims} sims entre {self.n_workers} workers...")
-        
-        # 1. Instanciar Actores (Workers)
-        # copia la estrategia YA ENTRENADA a cada worker
-        workers = [RiskWorker.remote(self.strategy) for _ in range(self.n_workers)]
-        
-        # 2. Dividir trabajo (Sharding)
-        sims_per_worker = total_sims // self.n_workers
-        remainder = total_sims % self.n_workers
-        
-        # 3. Lanzar tareas asíncronas (Non-blocking)
         futures = []
-        for i, worker in enumerate(workers):
-            # El último worker se lleva el resto si la división no es exacta
-            count = sims_per_worker + (remainder if i == self.n_workers - 1 else 0)
-            
+        for worker, blocks in zip(self.workers, self._shard_blocks(total_sims)):
+            if not blocks:
+                continue
+            method = getattr(worker, method_name)
             # .remote() devuelve un Future (ObjectID) inmediatamente
-            future = worker.run_simulation_chunk.remote(current_prices, horizon, count)
-            futures.append(future)
+            futures.append(method.remote(self.params_ref, self.params_version, prices_ref, horizon,
+                                         blocks, self.last_seed, self.bit_generator, *extra_args))
 
-        # 4. Barrier Synchronization (Esperar a todos)
         # ray.get() bloquea hasta que los resultados estén listos
-        results_list = ray.get(futures)
-        
-        # 5. Reducción (Merge de resultados)
+        return ray.get(futures)
+
+    def simulate(self, current_prices: np.ndarray, horizon: int, total_sims: int):
+        """Tensor completo (n_sims, horizon, assets). Costoso: preferir simulate_pnl()."""
+        print(f"⚡ [Ray] Distribuyendo {total_sims} sims entre {self.n_workers} workers...")
+
+        results_list = self._map("run_simulation_chunk", current_prices, horizon, total_sims)
+
+        # Reducción (Merge de resultados)
         # Concatena los arrays (n_sims, horizon, assets) a lo largo del eje 0
         final_simulation = np.concatenate(results_list, axis=0)
-        
+
         print(f"✅ [Ray] Fusión completada. Tensor final: {final_simulation.shape}")
-        return final_simulation
\ No newline at end of file
+        return final_simulation
+
+    def simulate_pnl(self, current_prices: np.ndarray, horizon: int, total_sims: int):
+        """
+        Map-Reduce liviano: cada worker reduce su chunk a escenarios de PnL.
+        Retorna un vector (total_sims,) listo para RiskReporter.calculate_metrics().
+        Con un sampler ponderado, los likelihood ratios quedan en self.weights.
+        """
+        print(f"⚡ [Ray] Distribuyendo {total_sims} sims (reducción PnL local) entre {self.n_workers} workers...")
+
+        results_list = self._map("run_pnl_chunk", current_prices, horizon, total_sims, self.block_days)
+        pnl_scenarios = np.concatenate(results_list)
+
+        self.weights = None
+        if self.strategy.sampler.weighted:
+            self.weights = np.exp(pnl_scenarios[:, 1])
+            pnl_scenarios = pnl_scenarios[:, 0]
+
+        print(f"✅ [Ray] Reducción completada. Escenarios PnL: {pnl_scenarios.shape}")
+        return pnl_scenarios
+
+    def simulate_risk(self, current_prices: np.ndarray, horizon: int, total_sims: int,
+                      confidences=DEFAULT_CONFIDENCES):
+        """
+        Map-Reduce de estadísticos: cada worker envía solo su cola (TailBuffer) y el
+        Driver la combina. Retorna las métricas VaR/CVaR ('VaR 95%', 'CVaR 95%', ...).
+        Con muestreo por importancia las métricas ya vienen ponderadas.
+        """
+        print(f"⚡ [Ray] Distribuyendo {total_sims} sims (reducción de cola) entre {self.n_workers} workers...")
+
+        tail_prob = max(1 - c for c in confidences)
+        partials = self._map("run_tail_chunk", current_prices, horizon, total_sims, tail_prob, total_sims,
+                             self.block_days)
+
+        merged = partials[0]
+        for partial in partials[1:]:
+            merged.merge(partial)
+
+        print(f"✅ [Ray] Reducción completada. Escenarios de cola retenidos: {len(merged.values)}")
+        return format_metrics(merged.metrics(confidences))
+
+    def shutdown(self):
+        """Libera los actores del pool (p.ej. al apagar la API)."""
+        if self.workers is not None:
+            for worker in self.workers:
+                ray.kill(worker)
+        self.workers = None
+        self.params_ref = None
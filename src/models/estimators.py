@@ -0,0 +1,111 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from scipy.special import digamma, polygamma
+from scipy.stats import t
+
+# Rango de búsqueda de nu durante el ajuste (el clamping de negocio se aplica después)
+NU_SEARCH_BOUNDS = (0.5, 1000.0)
+
+# Nu de respaldo cuando un activo no puede ajustarse
+FALLBACK_NU = 4.0
+
+
+def _kurtosis_nu(X: np.ndarray) -> np.ndarray:
+    """Inicializador por momentos: exceso de curtosis = 6 / (nu - 4)."""
+    centered = X - X.mean(axis=0)
+    m2 = (centered ** 2).mean(axis=0)
+    m4 = (centered ** 4).mean(axis=0)
+    excess = m4 / np.where(m2 > 0, m2 ** 2, np.nan) - 3.0
+    nu = np.where(excess > 0.05, 4.0 + 6.0 / np.maximum(excess, 0.05), 100.0)
+    return np.clip(nu, 2.1, 100.0)
+
+
+def _nu_score(nu: np.ndarray, d: np.ndarray, n_obs: int):
+    """
+    Gradiente y segunda derivada de la log-verosimilitud t respecto de nu
+    (loc y escala fijos), vectorizados por columna. d = ((x - loc) / scale)^2.
+    """
+    ratio = d / (nu * (nu + d))
+    s1 = ratio.sum(axis=0)
+    grad = (0.5 * n_obs * (digamma(0.5 * (nu + 1)) - digamma(0.5 * nu) - 1.0 / nu)
+            - 0.5 * np.log1p(d / nu).sum(axis=0)
+            + 0.5 * (nu + 1) * s1)
+    hess = (0.25 * n_obs * (polygamma(1, 0.5 * (nu + 1)) - polygamma(1, 0.5 * nu))
+            + 0.5 * n_obs / nu ** 2
+            + s1
+            - 0.5 * (nu + 1) * (d * (2 * nu + d) / (nu * (nu + d)) ** 2).sum(axis=0))
+    return grad, hess
+
+
+def fit_student_t(X: np.ndarray, max_iter: int = 50, newton_steps: int = 2, tol: float = 1e-4):
+    """
+    Ajuste t-Student (loc, escala, nu) de todas las columnas a la vez (ECME vectorizado).
+    - Inicialización: mediana, desviación y nu por curtosis.
+    - Paso EM: pesos w = (nu + 1) / (nu + d) actualizan loc y escala.
+    - Paso CM: Newton en log(nu) sobre la verosimilitud exacta.
+
+    Args:
+        X: Matriz (T, n_assets) de retornos.
+    Retorna: (loc, scale, nu) arrays (n_assets,). Columnas no ajustables -> nu = NaN.
+    """
+    X = np.asarray(X, dtype=float)
+    n_obs = X.shape[0]
+
+    loc = np.median(X, axis=0)
+    scale = X.std(axis=0)
+    nu = _kurtosis_nu(X)
+    valid = np.isfinite(X).all(axis=0) & (scale > 0)
+    scale = np.where(valid, scale, 1.0)
+    X = np.where(valid, X, 0.0)
+
+    log_lo, log_hi = np.log(NU_SEARCH_BOUNDS[0]), np.log(NU_SEARCH_BOUNDS[1])
+    for _ in range(max_iter):
+        # E-step + actualización de loc / escala
+        d = ((X - loc) / scale) ** 2
+        w = (nu + 1) / (nu + d)
+        new_loc = (w * X).sum(axis=0) / w.sum(axis=0)
+        new_scale = np.sqrt((w * (X - new_loc) ** 2).sum(axis=0) / n_obs)
+        # Escala colapsada (columna constante): no ajustable, sin dividir por cero
+        valid &= new_scale > 0
+        new_scale = np.where(valid, new_scale, 1.0)
+
+        # CM-step: Newton en eta = log(nu) con salvaguarda si la curvatura no es negativa
+        d = ((X - new_loc) / new_scale) ** 2
+        new_nu = nu.copy()
+        for _ in range(newton_steps):
+            grad, hess = _nu_score(new_nu, d, n_obs)
+            d_eta = new_nu * hess + grad  # (d2l/deta2) / nu = nu l'' + l'
+            step = np.where(d_eta < 0, -grad / d_eta, 0.5 * np.sign(grad))
+            new_nu = np.exp(np.clip(np.log(new_nu) + np.clip(step, -1.0, 1.0), log_lo, log_hi))
+
+        converged = (np.abs(new_nu - nu) <= tol * nu).all() and (np.abs(new_loc - loc) <= tol * scale).all()
+        loc, scale, nu = new_loc, new_scale, new_nu
+        if converged:
+            break
+
+    return loc, scale, np.where(valid, nu, np.nan)
+
+
+def _mle_nu(values: np.ndarray) -> float:
+    """MLE exacto de scipy para una columna (ejecutado en un proceso del pool)."""
+    try:
+        return t.fit(values)[0]
+    except (ValueError, RuntimeError, FloatingPointError, np.linalg.LinAlgError) as e:
+        print(f"⚠️ t.fit falló ({type(e).__name__}: {str(e)}), usando nu={FALLBACK_NU}")
+        return FALLBACK_NU
+
+
+def fit_student_t_mle(X: np.ndarray, max_workers: int = None, min_parallel: int = 8) -> np.ndarray:
+    """
+    Nu por MLE exacto (scipy.stats.t.fit) con un pool de procesos por columna.
+    Universos pequeños se ajustan en serie para no pagar el arranque del pool.
+    """
+    X = np.asarray(X, dtype=float)
+    columns = [np.ascontiguousarray(X[:, j]) for j in range(X.shape[1])]
+    if len(columns) < min_parallel:
+        return np.array([_mle_nu(col) for col in columns])
+
+    max_workers = max_workers or min(len(columns), os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        return np.array(list(pool.map(_mle_nu, columns, chunksize=max(1, len(columns) // (4 * max_workers)))))
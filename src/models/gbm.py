@@ -1,15 +1,35 @@
 import numpy as np
 import pandas as pd
 from src.models.base import StochasticModel
+from src.models.sampling import ShockSampler
+from src.models.jit import resolve_backend
+from src.models.covariance import DEFAULT_N_FACTORS
 
 class GeometricBrownianMotionStrategy(StochasticModel):
     """
     Estrategia Clásica: Movimiento Browniano Geométrico (GBM).
     Asume que los retornos siguen una Distribución Normal Multivariada.
     """
-    def __init__(self):
+    def __init__(self, sampler: ShockSampler = None, dtype=np.float64, backend: str = "numpy",
+                 covariance: str = "sample", n_factors: int = DEFAULT_N_FACTORS, shrinkage: bool = False,
+                 halflife: float = None):
+        """
+        Args:
+            covariance: "sample" (Cholesky denso) o "factor" (PCA + idiosincrático, universos grandes).
+            n_factors: Factores del modelo "factor".
+            shrinkage: Ledoit-Wolf sobre la covarianza estimada.
+            halflife: Vida media (días) de media y covarianza EWMA (None = ventana equiponderada).
+        """
+        self.sampler = sampler or ShockSampler()
+        self.dtype = np.dtype(dtype).type
+        self.backend = resolve_backend(backend)
+        self.covariance = covariance
+        self.n_factors = n_factors
+        self.shrinkage = shrinkage
+        self.halflife = halflife
         self.mu = None
         self.chol_matrix = None
+        self.idio_vol = None
         self.n_assets = None
 
     def train(self, log_returns: pd.DataFrame):
@@ -19,44 +39,16 @@ class GeometricBrownianMotionStrategy(StochasticModel):
         self.n_assets = log_returns.shape[1]
         
         # 1. Vector de Medias (Drift Anualizado no necesario para paso diario, pero guardamos diario)
-        self.mu = log_returns.mean().values
-        
-        # 2. Matriz de Covarianza
-        cov_matrix = log_returns.cov().values
-        
-        # 3. Descomposición de Cholesky para correlaciones
-        try:
-            self.chol_matrix = np.linalg.cholesky(cov_matrix)
-        except np.linalg.LinAlgError:
-            # Regularización en caso de matriz no definida positiva
-            cov_matrix += np.eye(self.n_assets) * 1e-6
-            self.chol_matrix = np.linalg.cholesky(cov_matrix)
-            
-        print(f"🧠 [GBM] Modelo Normal calibrado (Sin colas pesadas).")
+        # 2-3. Covarianza y su raíz para correlacionar (Cholesky denso o modelo de factores)
+        # (muestrales o EWMA; quedan listas para la recalibración incremental con update())
+        self._fit_moments(log_returns)
 
-    def simulate(self, initial_prices: np.ndarray, horizon: int, n_sims: int) -> np.ndarray:
-        if self.chol_matrix is None:
-            raise ValueError("Modelo no entrenado.")
+        # 4. Drift de Itô y varianzas precalculados para el hot loop de simulación
+        self._set_derived()
+        print(f"🧠 [GBM] Modelo Normal calibrado (Sin colas pesadas).")
 
-        # 1. Generar Shocks Normales Estándar Z ~ N(0, I)
-        Z = np.random.normal(0, 1, size=(horizon, n_sims, self.n_assets))
-        
-        # 2. Inducir Correlación: X = Z * L^T
-        correlated_shocks = np.einsum('tsa,ba->tsb', Z, self.chol_matrix)
-        
-        # 3. Trayectorias de Precio (Solución exacta de la EDO de Black-Scholes)
-        # S_t = S_{t-1} * exp( (mu - 0.5*sigma^2)dt + sigma*dW )
-        
-        sigma_sq = np.diag(self.chol_matrix @ self.chol_matrix.T)
-        drift = self.mu - 0.5 * sigma_sq
-        
-        # Difusión
-        log_returns = (drift * 1) + correlated_shocks
-        cumulative_returns = np.cumsum(log_returns, axis=0)
-        
-        # Construir matriz final
-        simulations = np.zeros((horizon + 1, n_sims, self.n_assets))
-        simulations[0] = initial_prices
-        simulations[1:] = initial_prices * np.exp(cumulative_returns)
-        
-        return np.transpose(simulations[1:], (1, 0, 2))
\ No newline at end of file
+    def simulate(self, initial_prices: np.ndarray, horizon: int, n_sims: int,
+                 rng: np.random.Generator = None) -> np.ndarray:
+        # Solución exacta de la EDO: S_t = S_{t-1} * exp((mu - 0.5*sigma^2)dt + sigma*dW)
+        # Kernel fusionado in-place (ver StochasticModel._simulate_paths)
+        return self._simulate_paths(initial_prices, horizon, n_sims, rng=rng)
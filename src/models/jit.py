@@ -0,0 +1,72 @@
+import math
+import numpy as np
+
+# === ⚡ BACKEND JIT OPCIONAL (NUMBA) ===
+# Numba no es dependencia dura: sin él, las estrategias vuelven al backend NumPy.
+# Los kernels se definen igual en ambos casos (sin compilar son Python puro,
+# útil para validarlos contra la referencia NumPy en tamaños pequeños).
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    prange = range
+
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda fn: fn
+
+BACKENDS = ("numpy", "numba")
+
+
+def resolve_backend(backend: str) -> str:
+    """Valida el backend pedido; "numba" degrada a "numpy" si Numba no está instalado."""
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend de simulación desconocido: {backend}")
+    if backend == "numba" and not NUMBA_AVAILABLE:
+        print("⚠️ Numba no disponible, usando backend NumPy.")
+        return "numpy"
+    return backend
+
+
+@njit(parallel=True, fastmath=False, cache=True)
+def advance_block(Z, scale, chol, idio, drift, log_acc, exposure, portfolio, start):
+    """
+    Avanza un bloque temporal de todas las simulaciones en un solo loop fusionado:
+    correlación (L triangular inferior, o cargas de factores + término idiosincrático),
+    mezcla, drift, acumulación de log-precios y, si hay exposición, valor del portafolio por día.
+    Paralelo sobre simulaciones; el estado de cada trayectoria vive en log_acc[s].
+
+    Args:
+        Z: Normales estándar (days, n_sims, n_shocks) del sampler.
+        scale: Escala de mezcla (days, n_sims), o array vacío si el modelo es Gaussiano.
+        chol: Factor de Cholesky (n_assets, n_assets) o cargas B (n_assets, k).
+        idio: Volatilidad idiosincrática (n_assets,) del modelo de factores, o vacío si es denso
+              (Z[..., k + i] es el shock propio del activo i).
+        drift: Drift diario de Itô (n_assets,).
+        log_acc: Acumulador (n_sims, n_assets) de log-retornos, modificado in-place.
+        exposure: Unidades * S0 por activo (n_assets,), o vacío si solo se quiere el terminal.
+        portfolio: Salida (n_sims, horizon) escrita en las columnas start:start+days.
+    """
+    days, n_sims = Z.shape[0], Z.shape[1]
+    n_assets, k = chol.shape
+    mixed = scale.shape[0] > 0
+    aggregate = exposure.shape[0] > 0
+    factors = idio.shape[0] > 0
+    for s in prange(n_sims):
+        for t in range(days):
+            factor = scale[t, s] if mixed else 1.0
+            value = 0.0
+            for i in range(n_assets):
+                shock = 0.0
+                # Cholesky: solo la parte triangular inferior; factores: las k cargas
+                for j in range(k if factors else i + 1):
+                    shock += chol[i, j] * Z[t, s, j]
+                if factors:
+                    shock += idio[i] * Z[t, s, k + i]
+                log_acc[s, i] += shock * factor + drift[i]
+                if aggregate:
+                    value += exposure[i] * math.exp(log_acc[s, i])
+            if aggregate:
+                portfolio[s, start + t] = value
@@ -1,32 +1,274 @@
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 import pandas as pd
 from src.models.base import StochasticModel
+from src.models import random_streams
+from src.utils.reporter import RiskReporter
+from src.utils.risk_stats import DEFAULT_CONFIDENCES, format_metrics, tail_metrics
+from src.utils.instrumentation import stage, timed
 
 class MonteCarloEngine:
-    def __init__(self, strategy: StochasticModel):
+    def __init__(self, strategy: StochasticModel, seed: int = None,
+                 bit_generator: str = random_streams.DEFAULT_BIT_GENERATOR, n_threads: int = 1,
+                 block_days: int = None):
         """
         Motor de Riesgo Agnóstico (Contexto del Patrón Strategy).
         No sabe matemáticas, solo sabe ejecutar estrategias.
         
         Args:
             strategy (StochasticModel): Una instancia de una estrategia (ej. StudentTStrategy)
+            seed (int): Semilla raíz. Cada bloque de simulaciones usa un stream derivado
+                        (SeedSequence), por lo que el resultado es reproducible e idéntico
+                        al de DistributedMonteCarlo con la misma semilla.
+            bit_generator (str): "pcg64dxsm" (default), "pcg64" o "philox".
+            n_threads (int): Threads que ejecutan los bloques en paralelo (mismo resultado que 1).
+            block_days (int): Días por bloque del modo streaming (default: STREAM_BLOCK_DAYS de la
+                              estrategia). Con la cópula t define el orden del stream: misma semilla
+                              y mismo block_days = mismos escenarios.
         """
         self.strategy = strategy
+        self.seed = seed
+        self.bit_generator = bit_generator
+        self.n_threads = n_threads
+        self.block_days = block_days
+        self.last_seed = None
         self.simulations = None
+        self.control_pnl = None
+        self.control_mean = None
+        self.weights = None
 
+    @timed("train")
     def train(self, log_returns: pd.DataFrame):
         """Delega el entrenamiento a la estrategia."""
         self.strategy.train(log_returns)
 
-    def simulate(self, current_prices: np.ndarray, horizon: int = 252, n_sims: int = 1000):        
+    @timed("train")
+    def update(self, new_returns, window: pd.DataFrame = None):
+        """
+        Recalibración incremental con los días nuevos (StochasticModel.update()):
+        el refresco diario no re-estima la ventana completa.
+        Con `window` (ventana desplazada) se re-estima además la cola (nu).
+        """
+        self.strategy.update(new_returns, window=window)
+        return self
+
+    @timed("simulate")
+    def simulate(self, current_prices: np.ndarray, horizon: int = 252, n_sims: int = 1000,
+                 mode: str = "paths"):
         """
         Orquesta la simulación delegando en la estrategia.
         Ahora recibe horizon y n_sims aquí, no en el __init__.
+
+        Args:
+            mode: "paths"     -> tensor completo (n_sims, days, n_assets)
+                  "terminal"  -> solo precios finales (n_sims, n_assets), memoria O(n_sims * n_assets)
+                  "portfolio" -> valor del portafolio por día (n_sims, days)
         """
-        print(f"🎲 [Engine] Iniciando simulación ({n_sims} sims, {horizon} días)...")
+        print(f"🎲 [Engine] Iniciando simulación ({n_sims} sims, {horizon} días, modo {mode})...")
         
         # Dalega la matemática compleja a la estrategia
-        self.simulations = self.strategy.simulate(current_prices, horizon, n_sims)
+        if mode == "paths":
+            simulate_fn = lambda count, rng: self.strategy.simulate(current_prices, horizon, count, rng=rng)
+        else:
+            simulate_fn = lambda count, rng: self.strategy.simulate_streaming(
+                current_prices, horizon, count, output=mode, block_days=self.block_days, rng=rng)
+
+        # Streams independientes por bloque canónico de simulaciones
+        self.last_seed = random_streams.resolve_seed(self.seed)
+        blocks = random_streams.stream_blocks(n_sims)
+        self.simulations = random_streams.run_blocks(simulate_fn, blocks, self.last_seed, self.bit_generator,
+                                                     max_workers=self.n_threads)
         
-        print("✅ [Engine] Simulación finalizada.")
-        return self.simulations
\ No newline at end of file
+        print(f"✅ [Engine] Simulación finalizada (seed={self.last_seed}).")
+        return self.simulations
+
+    @timed("simulate")
+    def simulate_pnl(self, current_prices: np.ndarray, horizon: int = 252, n_sims: int = 1000,
+                     control_variate: bool = False):
+        """
+        Escenarios de PnL equiponderado en modo streaming (sin tensor de trayectorias).
+        Con control_variate=True guarda además el PnL de la variable de control GBM
+        (mismas Z) y su media analítica en self.control_pnl / self.control_mean,
+        para RiskReporter.calculate_standard_errors().
+        Si el sampler es ponderado (ImportanceSampler), guarda los likelihood ratios
+        en self.weights para RiskReporter.calculate_weighted_metrics().
+        """
+        print(f"🎲 [Engine] Iniciando simulación PnL ({n_sims} sims, {horizon} días, "
+              f"muestreo {self.strategy.sampler.name})...")
+        current_prices = np.asarray(current_prices, dtype=float)
+        weighted = self.strategy.sampler.weighted
+
+        def simulate_fn(count, rng):
+            log_weights = np.zeros(count) if weighted else None
+            result = self.strategy.simulate_streaming(current_prices, horizon, count, rng=rng,
+                                                      block_days=self.block_days, control=control_variate, log_weights=log_weights)
+            terminal, control = result if control_variate else (result, None)
+
+            # Columnas: [pnl, (pnl control), (log peso)]
+            columns = [RiskReporter.compute_terminal_pnl(terminal, current_prices)]
+            if control_variate:
+                columns.append(RiskReporter.compute_terminal_pnl(control, current_prices))
+            if weighted:
+                columns.append(log_weights)
+            return np.column_stack(columns)
+
+        self.last_seed = random_streams.resolve_seed(self.seed)
+        blocks = random_streams.stream_blocks(n_sims)
+        scenarios = random_streams.run_blocks(simulate_fn, blocks, self.last_seed, self.bit_generator,
+                                              max_workers=self.n_threads)
+
+        self.control_pnl = self.control_mean = self.weights = None
+        if control_variate:
+            expected_terminal = self.strategy.expected_gbm_terminal(current_prices, horizon)
+            self.control_mean = RiskReporter.compute_terminal_pnl(expected_terminal[None, :], current_prices)[0]
+            self.control_pnl = scenarios[:, 1]
+        if weighted:
+            self.weights = np.exp(scenarios[:, -1])
+
+        print(f"✅ [Engine] Simulación finalizada (seed={self.last_seed}).")
+        return scenarios[:, 0]
+
+    @timed("simulate")
+    def simulate_portfolios(self, current_prices: np.ndarray, positions: np.ndarray,
+                            horizon: int = 252, n_sims: int = 1000):
+        """
+        PnL de muchos portafolios sobre el mismo universo con una sola simulación.
+        Cada bloque simula precios terminales y los reduce con terminal @ positions.T:
+        evaluar 300 sub-portafolios cuesta una simulación más un matmul.
+
+        Args:
+            positions: (n_portfolios, n_assets) unidades por activo.
+        Retorna: (n_sims, n_portfolios). Con sampler ponderado guarda los
+        likelihood ratios en self.weights (dirigidos al libro agregado).
+        """
+        current_prices = np.asarray(current_prices, dtype=float)
+        positions = np.atleast_2d(np.asarray(positions, dtype=float))
+        n_portfolios = positions.shape[0]
+        print(f"🎲 [Engine] Iniciando simulación batch ({n_portfolios} portafolios, {n_sims} sims, "
+              f"{horizon} días, muestreo {self.strategy.sampler.name})...")
+        weighted = self.strategy.sampler.weighted
+        book = positions.sum(axis=0)
+
+        def simulate_fn(count, rng):
+            log_weights = np.zeros(count) if weighted else None
+            terminal = self.strategy.simulate_streaming(current_prices, horizon, count, rng=rng,
+                                                        block_days=self.block_days, weights=book, log_weights=log_weights)
+            pnl = RiskReporter.compute_portfolio_pnl(terminal, current_prices, positions)
+            return np.column_stack([pnl, log_weights]) if weighted else pnl
+
+        self.last_seed = random_streams.resolve_seed(self.seed)
+        blocks = random_streams.stream_blocks(n_sims)
+        scenarios = random_streams.run_blocks(simulate_fn, blocks, self.last_seed, self.bit_generator,
+                                              max_workers=self.n_threads)
+
+        self.control_pnl = self.control_mean = None
+        self.weights = np.exp(scenarios[:, -1]) if weighted else None
+
+        print(f"✅ [Engine] Simulación finalizada (seed={self.last_seed}).")
+        return scenarios[:, :n_portfolios]
+
+    @timed("simulate")
+    def simulate_horizons(self, current_prices: np.ndarray, horizons, n_sims: int = 1000):
+        """
+        PnL equiponderado en varios horizontes con una sola simulación.
+        Cada trayectoria se evalúa solo en los checkpoints (sin tensor ni serie diaria)
+        y la simulación termina en max(horizons): pedir 1, 10 y 21 días no simula un año.
+        Con sampler ponderado guarda los likelihood ratios en self.weights
+        (razón de verosimilitud de la trayectoria completa, insesgada en cada horizonte).
+
+        Args:
+            horizons: Días de evaluación (ej. [1, 10, 21, 252]).
+        Retorna: (n_sims, len(horizons)), columnas en el orden de horizons.
+        """
+        current_prices = np.asarray(current_prices, dtype=float)
+        horizons = [int(h) for h in horizons]
+        horizon = max(horizons)
+        print(f"🎲 [Engine] Iniciando simulación multi-horizonte ({n_sims} sims, horizontes {horizons}, "
+              f"muestreo {self.strategy.sampler.name})...")
+        weighted = self.strategy.sampler.weighted
+        initial_value = current_prices.sum()
+
+        def simulate_fn(count, rng):
+            log_weights = np.zeros(count) if weighted else None
+            values = self.strategy.simulate_streaming(current_prices, horizon, count, rng=rng,
+                                                      block_days=self.block_days, output="checkpoints",
+                                                      checkpoints=horizons,
+                                                      log_weights=log_weights)
+            pnl = values / initial_value - 1
+            return np.column_stack([pnl, log_weights]) if weighted else pnl
+
+        self.last_seed = random_streams.resolve_seed(self.seed)
+        blocks = random_streams.stream_blocks(n_sims)
+        scenarios = random_streams.run_blocks(simulate_fn, blocks, self.last_seed, self.bit_generator,
+                                              max_workers=self.n_threads)
+
+        self.control_pnl = self.control_mean = None
+        self.weights = np.exp(scenarios[:, -1]) if weighted else None
+
+        print(f"✅ [Engine] Simulación finalizada (seed={self.last_seed}).")
+        return scenarios[:, :len(horizons)]
+
+    @timed("simulate")
+    def simulate_to_store(self, store, current_prices: np.ndarray, horizon: int = 252, n_sims: int = 1000,
+                          mode: str = "terminal"):
+        """
+        Simula y persiste los escenarios en un ScenarioStore (src/data/scenario_store.py),
+        un chunk por bloque canónico: la memoria pico es la de un bloque, no la del job.
+        Si el set de la misma clave (parámetros + semilla + job) ya existe, no se re-simula.
+
+        Args:
+            mode: "terminal" -> precios terminales (n_sims, n_assets), con los log-likelihood
+                                ratios si el sampler es ponderado
+                  "paths"    -> tensor completo (n_sims, horizon, n_assets)
+        Retorna: ScenarioSet (lectura por chunks con RiskReporter.evaluate_scenarios()).
+        """
+        if mode == "paths" and self.strategy.sampler.weighted:
+            # Un set "importance" sin pesos se leería como si estuviera ponderado
+            raise ValueError("El modo 'paths' no admite samplers ponderados: use mode='terminal'.")
+        current_prices = np.asarray(current_prices, dtype=float)
+        self.last_seed = random_streams.resolve_seed(self.seed)
+        key = store.key(self.strategy, current_prices, horizon, n_sims, self.last_seed, self.bit_generator, mode,
+                        block_days=self.block_days)
+        if store.exists(key):
+            print(f"♻️ [Engine] Escenarios desde el store ({key[:12]}, seed={self.last_seed}).")
+            return store.open(key)
+
+        print(f"🎲 [Engine] Simulando escenarios persistentes ({n_sims} sims, {horizon} días, modo {mode})...")
+        weighted = mode == "terminal" and self.strategy.sampler.weighted
+        metadata = {"model": self.strategy.__class__.__name__, "sampler": self.strategy.sampler.name,
+                    "seed": self.last_seed, "bit_generator": self.bit_generator}
+
+        with store.writer(key, mode, current_prices, horizon, n_sims, weighted=weighted,
+                          metadata=metadata) as write:
+            def write_block(block):
+                index, count = block
+                rng = random_streams.block_generator(self.last_seed, index, self.bit_generator)
+                if mode == "paths":
+                    write(index, self.strategy.simulate(current_prices, horizon, count, rng=rng))
+                    return
+                log_weights = np.zeros(count) if weighted else None
+                terminal = self.strategy.simulate_streaming(current_prices, horizon, count, rng=rng,
+                                                            block_days=self.block_days,
+                                                            log_weights=log_weights)
+                write(index, terminal, log_weights)
+
+            blocks = random_streams.stream_blocks(n_sims)
+            if self.n_threads > 1 and len(blocks) > 1:
+                with ThreadPoolExecutor(max_workers=min(self.n_threads, len(blocks))) as pool:
+                    list(pool.map(write_block, blocks))
+            else:
+                for block in blocks:
+                    write_block(block)
+
+        print(f"💾 [Engine] Escenarios persistidos ({key[:12]}, seed={self.last_seed}).")
+        return store.open(key)
+
+    def simulate_risk(self, current_prices: np.ndarray, horizon: int = 252, n_sims: int = 1000,
+                      confidences=DEFAULT_CONFIDENCES):
+        """
+        Métricas VaR/CVaR en proceso, con el mismo formato que DistributedMonteCarlo.simulate_risk
+        ('VaR 95%', 'CVaR 95%', ...). Con muestreo por importancia ya vienen ponderadas.
+        """
+        pnl = self.simulate_pnl(current_prices, horizon=horizon, n_sims=n_sims)
+        with stage("reduce"):
+            return format_metrics(tail_metrics(pnl, confidences, weights=self.weights))
@@ -0,0 +1,146 @@
+from collections import deque
+import numpy as np
+
+# Calibración incremental: media y covarianza actualizadas día a día en O(n_assets²)
+#   - Ventana móvil (Welford): agrega el día nuevo y descarta el más antiguo.
+#   - EWMA: decaimiento exponencial con vida media `halflife` días (sin ventana).
+# Cada actualización se expresa como pasos cov <- scale * cov + coef * v v^T,
+# que las estrategias aplican al Cholesky con cholesky_update() (rank-one).
+
+
+def ewma_decay(halflife: float) -> float:
+    """Factor de decaimiento lambda = 0.5^(1 / halflife)."""
+    if halflife <= 0:
+        raise ValueError("La vida media del EWMA debe ser positiva.")
+    return 0.5 ** (1.0 / halflife)
+
+
+def cholesky_update(L: np.ndarray, x: np.ndarray, downdate: bool = False) -> np.ndarray:
+    """
+    Cholesky de L L^T + x x^T (update) o L L^T - x x^T (downdate) en O(n²),
+    con rotaciones sobre las columnas de L triangular inferior.
+    Retorna una matriz nueva: L puede estar compartida (ej. caché de calibraciones).
+    Lanza np.linalg.LinAlgError si el downdate deja de ser definido positivo.
+    """
+    L = np.array(L, dtype=float)
+    x = np.array(x, dtype=float)
+    sign = -1.0 if downdate else 1.0
+    n = len(x)
+    for k in range(n):
+        r_sq = L[k, k] ** 2 + sign * x[k] ** 2
+        if r_sq <= 0:
+            raise np.linalg.LinAlgError("Downdate de Cholesky: la matriz deja de ser definida positiva.")
+        r = np.sqrt(r_sq)
+        c, s = r / L[k, k], x[k] / L[k, k]
+        L[k, k] = r
+        if k + 1 < n:
+            L[k + 1:, k] = (L[k + 1:, k] + sign * s * x[k + 1:]) / c
+            x[k + 1:] = c * x[k + 1:] - s * L[k + 1:, k]
+    return L
+
+
+class OnlineMoments:
+    """
+    Media y covarianza en línea de los log-retornos.
+    - Ventana (halflife=None): Welford con descarte del día más antiguo; cov con ddof=1,
+      igual que DataFrame.cov() sobre la ventana vigente.
+    - EWMA (halflife): pesos (1 - lambda) lambda^k normalizados; cov ponderada (sesgada).
+    """
+
+    def __init__(self, n_assets: int, window: int = None, halflife: float = None):
+        """
+        Args:
+            window: Días retenidos (None = ventana expansiva). Ignorado con halflife.
+            halflife: Vida media en días del EWMA (None = pesos iguales).
+        """
+        self.n_assets = n_assets
+        self.halflife = halflife
+        self.decay = None if halflife is None else ewma_decay(halflife)
+        self.window = None if halflife is not None else window
+        self.rows = deque() if self.window is not None else None
+        self.count = 0
+        self.mean = np.zeros(n_assets)
+        self._scatter = np.zeros((n_assets, n_assets))  # Welford: M2; EWMA: cov
+
+    @classmethod
+    def from_returns(cls, X: np.ndarray, window: int = None, halflife: float = None) -> "OnlineMoments":
+        """
+        Estado inicial desde la ventana de calibración (T, n_assets), en forma vectorizada.
+        Equivale a aplicar update() fila a fila (el EWMA arranca en la primera fila).
+        """
+        X = np.asarray(X, dtype=float)
+        moments = cls(X.shape[1], window=window, halflife=halflife)
+        if moments.window is not None:
+            X = X[-moments.window:]
+            moments.rows.extend(X)
+        moments.count = len(X)
+        if moments.decay is None:
+            moments.mean = X.mean(axis=0)
+            centered = X - moments.mean
+            moments._scatter = centered.T @ centered
+            return moments
+
+        # Peso de la fila t: (1 - lambda) lambda^(T-1-t); la primera fila conserva lambda^(T-1)
+        weights = (1.0 - moments.decay) * moments.decay ** np.arange(len(X) - 1, -1, -1.0)
+        weights[0] = moments.decay ** (len(X) - 1)
+        moments.mean = weights @ X
+        centered = X - moments.mean
+        moments._scatter = (centered * weights[:, None]).T @ centered
+        return moments
+
+    @property
+    def cov(self) -> np.ndarray:
+        if self.decay is not None:
+            return self._scatter.copy()
+        return self._scatter / (self.count - 1)
+
+    def _add(self, x: np.ndarray):
+        n = self.count + 1
+        delta = x - self.mean
+        self.mean = self.mean + delta / n
+        self._scatter = self._scatter + np.outer(delta, x - self.mean)
+        self.count = n
+        # cov_n = (n-2)/(n-1) cov_{n-1} + delta delta^T / n
+        return [((n - 2) / (n - 1), 1.0 / n, delta)] if n > 2 else None
+
+    def _remove(self, x: np.ndarray):
+        n = self.count
+        delta = x - self.mean
+        self.mean = self.mean - delta / (n - 1)
+        self._scatter = self._scatter - np.outer(x - self.mean, delta)
+        self.count = n - 1
+        # cov_{n-1} = (n-1)/(n-2) cov_n - n / ((n-1)(n-2)) delta delta^T
+        return [((n - 1) / (n - 2), -n / ((n - 1) * (n - 2)), delta)] if n > 3 else None
+
+    def update(self, x: np.ndarray):
+        """
+        Incorpora un día (n_assets,) en O(n_assets²).
+        Retorna los pasos [(scale, coef, v)] con cov <- scale * cov + coef * v v^T
+        (para actualizar el Cholesky), o None si la ventana es demasiado corta
+        y conviene refactorizar cov completa.
+        """
+        x = np.asarray(x, dtype=float)
+        if self.decay is not None:
+            if self.count == 0:
+                self.mean, self.count = x.copy(), 1
+                return None
+            lam = self.decay
+            delta = x - self.mean
+            self.mean = self.mean + (1.0 - lam) * delta
+            self._scatter = lam * (self._scatter + (1.0 - lam) * np.outer(delta, delta))
+            self.count += 1
+            return [(lam, lam * (1.0 - lam), delta)]
+
+        steps = self._add(x)
+        if self.rows is not None:
+            self.rows.append(x)
+            if len(self.rows) > self.window:
+                removed = self._remove(self.rows.popleft())
+                steps = None if steps is None or removed is None else steps + removed
+        return steps
+
+    def window_returns(self) -> np.ndarray:
+        """Días de la ventana vigente (T, n_assets); solo en modo ventana."""
+        if self.rows is None:
+            raise ValueError("El modo EWMA / expansivo no retiene la ventana de retornos.")
+        return np.array(self.rows)
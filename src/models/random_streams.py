@@ -0,0 +1,74 @@
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+# Simulaciones por stream independiente. El stream de cada bloque depende solo de
+# (seed, índice de bloque), nunca de qué worker lo ejecuta: el resultado es
+# bit-idéntico con cualquier número de workers o tamaño de chunk.
+SIMS_PER_STREAM = 1024
+
+# Generadores de bits soportados (PCG64DXSM y Philox: más rápidos / aptos para paralelo)
+BIT_GENERATORS = {
+    "pcg64": np.random.PCG64,
+    "pcg64dxsm": np.random.PCG64DXSM,
+    "philox": np.random.Philox,
+}
+
+DEFAULT_BIT_GENERATOR = "pcg64dxsm"
+
+
+def resolve_seed(seed=None) -> int:
+    """Fija la entropía raíz. Si no hay semilla, se genera una y se reporta para auditoría."""
+    if seed is None:
+        return int(np.random.SeedSequence().entropy)
+    return int(seed)
+
+
+def block_generator(seed: int, block_index: int, bit_generator: str = DEFAULT_BIT_GENERATOR) -> np.random.Generator:
+    """
+    Generator del bloque `block_index`, equivalente a SeedSequence(seed).spawn(...)[block_index].
+    Los hijos de un mismo SeedSequence son estadísticamente independientes.
+    """
+    if bit_generator not in BIT_GENERATORS:
+        raise ValueError(f"Generador de bits desconocido: {bit_generator}")
+    seed_seq = np.random.SeedSequence(entropy=seed, spawn_key=(block_index,))
+    return np.random.Generator(BIT_GENERATORS[bit_generator](seed_seq))
+
+
+def stream_blocks(total_sims: int, block_size: int = SIMS_PER_STREAM):
+    """Particiona las simulaciones en bloques canónicos: [(block_index, n_sims), ...]."""
+    n_blocks = -(-total_sims // block_size)
+    return [(i, min(block_size, total_sims - i * block_size)) for i in range(n_blocks)]
+
+
+def split_blocks(blocks, n_parts: int):
+    """Reparte bloques contiguos entre n_parts workers (algunos pueden quedar vacíos)."""
+    n_blocks = len(blocks)
+    return [blocks[(k * n_blocks) // n_parts:((k + 1) * n_blocks) // n_parts] for k in range(n_parts)]
+
+
+def run_blocks(simulate_fn, blocks, seed: int, bit_generator: str = DEFAULT_BIT_GENERATOR,
+               max_workers: int = 1) -> np.ndarray:
+    """
+    Ejecuta simulate_fn(n_sims, rng) por cada bloque con su propio stream
+    y concatena los resultados sobre el eje de simulaciones (eje 0).
+    max_workers > 1 reparte los bloques en un pool de threads (NumPy libera el GIL
+    en generación, BLAS, cumsum y exp); el resultado es el mismo que en serie.
+    """
+    total_sims = sum(count for _, count in blocks)
+    run = lambda block: simulate_fn(block[1], block_generator(seed, block[0], bit_generator))
+    if max_workers > 1 and len(blocks) > 1:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(blocks))) as pool:
+            chunks = pool.map(run, blocks)
+            return _concat_blocks(chunks, blocks, total_sims)
+    return _concat_blocks(map(run, blocks), blocks, total_sims)
+
+
+def _concat_blocks(chunks, blocks, total_sims: int) -> np.ndarray:
+    out = None
+    offset = 0
+    for (_, count), chunk in zip(blocks, chunks):
+        if out is None:
+            out = np.empty((total_sims,) + chunk.shape[1:], dtype=chunk.dtype)
+        out[offset:offset + count] = chunk
+        offset += count
+    return out
@@ -0,0 +1,228 @@
+import warnings
+from collections import deque
+import numpy as np
+from scipy.special import ndtri
+from scipy.stats import qmc
+
+
+class ShockSampler:
+    """
+    Capa de muestreo de shocks (Strategy intercambiable dentro de cada modelo).
+    Default: Monte Carlo pseudo-aleatorio estándar.
+    Todas las salidas usan el layout (days, n_sims, ...) de los modelos.
+    """
+    name = "pseudo"
+
+    # False si el método necesita el horizonte completo de cada trayectoria
+    # (el modo streaming usa entonces un único bloque temporal).
+    supports_streaming = True
+
+    # True si las simulaciones vienen en pares (2k, 2k+1) no independientes
+    paired = False
+
+    # True si las muestras requieren pesos de verosimilitud (muestreo por importancia)
+    weighted = False
+
+    def config(self) -> dict:
+        """Hiperparámetros del sampler (identifican los escenarios, ej. en ScenarioStore.key)."""
+        return {"name": self.name}
+
+    def prepare(self, strategy, initial_prices: np.ndarray, horizon: int, weights: np.ndarray = None):
+        """
+        Ajusta el sampler a una simulación concreta (modelo calibrado + portafolio).
+        Retorna el sampler a usar; por defecto el mismo (sin estado).
+        """
+        return self
+
+    def normals(self, rng: np.random.Generator, days: int, n_sims: int, n_dims: int,
+                log_weights: np.ndarray = None) -> np.ndarray:
+        """
+        Normales estándar independientes (days, n_sims, n_dims).
+        log_weights: acumulador (n_sims,) del log-likelihood ratio (solo samplers ponderados).
+        """
+        return rng.standard_normal(size=(days, n_sims, n_dims))
+
+    def chisquare(self, rng: np.random.Generator, df: float, days: int, n_sims: int,
+                  log_weights: np.ndarray = None) -> np.ndarray:
+        """Variable de mezcla Chi-cuadrado de la cópula t (days, n_sims, 1)."""
+        return rng.chisquare(df, size=(days, n_sims, 1))
+
+
+class AntitheticSampler(ShockSampler):
+    """
+    Variables antitéticas: la simulación 2k+1 usa -Z de la simulación 2k.
+    La variable de mezcla W se comparte dentro del par (T = Z / sqrt(W) también es simétrica).
+    """
+    name = "antithetic"
+    paired = True
+
+    @staticmethod
+    def _interleave(first: np.ndarray, second: np.ndarray, n_sims: int) -> np.ndarray:
+        days, half = first.shape[:2]
+        pairs = np.stack([first, second], axis=2)  # (days, half, 2, ...)
+        return pairs.reshape((days, 2 * half) + first.shape[2:])[:, :n_sims]
+
+    def normals(self, rng, days, n_sims, n_dims, log_weights=None):
+        half = -(-n_sims // 2)
+        Z = rng.standard_normal(size=(days, half, n_dims))
+        return self._interleave(Z, -Z, n_sims)
+
+    def chisquare(self, rng, df, days, n_sims, log_weights=None):
+        half = -(-n_sims // 2)
+        W = rng.chisquare(df, size=(days, half, 1))
+        return self._interleave(W, W, n_sims)
+
+
+def brownian_bridge_schedule(n_steps: int):
+    """
+    Orden de construcción del puente Browniano (grueso -> fino).
+    Cada paso: (t, izquierda, derecha, peso_izq, peso_der, desvío), índices base 0
+    sobre los tiempos 1..n_steps; -1 representa W(0) = 0.
+    """
+    schedule = [(n_steps - 1, -1, -1, 0.0, 0.0, np.sqrt(n_steps))]
+    intervals = deque([(0, n_steps)])
+    while intervals:
+        left, right = intervals.popleft()
+        if right - left < 2:
+            continue
+        mid = (left + right) // 2
+        span = right - left
+        schedule.append((mid - 1, left - 1, right - 1,
+                         (right - mid) / span, (mid - left) / span,
+                         np.sqrt((mid - left) * (right - mid) / span)))
+        intervals.append((left, mid))
+        intervals.append((mid, right))
+    return schedule
+
+
+class SobolSampler(ShockSampler):
+    """
+    Quasi-Monte Carlo: secuencia de Sobol aleatorizada (scrambled) + puente Browniano.
+    El puente asigna las primeras dimensiones de Sobol (las mejor distribuidas) a los
+    movimientos gruesos de la trayectoria (terminal, mitad, ...). Las dimensiones que
+    exceden el máximo soportado por SciPy se completan con normales pseudo-aleatorias.
+    """
+    name = "sobol"
+    supports_streaming = False
+
+    # Máxima dimensión de las direcciones de Sobol incluidas en scipy.stats.qmc
+    MAX_DIM = 21201
+
+    def normals(self, rng, days, n_sims, n_dims, log_weights=None):
+        total_dim = days * n_dims
+        qmc_dim = min(total_dim, self.MAX_DIM)
+
+        engine = qmc.Sobol(d=qmc_dim, scramble=True, seed=rng)
+        with warnings.catch_warnings():
+            # n_sims no potencia de 2: pierde balance, pero sigue siendo válido
+            warnings.simplefilter("ignore", UserWarning)
+            U = engine.random(n_sims)
+        U = np.clip(U, 1e-12, 1 - 1e-12)
+
+        # Dimensión k * n_dims + a -> paso k del puente para el activo a
+        Z = np.empty((n_sims, total_dim))
+        Z[:, :qmc_dim] = ndtri(U)
+        if total_dim > qmc_dim:
+            Z[:, qmc_dim:] = rng.standard_normal(size=(n_sims, total_dim - qmc_dim))
+        Z = Z.reshape(n_sims, days, n_dims)
+
+        # Construcción del puente: niveles W(t), luego incrementos diarios
+        W = np.empty_like(Z)
+        for k, (t, left, right, w_left, w_right, std) in enumerate(brownian_bridge_schedule(days)):
+            W[:, t] = std * Z[:, k]
+            if left >= 0:
+                W[:, t] += w_left * W[:, left]
+            if right >= 0:
+                W[:, t] += w_right * W[:, right]
+
+        W[:, 1:] -= W[:, :-1].copy()
+        return np.ascontiguousarray(W.transpose(1, 0, 2))
+
+
+class ImportanceSampler(ShockSampler):
+    """
+    Muestreo por importancia para métricas de cola (VaR/CVaR 99% o 99.9%).
+    - Normal: desplazamiento de media theta en la dirección de pérdida del portafolio.
+      Peso diario: exp(-theta·Z + 0.5 ||theta||^2).
+    - Cópula t: mezcla defensiva sobre W. Cada día, con probabilidad alpha, W ~ lambda * Chi2(nu)
+      (lambda < 1: shock de cola gorda); si no, W ~ Chi2(nu). Peso diario:
+      1 / ((1 - alpha) + alpha * g_lambda(W) / f(W)), acotado por 1 / (1 - alpha),
+      por lo que los pesos no degeneran en horizontes largos.
+    Las muestras deben ponderarse con exp(log_weights) (RiskReporter.calculate_weighted_metrics).
+    """
+    name = "importance"
+    weighted = True
+
+    def __init__(self, shift: float = 2.33, mixing_tilt: float = 0.5, mixing_days: float = 1.0,
+                 theta: np.ndarray = None, mixing_prob: float = 0.0):
+        """
+        Args:
+            shift: Desplazamiento total en desvíos estándar del retorno del portafolio
+                   a lo largo del horizonte (2.33 ~ cuantil 99% normal).
+            mixing_tilt: lambda de la variable de mezcla (1.0 = sin inclinación).
+            mixing_days: Días inclinados esperados por trayectoria (alpha = mixing_days / horizon).
+            theta, mixing_prob: Estado por simulación (los calcula prepare()).
+        """
+        if not 0 < mixing_tilt <= 1:
+            raise ValueError("mixing_tilt debe estar en (0, 1].")
+        self.shift = shift
+        self.mixing_tilt = mixing_tilt
+        self.mixing_days = mixing_days
+        self.theta = theta
+        self.mixing_prob = mixing_prob
+
+    def config(self) -> dict:
+        # theta / mixing_prob son estado por simulación (derivado por prepare()), no configuración
+        return {"name": self.name, "shift": float(self.shift), "mixing_tilt": float(self.mixing_tilt),
+                "mixing_days": float(self.mixing_days)}
+
+    def prepare(self, strategy, initial_prices, horizon, weights=None):
+        """
+        Dirección de pérdida: el retorno del portafolio responde a Z vía A^T e
+        (StochasticModel.shock_exposure), con e = exposición relativa por activo.
+        theta = -shift * d / sqrt(horizon).
+        """
+        units = np.ones(len(initial_prices)) if weights is None else np.asarray(weights, dtype=float)
+        exposure = units * np.asarray(initial_prices, dtype=float)
+        exposure = exposure / exposure.sum()
+        direction = strategy.shock_exposure(exposure)
+        theta = -self.shift * direction / (np.linalg.norm(direction) * np.sqrt(horizon))
+        mixing_prob = min(1.0, self.mixing_days / horizon)
+        return ImportanceSampler(self.shift, self.mixing_tilt, self.mixing_days, theta, mixing_prob)
+
+    def normals(self, rng, days, n_sims, n_dims, log_weights=None):
+        Z = rng.standard_normal(size=(days, n_sims, n_dims))
+        if self.theta is None:
+            return Z
+        Z += self.theta
+        if log_weights is not None:
+            log_weights -= (Z @ self.theta).sum(axis=0)
+            log_weights += 0.5 * days * (self.theta @ self.theta)
+        return Z
+
+    def chisquare(self, rng, df, days, n_sims, log_weights=None):
+        W = rng.chisquare(df, size=(days, n_sims, 1))
+        if self.mixing_tilt == 1.0 or self.mixing_prob == 0.0:
+            return W
+        tilted = rng.random(size=W.shape) < self.mixing_prob
+        W[tilted] *= self.mixing_tilt
+        if log_weights is not None:
+            # g_lambda / f = lambda^(-nu/2) * exp(-W (1/lambda - 1) / 2)
+            density_ratio = self.mixing_tilt ** (-0.5 * df) * np.exp(-0.5 * W * (1.0 / self.mixing_tilt - 1.0))
+            log_weights -= np.log((1.0 - self.mixing_prob) + self.mixing_prob * density_ratio)[:, :, 0].sum(axis=0)
+        return W
+
+
+SAMPLERS = {
+    ShockSampler.name: ShockSampler,
+    AntitheticSampler.name: AntitheticSampler,
+    SobolSampler.name: SobolSampler,
+    ImportanceSampler.name: ImportanceSampler,
+}
+
+
+def make_sampler(name: str = "pseudo") -> ShockSampler:
+    """Fábrica por nombre (usada por la API y Settings)."""
+    if name not in SAMPLERS:
+        raise ValueError(f"Método de muestreo desconocido: {name}")
+    return SAMPLERS[name]()
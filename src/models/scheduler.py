@@ -0,0 +1,205 @@
+import importlib.util
+import os
+import numpy as np
+from src.config.settings import settings
+from src.models.base import StochasticModel
+from src.models.monte_carlo import MonteCarloEngine
+from src.models import random_streams
+from src.utils.risk_stats import DEFAULT_CONFIDENCES
+from src.utils.instrumentation import stage, timed
+
+# Buffers vivos por bloque en modo streaming: Z, shocks correlacionados y shocks mezclados
+BLOCK_BUFFERS = 3
+
+
+def available_memory():
+    """Bytes de RAM disponibles (MemAvailable en Linux), o None si no se puede determinar."""
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def tune_block_days(n_assets: int, cache_bytes: int = None) -> int:
+    """
+    Días por bloque streaming para que el working set de un bloque canónico
+    (SIMS_PER_STREAM simulaciones) quepa en cache_bytes (default: settings.SCHEDULER_CACHE_BYTES).
+    Depende solo de la configuración y de n_assets, nunca del hardware detectado:
+    block_days define el orden del stream de la cópula t y debe ser reproducible.
+    """
+    cache_bytes = cache_bytes or settings.SCHEDULER_CACHE_BYTES
+    day_bytes = BLOCK_BUFFERS * random_streams.SIMS_PER_STREAM * n_assets * np.dtype(float).itemsize
+    return max(1, int(cache_bytes // day_bytes))
+
+
+class AdaptiveMonteCarlo(MonteCarloEngine):
+    """
+    Motor con selección automática de backend (misma API que MonteCarloEngine):
+    - "local":   un thread, vectorizado (jobs chicos: sin overhead de paralelismo).
+    - "threads": bloques canónicos repartidos en un pool de threads (NumPy libera el GIL).
+    - "ray":     pool de actores de DistributedMonteCarlo (jobs muy grandes o clúster).
+    La decisión usa el costo n_sims * horizon * n_assets y la memoria disponible.
+    Los streams son por bloque canónico y block_days depende solo de la configuración y
+    de n_assets: el backend elegido no cambia el resultado, y
+    MonteCarloEngine(strategy, seed, block_days=tune_block_days(n_assets)) lo reproduce.
+    La estrategia no se modifica: block_days vive en el engine.
+    """
+
+    def __init__(self, strategy: StochasticModel, seed: int = None,
+                 bit_generator: str = random_streams.DEFAULT_BIT_GENERATOR,
+                 max_threads: int = None, allow_ray: bool = True):
+        """
+        Args:
+            max_threads: Techo de threads (default: todos los cores).
+            allow_ray: False en procesos que no deben levantar Ray (ej. workers de la API).
+        """
+        super().__init__(strategy, seed=seed, bit_generator=bit_generator)
+        self.max_threads = max_threads or os.cpu_count() or 1
+        self.allow_ray = allow_ray
+        self.last_plan = None
+        self._distributed = None
+
+    @timed("train")
+    def train(self, log_returns):
+        super().train(log_returns)
+        if self._distributed is not None:
+            self._distributed._broadcast_params()
+
+    @timed("train")
+    def update(self, new_returns, window=None):
+        super().update(new_returns, window=window)
+        # Los actores de Ray tienen la versión anterior: se publica la nueva
+        if self._distributed is not None:
+            self._distributed._broadcast_params()
+        return self
+
+    def plan(self, horizon: int, n_sims: int, distributable: bool = True) -> dict:
+        """
+        Plan de ejecución de un job: {"backend", "workers", "block_days", "cost", "working_set"}.
+        Sin efectos: no modifica el engine, la estrategia ni el pool de Ray.
+
+        Args:
+            distributable: False si la operación no existe en el backend Ray
+                           (variable de control, batch de portafolios, tensor completo).
+        """
+        if getattr(self.strategy, "chol_matrix", None) is None:
+            raise ValueError("El modelo no ha sido entrenado. Ejecute .train() primero.")
+
+        n_assets = self.strategy.n_assets
+        block_days = tune_block_days(n_assets)
+        # Samplers sin streaming (ej. Sobol) simulan el horizonte completo en un bloque
+        live_days = min(block_days, horizon) if self.strategy.sampler.supports_streaming else horizon
+
+        cost = float(n_sims) * horizon * n_assets
+        n_blocks = len(random_streams.stream_blocks(n_sims))
+        working_set = (BLOCK_BUFFERS * live_days * random_streams.SIMS_PER_STREAM
+                       * n_assets * np.dtype(float).itemsize)
+
+        # Cada worker concurrente mantiene su propio working set en memoria
+        memory = available_memory()
+        memory_workers = n_blocks
+        if memory is not None:
+            memory_workers = max(1, int(memory * settings.SCHEDULER_MEMORY_FRACTION // working_set))
+
+        backend, workers = "local", 1
+        if cost > settings.SCHEDULER_LOCAL_MAX_COST and n_blocks > 1:
+            if (distributable and self.allow_ray and cost >= settings.SCHEDULER_RAY_MIN_COST
+                    and importlib.util.find_spec("ray") is not None):
+                backend, workers = "ray", min(os.cpu_count() or 1, n_blocks)
+            else:
+                workers = min(self.max_threads, n_blocks, memory_workers)
+                backend = "threads" if workers > 1 else "local"
+
+        return {"backend": backend, "workers": workers, "block_days": block_days,
+                "cost": cost, "working_set": working_set}
+
+    def _select(self, horizon: int, n_sims: int, distributable: bool = True) -> dict:
+        plan = self.plan(horizon, n_sims, distributable=distributable)
+        self.last_plan = plan
+        self.n_threads = plan["workers"] if plan["backend"] == "threads" else 1
+        self.block_days = plan["block_days"]
+        print(f"🧭 [Scheduler] Backend {plan['backend']} ({plan['workers']} workers, "
+              f"bloques de {plan['block_days']} días, costo {plan['cost']:.1e})")
+        return plan
+
+    def _ray_engine(self, workers: int):
+        """Pool de Ray persistente, creado solo cuando un job lo justifica."""
+        if (self._distributed is None or self._distributed.n_workers != workers
+                or self._distributed.block_days != self.block_days):
+            self._drop_distributed()
+            # Import diferido: Ray es pesado y opcional para jobs chicos
+            from src.models.distributed import DistributedMonteCarlo
+            self._distributed = DistributedMonteCarlo(self.strategy, n_workers=workers, seed=self.seed,
+                                                      bit_generator=self.bit_generator,
+                                                      block_days=self.block_days)
+        return self._distributed
+
+    def _drop_distributed(self):
+        if self._distributed is not None:
+            self._distributed.shutdown()
+            self._distributed = None
+
+    @timed("simulate")
+    def simulate(self, current_prices: np.ndarray, horizon: int = 252, n_sims: int = 1000,
+                 mode: str = "paths"):
+        self._select(horizon, n_sims, distributable=False)
+        return super().simulate(current_prices, horizon=horizon, n_sims=n_sims, mode=mode)
+
+    @timed("simulate")
+    def simulate_pnl(self, current_prices: np.ndarray, horizon: int = 252, n_sims: int = 1000,
+                     control_variate: bool = False):
+        plan = self._select(horizon, n_sims, distributable=not control_variate)
+        if plan["backend"] != "ray":
+            return super().simulate_pnl(current_prices, horizon=horizon, n_sims=n_sims,
+                                        control_variate=control_variate)
+
+        distributed = self._ray_engine(plan["workers"])
+        pnl = distributed.simulate_pnl(current_prices, horizon, n_sims)
+        self.last_seed = distributed.last_seed
+        self.weights = distributed.weights
+        self.control_pnl = self.control_mean = None
+        return pnl
+
+    @timed("simulate")
+    def simulate_portfolios(self, current_prices: np.ndarray, positions: np.ndarray,
+                            horizon: int = 252, n_sims: int = 1000):
+        self._select(horizon, n_sims, distributable=False)
+        return super().simulate_portfolios(current_prices, positions, horizon=horizon, n_sims=n_sims)
+
+    @timed("simulate")
+    def simulate_horizons(self, current_prices: np.ndarray, horizons, n_sims: int = 1000):
+        self._select(max(horizons), n_sims, distributable=False)
+        return super().simulate_horizons(current_prices, horizons, n_sims=n_sims)
+
+    @timed("simulate")
+    def simulate_to_store(self, store, current_prices: np.ndarray, horizon: int = 252, n_sims: int = 1000,
+                          mode: str = "terminal"):
+        self._select(horizon, n_sims, distributable=False)
+        return super().simulate_to_store(store, current_prices, horizon=horizon, n_sims=n_sims, mode=mode)
+
+    def simulate_risk(self, current_prices: np.ndarray, horizon: int = 252, n_sims: int = 1000,
+                      confidences=DEFAULT_CONFIDENCES):
+        plan = self.plan(horizon, n_sims)
+        if plan["backend"] != "ray":
+            # simulate_pnl() vuelve a planificar y anuncia el backend local / threads
+            return super().simulate_risk(current_prices, horizon=horizon, n_sims=n_sims,
+                                         confidences=confidences)
+
+        # Con Ray la reducción de cola ocurre en los workers: se mide como parte de "simulate"
+        with stage("simulate"):
+            plan = self._select(horizon, n_sims)
+            distributed = self._ray_engine(plan["workers"])
+            metrics = distributed.simulate_risk(current_prices, horizon, n_sims, confidences=confidences)
+        self.last_seed = distributed.last_seed
+        return metrics
+
+    def shutdown(self):
+        """Libera el pool de Ray si se llegó a crear."""
+        self._drop_distributed()
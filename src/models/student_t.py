@@ -1,64 +1,141 @@
 import numpy as np
 import pandas as pd
-from scipy.stats import t
 from src.models.base import StochasticModel
+from src.models.sampling import ShockSampler
+from src.models.jit import resolve_backend
+from src.models.calibration_cache import CalibrationCache
+from src.models.covariance import DEFAULT_N_FACTORS
+from src.models.estimators import FALLBACK_NU, fit_student_t, fit_student_t_mle
 
 class StudentTStrategy(StochasticModel):
     """
     Estrategia Concreta: Monte Carlo con Cópula t-Student.
     """
-    def __init__(self):
+    PARAM_NAMES = ("mu", "chol_matrix", "idio_vol", "nu", "n_assets")
+
+    # Limitamos Nu entre 2.5 (Colas muy gordas) y 30 (Casi normal)
+    NU_BOUNDS = (2.5, 30.0)
+
+    # "fast": ECME vectorizado sobre todas las columnas; "mle": scipy t.fit exacto en pool de procesos
+    NU_METHODS = ("fast", "mle")
+
+    def __init__(self, sampler: ShockSampler = None, cache: CalibrationCache = None,
+                 nu_method: str = "fast", dtype=np.float64,
+                 backend: str = "numpy", covariance: str = "sample",
+                 n_factors: int = DEFAULT_N_FACTORS, shrinkage: bool = False, halflife: float = None):
+        """
+        Args:
+            sampler: Capa de muestreo de shocks (default: pseudo-aleatorio).
+            cache: Caché de calibraciones (opcional). Reutiliza parámetros completos
+                   y los nu por ticker cuando los datos no cambian.
+            nu_method: Estimador de grados de libertad ("fast" o "mle").
+            dtype: Precisión de simulate() (np.float64 o np.float32).
+            backend: "numpy" o "numba" para el modo streaming (NumPy si Numba no está instalado).
+            covariance: "sample" (Cholesky denso) o "factor" (PCA + idiosincrático, universos grandes).
+            n_factors: Factores del modelo "factor".
+            shrinkage: Ledoit-Wolf sobre la covarianza estimada.
+            halflife: Vida media (días) de media y covarianza EWMA (None = ventana equiponderada).
+        """
+        if nu_method not in self.NU_METHODS:
+            raise ValueError(f"Estimador de nu desconocido: {nu_method}")
+        self.sampler = sampler or ShockSampler()
+        self.cache = cache
+        self.nu_method = nu_method
+        self.dtype = np.dtype(dtype).type
+        self.backend = resolve_backend(backend)
+        self.covariance = covariance
+        self.n_factors = n_factors
+        self.shrinkage = shrinkage
+        self.halflife = halflife
         self.mu = None
         self.chol_matrix = None
+        self.idio_vol = None
         self.nu = None
         self.n_assets = None
 
+    def _fit_nu_batch(self, log_returns: pd.DataFrame) -> np.ndarray:
+        """Nu por activo para todas las columnas en una sola llamada al estimador."""
+        values = log_returns.to_numpy(dtype=float)
+        if self.nu_method == "mle":
+            nus = fit_student_t_mle(values)
+        else:
+            nus = fit_student_t(values)[2]
+
+        failed = ~np.isfinite(nus)
+        if failed.any() and self.nu_method == "fast":
+            # El ajuste vectorizado no convergió: MLE exacto (pool de procesos) solo para esas columnas
+            print(f"⚠️ Ajuste rápido de nu fallido para {list(log_returns.columns[failed])}, usando MLE")
+            nus = nus.copy()
+            nus[failed] = fit_student_t_mle(values[:, failed])
+            failed = ~np.isfinite(nus)
+        if failed.any():
+            print(f"⚠️ Nu no estimable para {list(log_returns.columns[failed])}, usando {FALLBACK_NU}")
+            nus = np.where(failed, FALLBACK_NU, nus)
+        return nus
+
+    def _fit_nus(self, log_returns: pd.DataFrame) -> list:
+        """
+        Nu por ticker. Con caché, cada ajuste se guarda por separado:
+        agregar un ticker al universo solo ajusta ese ticker.
+        """
+        if self.cache is None:
+            return list(self._fit_nu_batch(log_returns))
+
+        keys = {col: self.cache.fingerprint(log_returns[col], model="student_t_nu", method=self.nu_method)
+                for col in log_returns.columns}
+        nus = {}
+        for col, key in keys.items():
+            cached = self.cache.get(key)
+            if cached is not None:
+                nus[col] = cached["nu"]
+
+        # Los tickers sin caché se ajustan juntos (un solo lote vectorizado)
+        missing = [col for col in log_returns.columns if col not in nus]
+        if missing:
+            for col, nu in zip(missing, self._fit_nu_batch(log_returns[missing])):
+                nus[col] = float(nu)
+                self.cache.put(keys[col], {"nu": nus[col]})
+        return [nus[col] for col in log_returns.columns]
+
     def train(self, log_returns: pd.DataFrame):
+        cache_key = None
+        if self.cache is not None:
+            cache_key = self.cache.fingerprint(log_returns, model=self.__class__.__name__,
+                                               nu_bounds=self.NU_BOUNDS, nu_method=self.nu_method,
+                                               covariance=self.covariance, n_factors=self.n_factors,
+                                               shrinkage=self.shrinkage, halflife=self.halflife)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                self.set_params(cached)
+                self._track_online(log_returns)
+                print(f"♻️ [Strategy] Calibración t-Student desde caché. Nu promedio: {self.nu:.2f}")
+                return
+
         self.n_assets = log_returns.shape[1]
-        nus = []
-        for col in log_returns.columns:
-            try:
-                params = t.fit(log_returns[col])
-                nus.append(params[2])
-            except:
-                nus.append(4.0) # Fallback conservador
-        raw_nu = np.mean(nus)
+        self._fit_tail(log_returns)
+        self._fit_moments(log_returns)
+        self._set_derived()
+
+        if cache_key is not None:
+            self.cache.put(cache_key, self.get_params())
+        print(f"🧠 [Strategy] Modelo t-Student calibrado. Nu promedio: {self.nu:.2f}")
+
+    def _fit_tail(self, log_returns: pd.DataFrame):
+        """Nu promedio de los activos (ajustes por ticker, con caché si existe)."""
+        raw_nu = np.mean(self._fit_nus(log_returns))
 
         # === 🛡️ FIX DE SEGURIDAD (CLAMPING) 🛡️ ===
-        # Limitamos Nu entre 2.5 (Colas muy gordas) y 30 (Casi normal)
         # Esto evita explosiones numéricas e infinitos.
-        self.nu = np.clip(raw_nu, 2.5, 30.0)
-        self.mu = log_returns.mean().values
-        cov_matrix = log_returns.cov().values
-        try:
-            self.chol_matrix = np.linalg.cholesky(cov_matrix)
-        except np.linalg.LinAlgError:
-            print("⚠️ Advertencia: Regularizando matriz de covarianza.")
-            cov_matrix += np.eye(self.n_assets) * 1e-6
-            self.chol_matrix = np.linalg.cholesky(cov_matrix)
-        print(f"🧠 [Strategy] Modelo t-Student calibrado. Nu promedio: {self.nu:.2f}")
+        self.nu = float(np.clip(raw_nu, *self.NU_BOUNDS))
+
+    def _mixing_scale(self, days: int, n_sims: int, rng: np.random.Generator,
+                      sampler: ShockSampler = None, log_weights: np.ndarray = None) -> np.ndarray:
+        # T = Z / sqrt(W / nu): la escala es común a todos los activos (cópula t)
+        sampler = sampler or self.sampler
+        W = sampler.chisquare(rng, self.nu, days, n_sims, log_weights=log_weights) / self.nu
+        return 1.0 / np.sqrt(W)
 
-    def simulate(self, initial_prices: np.ndarray, horizon: int, n_sims: int) -> np.ndarray:
-        if self.chol_matrix is None:
-            raise ValueError("El modelo no ha sido entrenado. Ejecute .train() primero.")
-            
-        # 1. Shocks
-        Z = np.random.normal(0, 1, size=(horizon, n_sims, self.n_assets))
-        W = np.random.chisquare(self.nu, size=(horizon, n_sims, 1)) / self.nu
-        T_shocks = Z / np.sqrt(W)
-        
-        # 2. Correlación
-        correlated_shocks = np.einsum('tsa,ba->tsb', T_shocks, self.chol_matrix)
-
-        # 3. Trayectorias
-        simulations = np.zeros((horizon + 1, n_sims, self.n_assets))
-        simulations[0] = initial_prices
-        
-        sigma_sq = np.diag(self.chol_matrix @ self.chol_matrix.T)
-        drift = self.mu - 0.5 * sigma_sq
-        
-        log_returns = (drift * 1) + correlated_shocks
-        cumulative_returns = np.cumsum(log_returns, axis=0)
-        simulations[1:] = initial_prices * np.exp(cumulative_returns)
-        
-        return np.transpose(simulations[1:], (1, 0, 2))
\ No newline at end of file
+    def simulate(self, initial_prices: np.ndarray, horizon: int, n_sims: int,
+                 rng: np.random.Generator = None) -> np.ndarray:
+        # Shocks t (Z / sqrt(W)) correlacionados (Cholesky o factores), kernel fusionado in-place
+        return self._simulate_paths(initial_prices, horizon, n_sims, rng=rng)
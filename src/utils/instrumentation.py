@@ -0,0 +1,218 @@
+import contextvars
+import functools
+import os
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# Etapas canónicas del pipeline (las que instrumentan loader, engine y reporter)
+STAGES = ("ingest", "transform", "load", "train", "simulate", "reduce", "report")
+
+# Buckets de latencia (segundos): desde métricas en ms hasta Monte Carlo de minutos
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+METRIC_PREFIX = "riskengine"
+
+
+def current_rss() -> int:
+    """RSS actual del proceso en bytes (Linux: /proc/self/statm), 0 si no está disponible."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def peak_rss() -> int:
+    """Pico histórico de RSS del proceso en bytes (ru_maxrss: KiB en Linux, bytes en macOS)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class MetricsRegistry:
+    """
+    Registro mínimo de métricas en formato de exposición de Prometheus (text 0.0.4).
+    Sin dependencia de prometheus_client: counters, gauges e histogramas con labels.
+    Thread-safe (los callbacks de jobs corren en threads del executor).
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._meta = {}    # nombre -> (tipo, ayuda)
+        self._values = {}  # (nombre, labels) -> float | [bucket_counts, suma, count]
+
+    @staticmethod
+    def _labels(labels: dict) -> tuple:
+        return tuple(sorted(labels.items()))
+
+    def _declare(self, name: str, kind: str, help_text: str):
+        self._meta.setdefault(name, (kind, help_text))
+
+    def inc(self, name: str, help_text: str, amount: float = 1.0, **labels):
+        with self._lock:
+            self._declare(name, "counter", help_text)
+            key = (name, self._labels(labels))
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def set(self, name: str, help_text: str, value: float, **labels):
+        with self._lock:
+            self._declare(name, "gauge", help_text)
+            self._values[(name, self._labels(labels))] = float(value)
+
+    def observe(self, name: str, help_text: str, value: float, **labels):
+        with self._lock:
+            self._declare(name, "histogram", help_text)
+            key = (name, self._labels(labels))
+            state = self._values.setdefault(key, [[0] * len(self.buckets), 0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+            state[1] += value
+            state[2] += 1
+
+    def get(self, name: str, **labels):
+        """Valor actual (counter / gauge) o (suma, count) de un histograma; None si no existe."""
+        with self._lock:
+            value = self._values.get((name, self._labels(labels)))
+        if isinstance(value, list):
+            return value[1], value[2]
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._meta.clear()
+            self._values.clear()
+
+    @staticmethod
+    def _format_labels(labels) -> str:
+        if not labels:
+            return ""
+        escape = lambda v: str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        return "{" + ",".join(f'{k}="{escape(v)}"' for k, v in labels) + "}"
+
+    def render(self) -> str:
+        """Texto para el endpoint /metrics."""
+        with self._lock:
+            values = sorted(self._values.items(), key=lambda item: item[0])
+            meta = dict(self._meta)
+
+        lines, declared = [], set()
+        for (name, labels), value in values:
+            kind, help_text = meta[name]
+            if name not in declared:
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+                declared.add(name)
+            if kind != "histogram":
+                lines.append(f"{name}{self._format_labels(labels)} {value}")
+                continue
+            counts, total, count = value
+            for bound, bucket_count in zip(self.buckets, counts):
+                lines.append(f"{name}_bucket{self._format_labels(labels + (('le', repr(bound)),))} {bucket_count}")
+            lines.append(f"{name}_bucket{self._format_labels(labels + (('le', '+Inf'),))} {count}")
+            lines.append(f"{name}_sum{self._format_labels(labels)} {total}")
+            lines.append(f"{name}_count{self._format_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+
+# Registro del proceso (el API lo expone en /metrics)
+REGISTRY = MetricsRegistry()
+
+
+def observe_stage(name: str, seconds: float, peak_bytes: float = None, registry: MetricsRegistry = None):
+    """Publica la medición de una etapa en el registro de Prometheus."""
+    registry = registry or REGISTRY
+    registry.observe(f"{METRIC_PREFIX}_stage_seconds", "Duración de cada etapa del pipeline", seconds, stage=name)
+    if peak_bytes is not None:
+        registry.set(f"{METRIC_PREFIX}_stage_peak_rss_bytes", "Pico de RSS del proceso al cerrar la etapa",
+                     peak_bytes, stage=name)
+
+
+def observe_stages(stages: dict, registry: MetricsRegistry = None):
+    """Publica el resumen de etapas de un request (StageRecorder.summary()) medido en otro proceso."""
+    for name, record in (stages or {}).items():
+        observe_stage(name, record["seconds"], record["peak_rss_mb"] * 2 ** 20, registry=registry)
+
+
+class StageRecorder:
+    """Tiempos y memoria por etapa de un request (metadata de la respuesta)."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = {}
+
+    def add(self, name: str, seconds: float, peak_bytes: int, delta_bytes: int):
+        record = self.stages.setdefault(name, {"seconds": 0.0, "peak_rss_mb": 0.0, "rss_delta_mb": 0.0})
+        record["seconds"] += seconds
+        record["peak_rss_mb"] = max(record["peak_rss_mb"], peak_bytes / 2 ** 20)
+        record["rss_delta_mb"] += delta_bytes / 2 ** 20
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def summary(self) -> dict:
+        """{etapa: {"seconds", "peak_rss_mb", "rss_delta_mb"}} redondeado, en orden de ejecución."""
+        return {name: {key: round(value, 4 if key == "seconds" else 1) for key, value in record.items()}
+                for name, record in self.stages.items()}
+
+    def format(self) -> str:
+        """Tabla legible para logs (main.py)."""
+        lines = [f"   {name:<10} {record['seconds']:9.3f}s  pico RSS {record['peak_rss_mb']:8.1f} MB"
+                 for name, record in self.stages.items()]
+        return "\n".join(lines + [f"   {'total':<10} {self.elapsed:9.3f}s"])
+
+
+# Recorder del request en curso y etapas abiertas (por contexto: thread / tarea async)
+_recorder = contextvars.ContextVar("stage_recorder", default=None)
+_open_stages = contextvars.ContextVar("open_stages", default=())
+
+
+@contextmanager
+def recording():
+    """Activa un StageRecorder para todas las etapas ejecutadas dentro del bloque."""
+    recorder = StageRecorder()
+    token = _recorder.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _recorder.reset(token)
+
+
+@contextmanager
+def stage(name: str):
+    """
+    Mide una etapa: duración, pico de RSS y variación de RSS.
+    Una etapa anidada en otra del mismo nombre no se vuelve a contar
+    (ej. AdaptiveMonteCarlo.simulate_pnl -> MonteCarloEngine.simulate_pnl).
+    """
+    if name in _open_stages.get():
+        yield
+        return
+
+    token = _open_stages.set(_open_stages.get() + (name,))
+    rss_before = current_rss()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        _open_stages.reset(token)
+        peak = peak_rss()
+        observe_stage(name, seconds, peak)
+        recorder = _recorder.get()
+        if recorder is not None:
+            recorder.add(name, seconds, peak, current_rss() - rss_before)
+
+
+def timed(name: str):
+    """Decorador equivalente a `with stage(name):` alrededor de la función."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
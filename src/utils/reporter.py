@@ -2,18 +2,45 @@ import os
 import numpy as np
 import pandas as pd
 from datetime import datetime
+from src.utils.risk_stats import TailBuffer, format_metrics, tail_metrics
+from src.utils.instrumentation import timed
 
 class RiskReporter:
+    GOLD_TABLE = "risk_metrics_history"
+
     def __init__(self, output_dir="output", gold_dir="data/gold"):
         self.output_dir = output_dir
         self.gold_dir = gold_dir
         os.makedirs(self.output_dir, exist_ok=True)
         os.makedirs(self.gold_dir, exist_ok=True)
+        self._gold_store = None
+
+    @property
+    def gold_store(self):
+        """Tabla de historial de la Capa Oro (append-only, particionada por fecha)."""
+        if self._gold_store is None:
+            # Import diferido: pyarrow.dataset solo se carga cuando se persiste o consulta historial
+            from src.data.gold_store import GoldStore
+            self._gold_store = GoldStore(self.gold_dir, table=self.GOLD_TABLE)
+            # Historial de un solo archivo (versiones anteriores): se migra una vez
+            self._gold_store.migrate_legacy(os.path.join(self.gold_dir, f"{self.GOLD_TABLE}.parquet"))
+        return self._gold_store
+
+    def load_history(self, start=None, end=None, columns=None) -> pd.DataFrame:
+        """Historial de métricas en [start, end] (lectura con poda de particiones y pushdown)."""
+        return self.gold_store.query(start=start, end=end, columns=columns)
 
     def compute_pnl(self, simulated_paths: np.ndarray) -> np.ndarray:
-        """Calcula PnL del portafolio (Equiponderado)."""
+        """
+        Calcula PnL del portafolio (Equiponderado).
+        Acepta trayectorias 3D (n_sims, days, n_assets) o el valor del
+        portafolio ya agregado en modo streaming (n_sims, days).
+        """
         # Sumamos precios de todos los activos en cada día/simulación
-        portfolio_paths = simulated_paths.sum(axis=2) # (n_sims, days)
+        if simulated_paths.ndim == 3:
+            portfolio_paths = simulated_paths.sum(axis=2) # (n_sims, days)
+        else:
+            portfolio_paths = simulated_paths
         
         # Retorno Total al final del horizonte
         initial_value = portfolio_paths[:, 0]
@@ -22,26 +49,144 @@ class RiskReporter:
         # PnL %
         return (final_value / initial_value) - 1
 
+    @staticmethod
+    def compute_terminal_pnl(terminal_prices: np.ndarray, initial_prices: np.ndarray) -> np.ndarray:
+        """
+        PnL equiponderado desde precios terminales (modo streaming "terminal").
+        Base: precios iniciales (día 0) del portafolio.
+        """
+        initial_value = np.asarray(initial_prices, dtype=float).sum()
+        final_value = terminal_prices.sum(axis=1)
+        return (final_value / initial_value) - 1
+
+    @staticmethod
+    def compute_portfolio_pnl(terminal_prices: np.ndarray, initial_prices: np.ndarray,
+                              positions: np.ndarray) -> np.ndarray:
+        """
+        PnL de muchos portafolios sobre la misma simulación: una sola multiplicación matricial.
+
+        Args:
+            terminal_prices: (n_sims, n_assets).
+            positions: (n_portfolios, n_assets) unidades por activo (fila de unos = equiponderado).
+        Retorna: (n_sims, n_portfolios)
+        """
+        positions = np.atleast_2d(np.asarray(positions, dtype=float))
+        initial_values = positions @ np.asarray(initial_prices, dtype=float)
+        return (terminal_prices @ positions.T) / initial_values - 1
+
     def calculate_metrics(self, pnl_array: np.ndarray, confidence=0.95):
-        """Calcula VaR y CVaR."""
-        var_percentile = (1 - confidence) * 100
-        
-        var_value = np.percentile(pnl_array, var_percentile)
-        cvar_value = pnl_array[pnl_array <= var_value].mean()
-        
-        # Cálculo extremo (99%)
-        var_99 = np.percentile(pnl_array, 1)
-        cvar_99 = pnl_array[pnl_array <= var_99].mean()
-        
-        return {
-            f"VaR {int(confidence*100)}%": var_value,
-            f"CVaR {int(confidence*100)}%": cvar_value,
-            "VaR 99%": var_99,
-            "CVaR 99%": cvar_99
-        }
+        """
+        Calcula VaR y CVaR (nivel solicitado + extremo 99%).
+        Una sola partición para todos los niveles (ver src/utils/risk_stats.py).
+        """
+        return format_metrics(tail_metrics(pnl_array, (confidence, 0.99)))
+
+    def calculate_weighted_metrics(self, pnl_array: np.ndarray, weights: np.ndarray, confidence=0.95,
+                                   extra_levels=(0.99, 0.999)):
+        """
+        VaR y CVaR con pesos de verosimilitud (muestreo por importancia).
+        CDF estimada: F(x) = (1/n) * sum w_i * 1{x_i <= x}; el CVaR corrige el átomo en el VaR.
+        """
+        levels = (confidence,) + tuple(extra_levels)
+        return format_metrics(tail_metrics(pnl_array, levels, weights=weights))
+
+    def calculate_batch_metrics(self, pnl_matrix: np.ndarray, confidence=0.95, weights: np.ndarray = None):
+        """
+        Métricas por portafolio (columna de pnl_matrix). Con pesos de verosimilitud
+        se usa la CDF ponderada e incluye el nivel 99.9%.
+        Retorna: lista de dicts de métricas, en el orden de las columnas.
+        """
+        if weights is None:
+            return [self.calculate_metrics(pnl_matrix[:, j], confidence) for j in range(pnl_matrix.shape[1])]
+        return [self.calculate_weighted_metrics(pnl_matrix[:, j], weights, confidence)
+                for j in range(pnl_matrix.shape[1])]
 
-    def generate_report(self, metrics, params):
-        """Genera TXT y guarda en CAPA ORO."""
+    def calculate_horizon_metrics(self, pnl_matrix: np.ndarray, horizons, confidence=0.95,
+                                  weights: np.ndarray = None):
+        """
+        Grilla horizonte x confianza a partir de MonteCarloEngine.simulate_horizons()
+        (una columna de PnL por horizonte, misma simulación).
+        Retorna: {horizonte (días): {'VaR 95%': ..., 'CVaR 95%': ..., ...}}.
+        """
+        columns = self.calculate_batch_metrics(pnl_matrix, confidence, weights=weights)
+        return {int(h): metrics for h, metrics in zip(horizons, columns)}
+
+    def evaluate_scenarios(self, scenarios, positions: np.ndarray = None, confidence=0.95):
+        """
+        What-if sobre un set persistido (ScenarioStore): métricas de portafolios nuevos
+        leyendo chunk a chunk, sin re-simular. Cada portafolio mantiene solo su cola (TailBuffer):
+        memoria O(chunk + cola), mismo resultado que calculate_batch_metrics() sobre el set completo.
+
+        Args:
+            scenarios: ScenarioSet (MonteCarloEngine.simulate_to_store / ScenarioStore.open).
+            positions: (n_portfolios, n_assets) unidades por activo (default: 1 c/u).
+        Retorna: lista de dicts de métricas, en el orden de las filas de positions.
+        """
+        levels = (confidence, 0.99, 0.999) if scenarios.weighted else (confidence, 0.99)
+        if positions is None:
+            positions = np.ones(len(scenarios.initial_prices))
+        positions = np.atleast_2d(np.asarray(positions, dtype=float))
+        buffers = [TailBuffer(1 - min(levels), scenarios.n_sims, weighted=scenarios.weighted)
+                   for _ in range(positions.shape[0])]
+
+        for terminal, log_weights in scenarios.terminal_chunks():
+            pnl = self.compute_portfolio_pnl(np.asarray(terminal), scenarios.initial_prices, positions)
+            weights = None if log_weights is None else np.exp(log_weights)
+            for j, buffer in enumerate(buffers):
+                buffer.update(pnl[:, j], weights)
+        return [format_metrics(buffer.metrics(levels)) for buffer in buffers]
+
+    @staticmethod
+    def control_variate_mean(pnl_array: np.ndarray, control: np.ndarray, control_mean: float):
+        """
+        Estimador con variable de control: mean(Y - b (C - E[C])), b* = Cov(Y,C) / Var(C).
+        Retorna (estimación, error estándar).
+        """
+        var_c = control.var(ddof=1)
+        beta = 0.0 if var_c == 0 else np.cov(pnl_array, control)[0, 1] / var_c
+        adjusted = pnl_array - beta * (control - control_mean)
+        return adjusted.mean(), adjusted.std(ddof=1) / np.sqrt(len(adjusted))
+
+    def calculate_standard_errors(self, pnl_array: np.ndarray, confidence=0.95, paired=False,
+                                  control: np.ndarray = None, control_mean: float = None, z=1.96):
+        """
+        Errores estándar Monte Carlo de las métricas.
+        - Media: desviación / sqrt(n). Con paired=True (antitéticas) se usan promedios por par.
+        - VaR: intervalo de estadísticos de orden (libre de distribución) / (2z).
+        - Con variable de control: media ajustada y su error estándar.
+        """
+        pnl_eff, control_eff = pnl_array, control
+        if paired:
+            n_pairs = len(pnl_array) // 2
+            pnl_eff = pnl_array[:2 * n_pairs].reshape(n_pairs, 2).mean(axis=1)
+            if control is not None:
+                control_eff = control[:2 * n_pairs].reshape(n_pairs, 2).mean(axis=1)
+
+        errors = {"SE Mean PnL": pnl_eff.std(ddof=1) / np.sqrt(len(pnl_eff))}
+
+        n = len(pnl_array)
+        for level in (confidence, 0.99):
+            p = 1 - level
+            half_width = z * np.sqrt(n * p * (1 - p))
+            lo = int(np.clip(np.floor(n * p - half_width), 0, n - 1))
+            hi = int(np.clip(np.ceil(n * p + half_width), 0, n - 1))
+            bounds = np.partition(pnl_array, [lo, hi])
+            errors[f"SE VaR {int(level*100)}%"] = (bounds[hi] - bounds[lo]) / (2 * z)
+
+        if control is not None:
+            estimate, std_error = self.control_variate_mean(pnl_eff, control_eff, control_mean)
+            errors["Mean PnL (CV)"] = estimate
+            errors["SE Mean PnL (CV)"] = std_error
+
+        return errors
+
+    @timed("report")
+    def generate_report(self, metrics, params, horizon_metrics=None):
+        """
+        Genera TXT y guarda en CAPA ORO.
+        horizon_metrics: Grilla de calculate_horizon_metrics() (se agrega al TXT; la Capa Oro
+        registra solo el horizonte principal).
+        """
         timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M")
         
         # 1. Reporte Humano (TXT)
@@ -59,6 +204,14 @@ class RiskReporter:
             for k, v in metrics.items():
                 f.write(f"{k:<25} {v:.2%}\n")
             f.write("-" * 50 + "\n")
+            if horizon_metrics:
+                # Grilla horizonte (filas) x métrica (columnas)
+                columns = list(next(iter(horizon_metrics.values())))
+                f.write("HORIZONTES (días)\n")
+                f.write(f"{'':<8}" + "".join(f"{c:>12}" for c in columns) + "\n")
+                for horizon, row in horizon_metrics.items():
+                    f.write(f"{horizon:<8}" + "".join(f"{row[c]:>12.2%}" for c in columns) + "\n")
+                f.write("-" * 50 + "\n")
             
         print(f"✅ Reporte TXT generado: {path}")
 
@@ -75,16 +228,6 @@ class RiskReporter:
             'cvar_99': metrics["CVaR 99%"]
         }
         
-        df_gold = pd.DataFrame([record])
-        
-        # Modo Append: Leemos existente o creamos nuevo
-        gold_path = os.path.join(self.gold_dir, "risk_metrics_history.parquet")
-        
-        if os.path.exists(gold_path):
-            df_old = pd.read_parquet(gold_path)
-            df_final = pd.concat([df_old, df_gold], ignore_index=True)
-        else:
-            df_final = df_gold
-            
-        df_final.to_parquet(gold_path, index=False)
-        print(f"🏆 [Capa Oro] Métricas persistidas en: {gold_path}")
\ No newline at end of file
+        # Modo Append: una parte nueva por corrida, sin releer ni reescribir el historial
+        self.gold_store.append([record])
+        print(f"🏆 [Capa Oro] Métricas persistidas en: {self.gold_store.table_dir}")
\ No newline at end of file
@@ -0,0 +1,177 @@
+import numpy as np
+
+# Niveles reportados por defecto (VaR/CVaR de negocio + estrés)
+DEFAULT_CONFIDENCES = (0.95, 0.99)
+
+
+def _order_index(n: int, p: float):
+    """Posición del cuantil p con interpolación lineal (misma convención que np.percentile)."""
+    pos = (n - 1) * p
+    lo = int(np.floor(pos))
+    return lo, min(lo + 1, n - 1), pos - lo
+
+
+def _required_count(n: int, confidences) -> int:
+    """Cantidad de estadísticos de orden inferiores necesarios para todos los niveles."""
+    return max(_order_index(n, 1 - c)[1] for c in confidences) + 1
+
+
+def _tail_summary(tail: np.ndarray, tail_w: np.ndarray = None):
+    """Momentos de la cola: media (CVaR), desviación y asimetría."""
+    mean = np.average(tail, weights=tail_w)
+    centered = tail - mean
+    var = np.average(centered ** 2, weights=tail_w)
+    std = np.sqrt(var)
+    skew = np.average(centered ** 3, weights=tail_w) / std ** 3 if std > 0 else 0.0
+    return mean, std, skew
+
+
+def _levels_unweighted(sorted_tail: np.ndarray, n: int, confidences):
+    results = {}
+    for confidence in confidences:
+        lo, hi, frac = _order_index(n, 1 - confidence)
+        var_value = sorted_tail[lo] + frac * (sorted_tail[hi] - sorted_tail[lo])
+        cvar_value, tail_std, tail_skew = _tail_summary(sorted_tail[:lo + 1])
+        results[confidence] = {"var": var_value, "cvar": cvar_value,
+                               "tail_std": tail_std, "tail_skew": tail_skew}
+    return results
+
+
+def _levels_weighted(sorted_tail: np.ndarray, sorted_w: np.ndarray, total_mass: float, confidences):
+    cdf = np.cumsum(sorted_w) / total_mass
+    results = {}
+    for confidence in confidences:
+        p = 1 - confidence
+        k = int(np.searchsorted(cdf, p))
+        if k >= len(sorted_tail):
+            raise ValueError(f"Cola insuficiente para el nivel {confidence}: aumente la capacidad del buffer.")
+        var_value = sorted_tail[k]
+        mass_below = cdf[k - 1] if k > 0 else 0.0
+        # CVaR con corrección del átomo en el VaR (Acerbi-Tasche)
+        tail_sum = (sorted_w[:k] * sorted_tail[:k]).sum() / total_mass + var_value * (p - mass_below)
+        _, tail_std, tail_skew = _tail_summary(sorted_tail[:k + 1], sorted_w[:k + 1])
+        results[confidence] = {"var": var_value, "cvar": tail_sum / p,
+                               "tail_std": tail_std, "tail_skew": tail_skew}
+    return results
+
+
+def tail_metrics(pnl: np.ndarray, confidences=DEFAULT_CONFIDENCES, weights: np.ndarray = None,
+                 total_mass: float = None):
+    """
+    VaR, CVaR (Expected Shortfall) y momentos de cola para varios niveles en una pasada.
+    Sin pesos: un único np.partition sobre los estadísticos de orden necesarios y un sort
+    solo de la cola (O(n + k log k)), en lugar de un percentile + máscara por nivel.
+
+    Args:
+        weights: Pesos por escenario (ej. likelihood ratios del muestreo por importancia).
+        total_mass: Masa total de la distribución ponderada. Default: n (convención de
+                    importance sampling, F(x) = (1/n) sum w_i 1{x_i <= x}).
+                    Para pesos muestrales genéricos use weights.sum().
+
+    Retorna: {confidence: {"var", "cvar", "tail_std", "tail_skew"}}
+    """
+    pnl = np.asarray(pnl, dtype=float)
+    n = len(pnl)
+
+    if weights is None:
+        k = _required_count(n, confidences)
+        tail = np.partition(pnl, k - 1)[:k] if k < n else pnl.copy()
+        tail.sort()
+        return _levels_unweighted(tail, n, confidences)
+
+    weights = np.asarray(weights, dtype=float)
+    total_mass = n if total_mass is None else total_mass
+    target = max(1 - c for c in confidences) * total_mass
+
+    # Cola creciente: se ordena solo el subconjunto que acumula la masa requerida
+    k = min(n, _required_count(n, confidences) * 4)
+    while True:
+        idx = np.argpartition(pnl, k - 1)[:k] if k < n else np.arange(n)
+        idx = idx[np.argsort(pnl[idx])]
+        if k == n or weights[idx].sum() >= target:
+            break
+        k = min(n, k * 4)
+    return _levels_weighted(pnl[idx], weights[idx], total_mass, confidences)
+
+
+def _percent_label(confidence: float) -> str:
+    """
+    Porcentaje entero histórico (int(c*100): 0.975 -> '97%'). Solo los niveles extremos que
+    el entero colapsaría sobre '99%' conservan el decimal (0.999 -> '99.9%').
+    """
+    percent = int(confidence * 100)
+    if percent >= 99 and round(confidence * 100, 6) != percent:
+        return f"{confidence*100:g}%"
+    return f"{percent}%"
+
+
+def format_metrics(results: dict) -> dict:
+    """Claves de negocio ('VaR 95%', 'CVaR 95%', ...) usadas por reportes, API y Capa Oro."""
+    metrics = {}
+    for confidence, stats in results.items():
+        label = _percent_label(confidence)
+        metrics[f"VaR {label}"] = stats["var"]
+        metrics[f"CVaR {label}"] = stats["cvar"]
+    return metrics
+
+
+class TailBuffer:
+    """
+    Sketch exacto y combinable de la cola izquierda de la distribución de PnL.
+    Cada worker conserva solo los peores escenarios necesarios para el nivel más extremo;
+    merge() combina particiones sin reunir todos los escenarios en el Driver.
+    Exacto mientras cada parcial use el mismo total_count (tamaño global esperado).
+    """
+
+    def __init__(self, tail_prob: float, total_count: int, weighted: bool = False):
+        """
+        Args:
+            tail_prob: Probabilidad de cola del nivel más extremo (ej. 0.01 para 99%).
+            total_count: Número total de escenarios del experimento (todas las particiones).
+            weighted: Si los escenarios llevan likelihood ratios (masa total = total_count).
+        """
+        self.tail_prob = tail_prob
+        self.total_count = total_count
+        self.weighted = weighted
+        self.count = 0
+        self.values = np.empty(0)
+        self.weights = np.empty(0) if weighted else None
+
+    def _truncate(self):
+        order = np.argsort(self.values, kind="stable")
+        if self.weighted:
+            # Conservar hasta acumular la masa global de cola (+1 para el átomo del VaR)
+            mass = np.cumsum(self.weights[order])
+            keep = min(len(order), int(np.searchsorted(mass, self.tail_prob * self.total_count)) + 1)
+            order = order[:keep]
+            self.weights = self.weights[order]
+        else:
+            keep = _required_count(self.total_count, (1 - self.tail_prob,))
+            order = order[:keep]
+        self.values = self.values[order]
+
+    def update(self, values: np.ndarray, weights: np.ndarray = None):
+        """Incorpora un lote de escenarios (ej. un bloque de simulación)."""
+        self.count += len(values)
+        self.values = np.concatenate([self.values, values])
+        if self.weighted:
+            self.weights = np.concatenate([self.weights, weights])
+        self._truncate()
+        return self
+
+    def merge(self, other: "TailBuffer"):
+        """Combina otro parcial (Reduce). Operación asociativa y conmutativa."""
+        self.count += other.count
+        self.values = np.concatenate([self.values, other.values])
+        if self.weighted:
+            self.weights = np.concatenate([self.weights, other.weights])
+        self._truncate()
+        return self
+
+    def metrics(self, confidences=DEFAULT_CONFIDENCES):
+        """Mismo resultado que tail_metrics() sobre todos los escenarios combinados."""
+        if any(1 - c > self.tail_prob + 1e-12 for c in confidences):
+            raise ValueError("Nivel de confianza fuera de la cola retenida por el buffer.")
+        if self.weighted:
+            return _levels_weighted(self.values, self.weights, self.count, confidences)
+        return _levels_unweighted(self.values, self.count, confidences)
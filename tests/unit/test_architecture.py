@@ -40,9 +40,11 @@ class TestArchitecture(unittest.TestCase):
         self.assertTrue(2.0 < stu.nu < 100, "Nu debe estar en rango sensato")
 
     def test_gold_layer_structure(self):
-        """GAP 1 VALIDATION: Verificar existencia de directorios."""
+        """GAP 1 VALIDATION: Verificar existencia de directorios (creados bajo demanda, no al importar)."""
+        settings.ensure_directories()
         gold_path = os.path.join(settings.DATA_DIR, "gold")
         self.assertTrue(os.path.exists(gold_path))
+        self.assertTrue(os.path.exists(settings.OUTPUT_DIR))
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,34 @@
+import unittest
+import os
+import sys
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks import harness
+
+
+class TestBenchmarkHarness(unittest.TestCase):
+
+    def _record(self, p50, case="bench_x[n=1]", host="box"):
+        return {"commit": "abc", "machine": {"host": host, "cpus": 4},
+                "results": {case: harness.summarize([p50, p50, p50], work=1000)}}
+
+    def test_summary_percentiles_and_throughput(self):
+        stats = harness.summarize([0.1, 0.2, 0.3, 0.4, 1.0], work=100)
+        self.assertAlmostEqual(stats["p50"], 0.3)
+        self.assertGreater(stats["p99"], stats["p90"])
+        self.assertAlmostEqual(stats["throughput"], 100 / 0.3)
+
+    def test_regression_against_same_machine_history(self):
+        history = [self._record(1.0), self._record(0.5, host="other"), self._record(1.0, case="bench_y")]
+        rows = harness.compare(self._record(1.2), history, tolerance=0.1)
+        self.assertEqual(len(rows), 1)
+        case_id, _, before, after, ratio, regressed = rows[0]
+        self.assertEqual((case_id, before), ("bench_x[n=1]", 1.0))
+        self.assertTrue(regressed)
+        self.assertFalse(harness.compare(self._record(1.05), history, tolerance=0.1)[0][-1])
+
+
+if __name__ == '__main__':
+    unittest.main()
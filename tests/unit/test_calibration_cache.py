@@ -0,0 +1,64 @@
+import unittest
+import tempfile
+import numpy as np
+import pandas as pd
+import os
+import sys
+from unittest import mock
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.models.calibration_cache import CalibrationCache
+from src.models.student_t import StudentTStrategy
+
+
+class TestCalibrationCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        rng = np.random.default_rng(0)
+        index = pd.bdate_range("2024-01-01", periods=150)
+        self.returns = pd.DataFrame(rng.standard_t(5, size=(150, 3)) * 0.01, index=index, columns=['A', 'B', 'C'])
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_repeat_calibration_hits_cache(self):
+        cache = CalibrationCache(self.tmp.name)
+        first = StudentTStrategy(cache=cache)
+        first.train(self.returns)
+
+        # Proceso "nuevo" (solo disco): no debe volver a ajustar el MLE
+        second = StudentTStrategy(cache=CalibrationCache(self.tmp.name))
+        with mock.patch.object(StudentTStrategy, "_fit_nu_batch", side_effect=AssertionError("Ajuste re-ejecutado")):
+            second.train(self.returns)
+        self.assertEqual(second.nu, first.nu)
+        self.assertEqual(second.n_assets, 3)
+        np.testing.assert_array_equal(second.chol_matrix, first.chol_matrix)
+
+    def test_new_ticker_only_fits_that_ticker(self):
+        cache = CalibrationCache(self.tmp.name)
+        StudentTStrategy(cache=cache).train(self.returns[['A', 'B']])
+
+        fitted = []
+        original = StudentTStrategy._fit_nu_batch
+        def spy(strategy, frame):
+            fitted.extend(frame.columns)
+            return original(strategy, frame)
+
+        with mock.patch.object(StudentTStrategy, "_fit_nu_batch", spy):
+            StudentTStrategy(cache=cache).train(self.returns)
+        self.assertEqual(fitted, ['C'])
+
+    def test_fingerprint_depends_on_data_and_hyperparams(self):
+        key = CalibrationCache.fingerprint(self.returns, model="x")
+        self.assertEqual(key, CalibrationCache.fingerprint(self.returns.copy(), model="x"))
+        self.assertNotEqual(key, CalibrationCache.fingerprint(self.returns, model="y"))
+        shifted = self.returns.copy()
+        shifted.iloc[0, 0] += 1e-9
+        self.assertNotEqual(key, CalibrationCache.fingerprint(shifted, model="x"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,332 @@
+import unittest
+import json
+import tempfile
+from unittest import mock
+import numpy as np
+import pandas as pd
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.data.loader import MarketDataLoader
+from src.data import silver_store
+from src.data.returns_store import ReturnsStore
+from src.data.sources import LocalFileDataSource
+
+
+def _write_market_files(root, tickers, n_days=60, seed=0):
+    """Genera CSVs OHLC sintéticos con el formato de yf.download."""
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range("2024-01-01", periods=n_days, name="Date")
+    for ticker in tickers:
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n_days)))
+        pd.DataFrame({"Close": close, "Volume": 1000}, index=index).to_csv(os.path.join(root, f"{ticker}.csv"))
+    return index
+
+
+def _update_store(root_dir: str, ticker: str, n_updates: int = 5) -> str:
+    """Escritor de la matriz de retornos en otro proceso (un ticker, varias actualizaciones)."""
+    store = ReturnsStore(root_dir)
+    index = pd.bdate_range("2024-01-01", periods=10 * n_updates)
+    values = np.arange(len(index), dtype=float)
+    for k in range(n_updates):
+        rows = slice(10 * k, 10 * (k + 1))
+        store.update({ticker: pd.DataFrame({"price": values[rows] + 1, "log_return": values[rows]},
+                                           index=index[rows])})
+    return ticker
+
+
+class FlakySource(LocalFileDataSource):
+    """Fuente local que falla las primeras `failures` llamadas por ticker."""
+
+    def __init__(self, root_dir, failures):
+        super().__init__(root_dir)
+        self.failures = failures
+        self.calls = {}
+
+    def fetch(self, ticker, start, end):
+        self.calls[ticker] = self.calls.get(ticker, 0) + 1
+        if self.calls[ticker] <= self.failures:
+            raise ConnectionError("rate limited")
+        return super().fetch(ticker, start, end)
+
+
+class TestConcurrentIngestion(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.source_dir = os.path.join(self.tmp.name, "market")
+        os.makedirs(self.source_dir)
+        self.tickers = [f"T{i}" for i in range(20)]
+        self.index = _write_market_files(self.source_dir, self.tickers)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _loader(self, source, tickers=None, **kwargs):
+        return MarketDataLoader(tickers or self.tickers, "2024-01-01", "2025-01-01",
+                                data_dir=os.path.join(self.tmp.name, "lake"), source=source, **kwargs)
+
+    def test_pipeline_with_local_source(self):
+        """Ingesta concurrente + transformación en pool de procesos + lectura."""
+        loader = self._loader(LocalFileDataSource(self.source_dir), tickers=self.tickers + ["MISSING"])
+        self.assertEqual(sorted(loader.ingest_data()), sorted(self.tickers))
+
+        loader.transform_to_silver()
+        returns, last_prices = loader.load_for_simulation()
+        self.assertEqual(list(returns.columns), self.tickers)
+        self.assertEqual(len(returns), len(self.index) - 1)
+
+        expected = pd.read_csv(os.path.join(self.source_dir, "T3.csv"), index_col=0)["Close"]
+        self.assertAlmostEqual(last_prices["T3"], expected.iloc[-1])
+        np.testing.assert_allclose(returns["T3"].values, np.diff(np.log(expected.values)))
+
+    def test_retries_with_backoff(self):
+        source = FlakySource(self.source_dir, failures=2)
+        loader = self._loader(source, tickers=["T0", "T1"], backoff=0.0)
+        self.assertEqual(sorted(loader.ingest_data()), ["T0", "T1"])
+        self.assertEqual(source.calls, {"T0": 3, "T1": 3})
+
+        # Sin reintentos suficientes el ticker se reporta como fallido, sin abortar el lote
+        source = FlakySource(self.source_dir, failures=5)
+        loader = self._loader(source, tickers=["T0"], max_retries=1, backoff=0.0)
+        self.assertEqual(loader.ingest_data(), [])
+        self.assertEqual(source.calls["T0"], 2)
+
+
+class RecordingSource(LocalFileDataSource):
+    def __init__(self, root_dir):
+        super().__init__(root_dir)
+        self.starts = []
+
+    def fetch(self, ticker, start, end):
+        self.starts.append(pd.Timestamp(start))
+        return super().fetch(ticker, start, end)
+
+
+class TestIncrementalSilver(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.source_dir = os.path.join(self.tmp.name, "market")
+        os.makedirs(self.source_dir)
+        self.index = _write_market_files(self.source_dir, ["A", "B"], n_days=60)
+        self.data_dir = os.path.join(self.tmp.name, "lake")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _run(self, source, end):
+        loader = MarketDataLoader(["A", "B"], "2024-01-01", end, data_dir=self.data_dir, source=source)
+        loader.ingest_data()
+        loader.transform_to_silver()
+        return loader
+
+    def test_refresh_fetches_and_appends_only_new_days(self):
+        source = RecordingSource(self.source_dir)
+        self._run(source, self.index[40])
+        self.assertEqual(source.starts, [pd.Timestamp("2024-01-01")] * 2)
+
+        source.starts.clear()
+        loader = self._run(source, self.index[-1] + pd.Timedelta(days=1))
+        self.assertEqual(source.starts, [self.index[39] + pd.Timedelta(days=1)] * 2)
+        self.assertEqual(len(silver_store.list_parts(loader._get_silver_path("A"))), 2)
+
+        # El historial incremental es idéntico a una carga completa
+        returns, last_prices = loader.load_for_simulation()
+        expected = pd.read_csv(os.path.join(self.source_dir, "A.csv"), index_col=0, parse_dates=[0])["Close"]
+        np.testing.assert_allclose(returns["A"].values, np.diff(np.log(expected.values)))
+        self.assertEqual(len(returns), len(self.index) - 1)
+
+        # Refresh sin días nuevos: no se escribe nada
+        self._run(source, self.index[-1] + pd.Timedelta(days=1))
+        self.assertEqual(len(silver_store.list_parts(loader._get_silver_path("A"))), 2)
+
+        # Compactación: una sola parte, mismos datos
+        loader.compact_silver()
+        self.assertEqual(len(silver_store.list_parts(loader._get_silver_path("A"))), 1)
+        compacted, _ = loader.load_for_simulation()
+        pd.testing.assert_frame_equal(compacted, returns)
+
+    def test_legacy_single_file_is_migrated(self):
+        loader = MarketDataLoader(["A"], "2023-12-01", "2025-01-01", data_dir=self.data_dir,
+                                  source=LocalFileDataSource(self.source_dir))
+        legacy = pd.DataFrame({"price": [1.0, 1.1], "log_return": [0.01, np.log(1.1)]},
+                              index=pd.DatetimeIndex(["2023-12-28", "2023-12-29"]))
+        legacy.to_parquet(os.path.join(loader.silver_dir, "A.parquet"))
+
+        returns, _ = loader.load_for_simulation()
+        self.assertEqual(len(returns), 2)
+        self.assertFalse(os.path.exists(os.path.join(loader.silver_dir, "A.parquet")))
+
+
+
+class TestSimulationWindow(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.source_dir = os.path.join(self.tmp.name, "market")
+        os.makedirs(self.source_dir)
+        self.data_dir = os.path.join(self.tmp.name, "lake")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_default_window_is_the_loader_window(self):
+        """El historial de Plata crece, la ventana de calibración no."""
+        index = _write_market_files(self.source_dir, ["A"], n_days=60)
+        source = LocalFileDataSource(self.source_dir)
+        full = MarketDataLoader(["A"], index[0], index[-1] + pd.Timedelta(days=1), data_dir=self.data_dir,
+                                source=source)
+        full.ingest_data()
+        full.transform_to_silver()
+
+        recent = MarketDataLoader(["A"], index[30], index[-1] + pd.Timedelta(days=1), data_dir=self.data_dir,
+                                  source=source)
+        returns, _ = recent.load_for_simulation()
+        self.assertEqual(returns.index[0], index[30])
+        self.assertEqual(len(returns), 30)
+
+    def test_partial_intraday_bar_is_not_persisted(self):
+        today = pd.Timestamp.now().normalize()
+        index = pd.date_range(end=today, periods=10, name="Date")
+        pd.DataFrame({"Close": np.linspace(100, 110, 10)}, index=index).to_csv(
+            os.path.join(self.source_dir, "A.csv"))
+        loader = MarketDataLoader(["A"], index[0], datetime.now() + timedelta(days=1), data_dir=self.data_dir,
+                                  source=LocalFileDataSource(self.source_dir))
+        loader.ingest_data()
+        loader.transform_to_silver()
+        last_date, _ = silver_store.last_stored(loader._get_silver_path("A"))
+        self.assertEqual(last_date, index[-2])
+
+
+class TestReturnsStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = ReturnsStore(self.tmp.name)
+        rng = np.random.default_rng(4)
+        self.frames = {}
+        for ticker, offset in (("A", 0), ("B", 3), ("C", 0)):
+            index = pd.bdate_range("2024-01-01", periods=30)[offset:]
+            self.frames[ticker] = pd.DataFrame({"price": rng.uniform(10, 20, len(index)),
+                                                "log_return": rng.normal(0, 0.01, len(index))}, index=index)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_projection_window_and_alignment(self):
+        self.store.update(self.frames)
+        returns, last_prices = self.store.load(["C", "A", "MISSING"])
+        self.assertEqual(list(returns.columns), ["C", "A"])
+        np.testing.assert_array_equal(returns["A"].values, self.frames["A"]["log_return"].values)
+        self.assertEqual(last_prices["C"], self.frames["C"]["price"].iloc[-1])
+
+        # Inner join por fecha: B empieza 3 días después
+        returns, _ = self.store.load(["A", "B"])
+        self.assertEqual(returns.index[0], self.frames["B"].index[0])
+
+        window, _ = self.store.load(["A"], start="2024-01-10", end="2024-01-19")
+        self.assertEqual((window.index[0], window.index[-1]),
+                         (pd.Timestamp("2024-01-10"), pd.Timestamp("2024-01-19")))
+
+        # La matriz en disco es Fortran (columnas contiguas) y se lee por mmap
+        matrix, _ = self.store._open(self.store._segments(self.store.manifest())[0])
+        self.assertIsInstance(matrix, np.memmap)
+        self.assertTrue(matrix.flags.f_contiguous)
+
+    def test_append_rows_keeps_history_and_bumps_version(self):
+        head = {ticker: df.iloc[:20] for ticker, df in self.frames.items()}
+        tail = {ticker: df.iloc[20:] for ticker, df in self.frames.items()}
+        self.store.update(head)
+        version = self.store.version
+        self.store.update(tail)
+        self.assertNotEqual(self.store.version, version)
+
+        returns, last_prices = self.store.load(["A", "B", "C"])
+        expected = pd.concat([df["log_return"].rename(t) for t, df in self.frames.items()], axis=1).dropna()
+        np.testing.assert_array_equal(returns.values, expected.values)
+        self.assertEqual(last_prices["B"], self.frames["B"]["price"].iloc[-1])
+        self.assertEqual(len([f for f in os.listdir(self.tmp.name) if f.endswith(".npy")]), 4)
+
+    def test_refresh_cost_does_not_grow_with_history(self):
+        """Un día nuevo reescribe solo el segmento abierto: mismos bytes con 10 años más de historia."""
+        written = []
+        for n_days in (300, 300 + 10 * ReturnsStore.SEGMENT_ROWS):
+            root = os.path.join(self.tmp.name, str(n_days))
+            store = ReturnsStore(root)
+            index = pd.bdate_range("2000-01-03", periods=n_days + 1)
+            frames = {ticker: pd.DataFrame({"price": 1.0, "log_return": np.arange(n_days + 1.0) + k},
+                                           index=index) for k, ticker in enumerate("ABC")}
+            store.update({ticker: df.iloc[:-1] for ticker, df in frames.items()})
+            before = set(os.listdir(root))
+            store.update({ticker: df.iloc[-1:] for ticker, df in frames.items()})
+            new_files = set(os.listdir(root)) - before
+            written.append(sum(os.path.getsize(os.path.join(root, name)) for name in new_files
+                               if name.endswith(".npy")))
+
+            returns, _ = store.load(["C", "A"])
+            np.testing.assert_array_equal(returns["C"].values, np.arange(n_days + 1.0) + 2)
+            self.assertEqual(len(returns), n_days + 1)
+        self.assertEqual(written[0], written[1])
+
+    def test_reads_single_matrix_layout_and_late_tickers(self):
+        """Stores previos a los segmentos (una matriz) siguen legibles; un ticker nuevo extiende columnas."""
+        index = self.frames["A"].index
+        np.save(os.path.join(self.tmp.name, "returns-000001-legacy.npy"),
+                np.asfortranarray(self.frames["A"][["log_return"]].to_numpy()))
+        np.save(os.path.join(self.tmp.name, "dates-000001-legacy.npy"), index.values.astype("datetime64[ns]"))
+        with open(os.path.join(self.tmp.name, ReturnsStore.MANIFEST), "w") as f:
+            json.dump({"version": "000001-legacy", "returns_file": "returns-000001-legacy.npy",
+                       "dates_file": "dates-000001-legacy.npy", "tickers": ["A"],
+                       "last_prices": {"A": 1.0}}, f)
+
+        self.store.update({"C": self.frames["C"]})
+        returns, _ = self.store.load(["A", "C"])
+        np.testing.assert_array_equal(returns["A"].values, self.frames["A"]["log_return"].values)
+        np.testing.assert_array_equal(returns["C"].values, self.frames["C"]["log_return"].values)
+
+        # Segmentos chicos: el ticker nuevo solo reescribe el último; los anteriores no tienen su columna
+        with mock.patch.object(ReturnsStore, "SEGMENT_ROWS", 10):
+            self.store.update({"D": self.frames["A"].iloc[-5:]})
+            self.store.update({"E": self.frames["A"].iloc[-1:]})
+        segments = self.store._segments(self.store.manifest())
+        self.assertEqual([self.store._open(seg)[0].shape[1] for seg in segments], [3, 3, 4])
+        self.assertEqual(len(self.store.load(["A", "D"])[0]), 5)
+        self.assertEqual(len(self.store.load(["A", "E"])[0]), 1)
+        np.testing.assert_array_equal(self.store.load(["A"])[0]["A"].values, self.frames["A"]["log_return"].values)
+
+    def test_window_end_returns_price_at_window_close(self):
+        prices = {}
+        for ticker, df in self.frames.items():
+            df = df.copy()
+            df["price"] = 10 * np.exp(np.cumsum(df["log_return"]))
+            prices[ticker] = df
+        self.store.update(prices)
+        _, last_prices = self.store.load(["A", "B"], end="2024-01-19")
+        for ticker in ("A", "B"):
+            self.assertAlmostEqual(last_prices[ticker], prices[ticker]["price"].loc["2024-01-19"], places=10)
+        _, latest = self.store.load(["A"])
+        self.assertEqual(latest["A"], prices["A"]["price"].iloc[-1])
+
+    def test_concurrent_process_updates_are_not_lost(self):
+        """Procesos con su propio store: ninguna actualización se pierde ni queda un manifest roto."""
+        tickers = [f"P{i}" for i in range(4)]
+        with ProcessPoolExecutor(max_workers=4) as pool:
+            list(pool.map(_update_store, [self.tmp.name] * 4, tickers))
+
+        manifest = self.store.manifest()
+        self.assertEqual(sorted(manifest["tickers"]), tickers)
+        self.assertEqual(self.store._sequence(manifest["version"]), 20)
+        returns, last_prices = self.store.load(tickers)
+        self.assertEqual(len(returns), 50)
+        np.testing.assert_array_equal(returns["P2"].values, np.arange(50, dtype=float))
+        self.assertTrue((last_prices == 50.0).all())
+
+
+if __name__ == '__main__':
+    unittest.main()
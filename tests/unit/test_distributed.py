@@ -0,0 +1,87 @@
+import unittest
+import numpy as np
+import pandas as pd
+import os
+import sys
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import ray
+from src.models.distributed import DistributedMonteCarlo
+from src.models.monte_carlo import MonteCarloEngine
+from src.models.student_t import StudentTStrategy
+from src.utils.reporter import RiskReporter
+
+
+class TestDistributedMonteCarlo(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        ray.init(num_cpus=2, include_dashboard=False, ignore_reinit_error=True)
+
+    @classmethod
+    def tearDownClass(cls):
+        ray.shutdown()
+
+    def test_persistent_pool_and_pnl_reduction(self):
+        """El pool se reutiliza entre llamadas y solo vuelven vectores de PnL."""
+        rng = np.random.default_rng(3)
+        df = pd.DataFrame(rng.normal(0, 0.01, size=(200, 2)), columns=['A', 'B'])
+        prices = np.array([10.0, 20.0])
+
+        engine = DistributedMonteCarlo(StudentTStrategy(), n_workers=2, seed=4)
+        engine.train(df)
+
+        pnl = engine.simulate_pnl(prices, horizon=10, total_sims=301)
+        workers = engine.workers
+        self.assertEqual(pnl.shape, (301,))
+
+        paths = engine.simulate(prices, horizon=10, total_sims=51)
+        self.assertEqual(paths.shape, (51, 10, 2))
+        self.assertIs(engine.workers, workers, "Los actores deben reutilizarse")
+
+        # Re-entrenar publica una nueva versión de parámetros en el Object Store
+        version = engine.params_version
+        engine.train(df * 2)
+        self.assertEqual(engine.params_version, version + 1)
+        self.assertEqual(engine.simulate_pnl(prices, horizon=5, total_sims=20).shape, (20,))
+
+        # La recalibración incremental también se publica: los workers no quedan con la anterior
+        engine.update(df.iloc[-5:] * 3)
+        self.assertEqual(engine.params_version, version + 2)
+        local = MonteCarloEngine(engine.strategy, seed=4)
+        np.testing.assert_array_equal(engine.simulate_pnl(prices, horizon=5, total_sims=20),
+                                      local.simulate_pnl(prices, horizon=5, n_sims=20))
+
+        engine.shutdown()
+        self.assertIsNone(engine.workers)
+
+    def test_results_independent_of_worker_count(self):
+        """Con la misma semilla, Ray (1 o 2 workers) y el motor local son bit-idénticos."""
+        rng = np.random.default_rng(5)
+        df = pd.DataFrame(rng.normal(0, 0.01, size=(200, 2)), columns=['A', 'B'])
+        prices = np.array([10.0, 20.0])
+        strategy = StudentTStrategy()
+        strategy.train(df)
+
+        local = MonteCarloEngine(strategy, seed=99)
+        terminal = local.simulate(prices, horizon=10, n_sims=3000, mode="terminal")
+        expected = RiskReporter.compute_terminal_pnl(terminal, prices)
+
+        for n_workers in (1, 2):
+            engine = DistributedMonteCarlo(strategy, n_workers=n_workers, seed=99)
+            np.testing.assert_array_equal(engine.simulate_pnl(prices, horizon=10, total_sims=3000), expected)
+            engine.shutdown()
+
+        # Reducción de cola: mismas métricas que sobre el vector completo
+        engine = DistributedMonteCarlo(strategy, n_workers=2, seed=99)
+        metrics = engine.simulate_risk(prices, horizon=10, total_sims=3000)
+        expected_metrics = RiskReporter(output_dir="output").calculate_metrics(expected)
+        for key, value in expected_metrics.items():
+            self.assertAlmostEqual(metrics[key], value, places=12)
+        engine.shutdown()
+
+
+if __name__ == '__main__':
+    unittest.main()
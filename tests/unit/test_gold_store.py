@@ -0,0 +1,107 @@
+import unittest
+import os
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timedelta
+import pandas as pd
+import pyarrow.dataset as ds
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.data.gold_store import GoldStore
+from src.utils.reporter import RiskReporter
+
+
+def _record(when: datetime, model: str = "GBMStrategy", var: float = -0.05) -> dict:
+    return {"execution_date": when, "model": model, "n_sims": 1000, "horizon": 10,
+            "var_95": var, "cvar_95": var * 1.3, "var_99": var * 1.5, "cvar_99": var * 1.8}
+
+
+def _append_many(root_dir: str, worker: int, n: int) -> int:
+    store = GoldStore(root_dir)
+    for i in range(n):
+        store.append([_record(datetime(2024, 3, 1, 10) + timedelta(seconds=worker * n + i))])
+    return n
+
+
+class TestGoldStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = GoldStore(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_append_partitions_by_date_and_queries_range(self):
+        start = datetime(2024, 1, 1, 9)
+        self.store.append([_record(start + timedelta(days=d), var=-0.01 * (d + 1)) for d in range(5)])
+        self.store.append([_record(start + timedelta(days=5))])
+
+        manifest = self.store.manifest()
+        self.assertEqual(len(manifest["parts"]), 6)
+        self.assertTrue(all(part["path"].startswith(f"date={part['date']}") for part in manifest["parts"]))
+
+        window = self.store.query(start="2024-01-02", end="2024-01-04 23:59")
+        self.assertEqual(list(window["execution_date"].dt.day), [2, 3, 4])
+        self.assertEqual(list(window["var_95"]), [-0.02, -0.03, -0.04])
+
+        # Proyección y predicado adicional
+        only = self.store.query(columns=["execution_date", "model"], predicate=ds.field("model") == "Nada")
+        self.assertTrue(only.empty)
+        self.assertEqual(len(self.store.query()), 6)
+        self.assertTrue(self.store.query(start="2030-01-01").empty)
+
+    def test_batched_writer_flushes_per_batch(self):
+        with self.store.writer(batch_size=4) as write:
+            for i in range(10):
+                write(_record(datetime(2024, 2, 1) + timedelta(minutes=i)))
+            self.assertEqual(sum(p["rows"] for p in self.store.manifest()["parts"]), 8)
+        self.assertEqual(len(self.store.manifest()["parts"]), 3)
+        self.assertEqual(len(self.store.query()), 10)
+
+    def test_concurrent_appends_do_not_lose_records(self):
+        """Threads y procesos escribiendo a la vez: el manifest registra todas las partes."""
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            list(pool.map(lambda w: _append_many(self.tmp.name, w, 5), range(4)))
+        with ProcessPoolExecutor(max_workers=3) as pool:
+            list(pool.map(_append_many, [self.tmp.name] * 3, range(4, 7), [5] * 3))
+
+        history = self.store.query()
+        self.assertEqual(len(history), 35)
+        self.assertEqual(history["execution_date"].nunique(), 35)
+        self.assertTrue(history["execution_date"].is_monotonic_increasing)
+
+    def test_compact_merges_daily_parts(self):
+        for i in range(6):
+            self.store.append([_record(datetime(2024, 4, 1 + i % 2, 12, i))])
+        before = self.store.query()
+
+        self.assertEqual(self.store.compact(), 6)
+        parts = self.store.manifest()["parts"]
+        self.assertEqual(len(parts), 2)
+        pd.testing.assert_frame_equal(self.store.query(), before)
+        files = [f for _, _, names in os.walk(self.store.table_dir) for f in names if f.endswith(".parquet")]
+        self.assertEqual(len(files), 2)
+        self.assertEqual(self.store.compact(), 0)
+
+    def test_reporter_appends_and_migrates_legacy_file(self):
+        legacy = pd.DataFrame([_record(datetime(2023, 12, 31, 18))])
+        legacy.to_parquet(os.path.join(self.tmp.name, "risk_metrics_history.parquet"), index=False)
+
+        reporter = RiskReporter(output_dir=os.path.join(self.tmp.name, "output"), gold_dir=self.tmp.name)
+        metrics = {"VaR 95%": -0.04, "CVaR 95%": -0.05, "VaR 99%": -0.06, "CVaR 99%": -0.07}
+        params = {"tickers": ["AAA"], "model_name": "StudentTStrategy", "n_sims": 500, "horizon": 5}
+        reporter.generate_report(metrics, params)
+        reporter.generate_report(metrics, params)
+
+        history = reporter.load_history()
+        self.assertEqual(list(history["model"]), ["GBMStrategy", "StudentTStrategy", "StudentTStrategy"])
+        self.assertFalse(os.path.exists(os.path.join(self.tmp.name, "risk_metrics_history.parquet")))
+        self.assertEqual(len(reporter.load_history(start="2024-01-01")), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
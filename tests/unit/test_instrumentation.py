@@ -0,0 +1,94 @@
+import unittest
+import os
+import sys
+import tempfile
+from concurrent.futures import Future
+from datetime import datetime
+from unittest import mock
+import numpy as np
+import pandas as pd
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from fastapi.testclient import TestClient
+from src.api.main import app
+from src.api.routers import simulation
+from src.api.services.result_cache import ResultCache
+from src.data.loader import MarketDataLoader
+from src.data.sources import LocalFileDataSource
+from src.models.scheduler import AdaptiveMonteCarlo
+from src.models.student_t import StudentTStrategy
+from src.utils import instrumentation
+from src.utils.instrumentation import MetricsRegistry, recording, stage
+
+
+class TestStageTimers(unittest.TestCase):
+
+    def test_pipeline_stages_are_recorded_in_order(self):
+        """Cada etapa del pipeline queda en el recorder del request, sin doble conteo anidado."""
+        with tempfile.TemporaryDirectory() as tmp:
+            source_dir = os.path.join(tmp, "source")
+            os.makedirs(source_dir)
+            rng = np.random.default_rng(1)
+            index = pd.bdate_range("2024-01-01", periods=80, name="Date")
+            for ticker in ("AAA", "BBB"):
+                close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, len(index))))
+                pd.DataFrame({"Close": close}, index=index).to_csv(os.path.join(source_dir, f"{ticker}.csv"))
+
+            with recording() as recorder:
+                loader = MarketDataLoader(["AAA", "BBB"], datetime(2024, 1, 1), datetime(2025, 1, 1),
+                                          data_dir=os.path.join(tmp, "data"), source=LocalFileDataSource(source_dir))
+                loader.ingest_data()
+                loader.transform_to_silver()
+                log_returns, last_prices = loader.load_for_simulation()
+                engine = AdaptiveMonteCarlo(StudentTStrategy(), seed=1, allow_ray=False)
+                engine.train(log_returns)
+                engine.simulate_risk(last_prices.values, horizon=10, n_sims=2000)
+
+        stages = recorder.summary()
+        self.assertEqual(list(stages), ["ingest", "transform", "load", "train", "simulate", "reduce"])
+        self.assertTrue(all(s["seconds"] >= 0 and s["peak_rss_mb"] > 0 for s in stages.values()))
+        self.assertGreaterEqual(recorder.elapsed, sum(s["seconds"] for s in stages.values()))
+
+    def test_registry_exposition_format(self):
+        registry = MetricsRegistry(buckets=(0.1, 1.0))
+        registry.observe("x_seconds", "Latencia", 0.5, stage="load")
+        registry.inc("x_total", "Conteo", endpoint='/a"b')
+        text = registry.render()
+        self.assertIn("# TYPE x_seconds histogram", text)
+        self.assertIn('x_seconds_bucket{stage="load",le="0.1"} 0', text)
+        self.assertIn('x_seconds_bucket{stage="load",le="+Inf"} 1', text)
+        self.assertIn('x_total{endpoint="/a\\"b"} 1.0', text)
+
+        with mock.patch.object(instrumentation, "REGISTRY", registry):
+            with stage("train"):
+                with stage("train"):
+                    pass
+        self.assertEqual(registry.get("riskengine_stage_seconds", stage="train")[1], 1)
+
+
+class TestMetricsEndpoint(unittest.TestCase):
+
+    def test_job_stages_are_exported(self):
+        """Las etapas medidas en el proceso del pool llegan a /metrics vía la metadata del job."""
+        with mock.patch.object(simulation, "result_cache", ResultCache(ttl=60)):
+            future = Future()
+            future.set_result({"metadata": {"execution_time": 1.5, "data_version": None,
+                                            "stages": {"ingest": {"seconds": 1.2, "peak_rss_mb": 80.0,
+                                                                  "rss_delta_mb": 2.0}}}})
+            simulation._on_job_done({"pipeline": "default"}, "key", future)
+
+            client = TestClient(app)
+            self.assertEqual(client.get("/health").status_code, 200)
+            response = client.get("/metrics")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('riskengine_stage_seconds_count{stage="ingest"}', response.text)
+        self.assertIn('riskengine_jobs_total{pipeline="default",status="completed"}', response.text)
+        self.assertIn('riskengine_http_requests_total{code="200",endpoint="/health",method="GET"}', response.text)
+        self.assertIn("riskengine_jobs_active", response.text)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+import unittest
+import time
+import os
+import sys
+from unittest import mock
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from fastapi.testclient import TestClient
+from src.api.main import app
+from src.api.routers import simulation
+from src.api.services.jobs import JobManager, JobQueueFull
+from src.api.services.result_cache import ResultCache
+from src.api.services.risk import NoMarketDataError
+
+
+def _fake_pipeline(request: dict) -> dict:
+    """Sustituto del pipeline (ejecutado en los procesos del pool)."""
+    if request["tickers"] == ["NODATA"]:
+        raise NoMarketDataError("sin datos")
+    time.sleep(request["horizon"] / 100)
+    return {
+        "status": "success",
+        "metadata": {"start_date": "2024-01-01", "end_date": "2025-01-01", "execution_time": 0.0},
+        "metrics": {"VaR 95%": {"value": -1.0, "description": "test"}},
+    }
+
+
+def _fake_batch_pipeline(request: dict) -> dict:
+    result = _fake_pipeline(request)
+    return {"status": "success", "metadata": result["metadata"],
+            "portfolios": [{"portfolio_id": pid, "metrics": result["metrics"]} for pid in request["portfolio_ids"]]}
+
+
+def _wait(job, timeout=30):
+    deadline = time.time() + timeout
+    while not job.future.done() and time.time() < deadline:
+        time.sleep(0.05)
+
+
+class TestJobApi(unittest.TestCase):
+
+    def setUp(self):
+        self.manager = JobManager(_fake_pipeline, max_workers=1, max_pending=2)
+        for name, value in (("job_manager", self.manager), ("result_cache", ResultCache(ttl=60))):
+            patcher = mock.patch.object(simulation, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(self.manager.shutdown)
+        self.client = TestClient(app)
+
+    def _request(self, tickers=("AAPL",), horizon=1):
+        return {"tickers": list(tickers), "horizon": horizon, "n_sims": 1000}
+
+    def test_submit_and_poll(self):
+        response = self.client.post("/v1/risk/jobs", json=self._request())
+        self.assertEqual(response.status_code, 202)
+        job_id = response.json()["job_id"]
+
+        _wait(self.manager.get(job_id))
+        body = self.client.get(f"/v1/risk/jobs/{job_id}").json()
+        self.assertEqual(body["status"], "completed")
+        self.assertEqual(body["result"]["metrics"]["VaR 95%"]["value"], -1.0)
+        self.assertIsNotNone(body["finished_at"])
+
+        self.assertEqual(self.client.get("/v1/risk/jobs/unknown").status_code, 404)
+
+    def test_backpressure_and_errors(self):
+        slow = [self.client.post("/v1/risk/jobs", json=self._request(horizon=h)) for h in (100, 101)]
+        self.assertTrue(all(r.status_code == 202 for r in slow))
+
+        rejected = self.client.post("/v1/risk/jobs", json=self._request())
+        self.assertEqual(rejected.status_code, 429)
+        self.assertIn("Retry-After", rejected.headers)
+        # Un request idéntico a uno en curso se une a ese job (no cuenta para la admisión)
+        joined = self.client.post("/v1/risk/jobs", json=self._request(horizon=100))
+        self.assertEqual(joined.json()["job_id"], slow[0].json()["job_id"])
+        with self.assertRaises(JobQueueFull):
+            self.manager.submit(self._request())
+
+        for r in slow:
+            _wait(self.manager.get(r.json()["job_id"]))
+
+        # Endpoint síncrono: mismo pool, errores de datos -> 400
+        self.assertEqual(self.client.post("/v1/risk/simulate", json=self._request()).status_code, 200)
+        self.assertEqual(self.client.post("/v1/risk/simulate", json=self._request(tickers=["NODATA"])).status_code, 400)
+
+        job_id = self.client.post("/v1/risk/jobs", json=self._request(tickers=["NODATA"])).json()["job_id"]
+        _wait(self.manager.get(job_id))
+        body = self.client.get(f"/v1/risk/jobs/{job_id}").json()
+        self.assertEqual(body["status"], "failed")
+        self.assertIn("NoMarketDataError", body["error"])
+
+    def test_identical_requests_coalesce_and_hit_cache(self):
+        first = self.client.post("/v1/risk/jobs", json=self._request(horizon=50)).json()["job_id"]
+        second = self.client.post("/v1/risk/jobs", json=self._request(horizon=50)).json()["job_id"]
+        self.assertEqual(first, second)
+        _wait(self.manager.get(first))
+
+        # Terminado el cálculo, el mismo payload se sirve desde caché sin tocar el pool
+        with mock.patch.object(self.manager, "submit", side_effect=AssertionError("recalculado")):
+            response = self.client.post("/v1/risk/simulate", json=self._request(horizon=50))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()["metadata"]["cached"])
+
+        # Otro payload es otra clave
+        other = self.client.post("/v1/risk/jobs", json=self._request(horizon=51)).json()["job_id"]
+        self.assertNotEqual(other, first)
+
+    def test_horizons_validation(self):
+        """'horizons' es opcional, se acota a 1..1260 días y no aplica al batch."""
+        bad = self.client.post("/v1/risk/jobs", json={**self._request(), "horizons": [0, 10]})
+        self.assertEqual(bad.status_code, 422)
+        batch = {**self._request(), "portfolios": [[1.0]], "horizons": [10]}
+        self.assertEqual(self.client.post("/v1/risk/simulate/batch", json=batch).status_code, 422)
+
+    def test_batch_endpoint(self):
+        request = {**self._request(tickers=("AAPL", "MSFT")), "portfolios": [[1, 1], [2, 0]],
+                   "portfolio_ids": ["desk-a", "desk-b"]}
+        with mock.patch.object(simulation, "run_batch_pipeline", _fake_batch_pipeline):
+            response = self.client.post("/v1/risk/simulate/batch", json=request)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([p["portfolio_id"] for p in response.json()["portfolios"]], ["desk-a", "desk-b"])
+
+        # Posiciones que no cuadran con los tickers: error de validación
+        invalid = {**request, "portfolios": [[1, 1, 1]], "portfolio_ids": None}
+        self.assertEqual(self.client.post("/v1/risk/simulate/batch", json=invalid).status_code, 422)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,492 @@
+import unittest
+import tempfile
+import warnings
+from unittest import mock
+import numpy as np
+import pandas as pd
+import os
+import sys
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.models.gbm import GeometricBrownianMotionStrategy
+from src.models.student_t import StudentTStrategy
+from src.models.monte_carlo import MonteCarloEngine
+from src.models.sampling import AntitheticSampler, ImportanceSampler, SobolSampler, brownian_bridge_schedule
+from src.models.estimators import FALLBACK_NU, fit_student_t, fit_student_t_mle
+from src.models import covariance, jit
+from src.models.online import OnlineMoments, cholesky_update
+from src.models.calibration_cache import CalibrationCache
+from src.utils.reporter import RiskReporter
+
+
+def _dummy_returns(n_days=250, n_assets=3, seed=7):
+    rng = np.random.default_rng(seed)
+    data = rng.normal(0.0005, 0.01, size=(n_days, n_assets))
+    return pd.DataFrame(data, columns=[f"A{i}" for i in range(n_assets)])
+
+
+class TestStreamingSimulation(unittest.TestCase):
+
+    def setUp(self):
+        self.returns = _dummy_returns()
+        self.prices = np.array([100.0, 50.0, 20.0])
+
+    def test_terminal_mode_shape_and_untrained_guard(self):
+        """El modo terminal retorna (n_sims, n_assets) y exige calibración previa."""
+        with self.assertRaises(ValueError):
+            GeometricBrownianMotionStrategy().simulate_streaming(self.prices, 10, 5)
+
+        for strategy in (GeometricBrownianMotionStrategy(), StudentTStrategy()):
+            strategy.train(self.returns)
+            terminal = strategy.simulate_streaming(self.prices, horizon=50, n_sims=200, block_days=7)
+            self.assertEqual(terminal.shape, (200, 3))
+            self.assertTrue(np.all(terminal > 0))
+
+    def test_streaming_matches_full_paths(self):
+        """Con la misma semilla, el modo streaming reproduce el último día del tensor completo."""
+        gbm = GeometricBrownianMotionStrategy()
+        gbm.train(self.returns)
+
+        paths = gbm.simulate(self.prices, horizon=30, n_sims=100, rng=np.random.default_rng(42))
+        portfolio = gbm.simulate_streaming(self.prices, horizon=30, n_sims=100, output="portfolio",
+                                           block_days=7, rng=np.random.default_rng(42))
+
+        np.testing.assert_allclose(portfolio, paths.sum(axis=2), rtol=1e-10)
+
+        reporter = RiskReporter(output_dir="output")
+        np.testing.assert_allclose(reporter.compute_pnl(portfolio), reporter.compute_pnl(paths))
+
+    def test_engine_terminal_mode(self):
+        engine = MonteCarloEngine(StudentTStrategy())
+        engine.train(self.returns)
+        terminal = engine.simulate(self.prices, horizon=20, n_sims=300, mode="terminal")
+        pnl = RiskReporter.compute_terminal_pnl(terminal, self.prices)
+        self.assertEqual(pnl.shape, (300,))
+
+
+class TestReproducibleStreams(unittest.TestCase):
+
+    def test_same_seed_is_bit_identical(self):
+        """Misma semilla -> mismos escenarios; el bloque de streams no depende del llamador."""
+        returns = _dummy_returns()
+        prices = np.array([100.0, 50.0, 20.0])
+        engine = MonteCarloEngine(StudentTStrategy(), seed=123)
+        engine.train(returns)
+
+        first = engine.simulate(prices, horizon=15, n_sims=2500, mode="terminal").copy()
+        second = engine.simulate(prices, horizon=15, n_sims=2500, mode="terminal")
+        np.testing.assert_array_equal(first, second)
+
+        # Los primeros 1024 escenarios pertenecen al bloque 0 sin importar el total
+        partial = engine.simulate(prices, horizon=15, n_sims=1024, mode="terminal")
+        np.testing.assert_array_equal(first[:1024], partial)
+
+        other = MonteCarloEngine(engine.strategy, seed=124).simulate(prices, horizon=15, n_sims=2500, mode="terminal")
+        self.assertFalse(np.array_equal(first, other))
+
+
+
+class TestVarianceReduction(unittest.TestCase):
+
+    def test_antithetic_pairs_cancel(self):
+        rng = np.random.default_rng(0)
+        Z = AntitheticSampler().normals(rng, 4, 7, 2)
+        self.assertEqual(Z.shape, (4, 7, 2))
+        np.testing.assert_array_equal(Z[:, 0:6:2], -Z[:, 1:6:2])
+
+    def test_brownian_bridge_produces_standard_increments(self):
+        """El puente reordena la construcción pero conserva incrementos N(0,1) independientes."""
+        self.assertEqual(sorted(step[0] for step in brownian_bridge_schedule(13)), list(range(13)))
+
+        increments = SobolSampler().normals(np.random.default_rng(1), 12, 4096, 2)
+        self.assertEqual(increments.shape, (12, 4096, 2))
+        self.assertTrue(np.allclose(increments.var(axis=1), 1.0, atol=0.1))
+        corr = np.corrcoef(increments[:, :, 0])
+        self.assertLess(np.abs(corr - np.eye(12)).max(), 0.1)
+
+    def test_control_variate_reduces_standard_error(self):
+        returns = _dummy_returns(n_assets=2)
+        prices = np.array([100.0, 50.0])
+        reporter = RiskReporter(output_dir="output")
+
+        # GBM: la variable de control coincide con el PnL -> error estándar nulo
+        gbm_engine = MonteCarloEngine(GeometricBrownianMotionStrategy(), seed=11)
+        gbm_engine.train(returns)
+        pnl = gbm_engine.simulate_pnl(prices, horizon=20, n_sims=2000, control_variate=True)
+        errors = reporter.calculate_standard_errors(pnl, control=gbm_engine.control_pnl,
+                                                    control_mean=gbm_engine.control_mean)
+        self.assertAlmostEqual(errors["SE Mean PnL (CV)"], 0.0)
+
+        # t-Student antitético: la variable de control reduce el error de la media
+        t_engine = MonteCarloEngine(StudentTStrategy(sampler=AntitheticSampler()), seed=11)
+        t_engine.train(returns)
+        pnl = t_engine.simulate_pnl(prices, horizon=20, n_sims=2000, control_variate=True)
+        errors = reporter.calculate_standard_errors(pnl, paired=True, control=t_engine.control_pnl,
+                                                    control_mean=t_engine.control_mean)
+        self.assertLess(errors["SE Mean PnL (CV)"], errors["SE Mean PnL"])
+        self.assertGreater(errors["SE VaR 95%"], 0)
+
+
+
+class TestImportanceSampling(unittest.TestCase):
+
+    def test_weighted_metrics_match_unweighted_with_unit_weights(self):
+        pnl = np.random.default_rng(2).normal(0, 0.05, size=20000)
+        reporter = RiskReporter(output_dir="output")
+        plain = reporter.calculate_metrics(pnl)
+        weighted = reporter.calculate_weighted_metrics(pnl, np.ones_like(pnl))
+        for key in ("VaR 95%", "CVaR 95%", "VaR 99%", "CVaR 99%"):
+            self.assertAlmostEqual(weighted[key], plain[key], delta=1e-3)
+        self.assertLess(weighted["CVaR 99.9%"], weighted["VaR 99.9%"])
+
+    def test_tail_estimate_is_unbiased(self):
+        """El estimador IS coincide con Monte Carlo estándar de gran tamaño."""
+        returns = _dummy_returns(n_assets=2)
+        prices = np.array([100.0, 50.0])
+        reporter = RiskReporter(output_dir="output")
+
+        strategy = GeometricBrownianMotionStrategy()
+        strategy.train(returns)
+        reference = MonteCarloEngine(strategy, seed=1).simulate_pnl(prices, horizon=10, n_sims=200000)
+        expected = reporter.calculate_metrics(reference)["CVaR 99%"]
+
+        tilted = GeometricBrownianMotionStrategy(sampler=ImportanceSampler())
+        tilted.set_params(strategy.get_params())
+        engine = MonteCarloEngine(tilted, seed=2)
+        pnl = engine.simulate_pnl(prices, horizon=10, n_sims=5000)
+        self.assertAlmostEqual(engine.weights.mean(), 1.0, delta=0.5)
+        # La mayoría de las trayectorias muestreadas caen en pérdida
+        self.assertGreater((pnl < 0).mean(), 0.8)
+
+        estimate = reporter.calculate_weighted_metrics(pnl, engine.weights)["CVaR 99%"]
+        self.assertAlmostEqual(estimate, expected, delta=0.1 * abs(expected))
+
+        # El tensor de trayectorias no lleva pesos: un sampler ponderado se rechaza
+        with self.assertRaises(ValueError):
+            engine.simulate(prices, horizon=10, n_sims=100, mode="paths")
+
+
+
+class TestBatchPortfolios(unittest.TestCase):
+
+    def test_one_simulation_many_portfolios(self):
+        """Cada columna coincide con el PnL del portafolio simulado por separado (misma semilla)."""
+        returns = _dummy_returns()
+        prices = np.array([100.0, 50.0, 20.0])
+        positions = np.array([[1.0, 1.0, 1.0], [2.0, 0.0, 5.0], [0.0, 3.0, 0.0]])
+
+        engine = MonteCarloEngine(StudentTStrategy(), seed=21)
+        engine.train(returns)
+        pnl = engine.simulate_portfolios(prices, positions, horizon=15, n_sims=2500)
+        self.assertEqual(pnl.shape, (2500, 3))
+        self.assertIsNone(engine.weights)
+
+        np.testing.assert_allclose(pnl[:, 0], engine.simulate_pnl(prices, horizon=15, n_sims=2500))
+        terminal = engine.simulate(prices, horizon=15, n_sims=2500, mode="terminal")
+        expected = (terminal @ positions[1]) / (positions[1] @ prices) - 1
+        np.testing.assert_allclose(pnl[:, 1], expected)
+
+        metrics = RiskReporter(output_dir="output").calculate_batch_metrics(pnl)
+        self.assertEqual(len(metrics), 3)
+        self.assertEqual(metrics[2], RiskReporter(output_dir="output").calculate_metrics(pnl[:, 2]))
+
+
+class TestMultiHorizon(unittest.TestCase):
+
+    def setUp(self):
+        self.returns = _dummy_returns()
+        self.prices = np.array([100.0, 50.0, 20.0])
+
+    def test_one_pass_matches_single_horizon_runs(self):
+        """Cada checkpoint reproduce la corrida de un solo horizonte (misma semilla)."""
+        engine = MonteCarloEngine(GeometricBrownianMotionStrategy(), seed=5)
+        engine.train(self.returns)
+        pnl = engine.simulate_horizons(self.prices, [30, 1, 10], n_sims=1500)
+        self.assertEqual(pnl.shape, (1500, 3))
+        for j, horizon in enumerate((30, 1, 10)):
+            np.testing.assert_allclose(pnl[:, j], engine.simulate_pnl(self.prices, horizon=horizon, n_sims=1500),
+                                       rtol=1e-12, atol=1e-14)
+
+        # Cópula t: el checkpoint menor consume el stream igual que su corrida individual
+        engine = MonteCarloEngine(StudentTStrategy(), seed=5)
+        engine.train(self.returns)
+        pnl = engine.simulate_horizons(self.prices, [5, 40], n_sims=1500)
+        np.testing.assert_allclose(pnl[:, 0], engine.simulate_pnl(self.prices, horizon=5, n_sims=1500),
+                                   rtol=1e-12, atol=1e-14)
+        self.assertGreater(pnl[:, 1].std(), pnl[:, 0].std())
+
+    def test_checkpoints_across_samplers_and_backends(self):
+        """Sobol (bloque único) y el kernel fusionado evalúan los mismos checkpoints que NumPy."""
+        sobol = StudentTStrategy(sampler=SobolSampler())
+        sobol.train(self.returns)
+        values = sobol.simulate_streaming(self.prices, 12, 64, output="checkpoints", checkpoints=[3, 12],
+                                          rng=np.random.default_rng(2))
+        paths = sobol.simulate(self.prices, 12, 64, rng=np.random.default_rng(2))
+        np.testing.assert_allclose(values, paths[:, [2, 11]].sum(axis=2), rtol=1e-10)
+
+        strategy = StudentTStrategy()
+        strategy.train(self.returns)
+        runs = []
+        for backend in ("numpy", "numba"):
+            strategy.backend = backend
+            runs.append(strategy.simulate_streaming(self.prices, 12, 30, output="checkpoints",
+                                                    checkpoints=[2, 7, 12], block_days=5,
+                                                    rng=np.random.default_rng(4)))
+        np.testing.assert_allclose(runs[1], runs[0], rtol=1e-12)
+        with self.assertRaises(ValueError):
+            strategy.simulate_streaming(self.prices, 12, 30, output="checkpoints", checkpoints=[13])
+
+    def test_reporter_horizon_grid(self):
+        engine = MonteCarloEngine(StudentTStrategy(sampler=ImportanceSampler()), seed=9)
+        engine.train(self.returns)
+        pnl = engine.simulate_horizons(self.prices, [1, 10, 21], n_sims=2000)
+        reporter = RiskReporter(output_dir="output")
+        grid = reporter.calculate_horizon_metrics(pnl, [1, 10, 21], weights=engine.weights)
+        self.assertEqual(list(grid), [1, 10, 21])
+        self.assertEqual(grid[10], reporter.calculate_weighted_metrics(pnl[:, 1], engine.weights))
+        self.assertIn("VaR 99.9%", grid[1])
+        # El riesgo crece con el horizonte
+        self.assertLess(grid[21]["VaR 99%"], grid[1]["VaR 99%"])
+
+
+class TestStudentTEstimators(unittest.TestCase):
+
+    def test_fast_estimator_matches_scipy_mle(self):
+        """El ECME vectorizado converge al mismo nu que scipy.stats.t.fit."""
+        rng = np.random.default_rng(11)
+        X = rng.standard_t([3.0, 5.0, 12.0], size=(800, 3)) * 0.01
+        _, _, nu = fit_student_t(X)
+        reference = fit_student_t_mle(X)
+        np.testing.assert_allclose(nu, reference, rtol=1e-2)
+
+    def test_degenerate_column_falls_back(self):
+        """Columnas constantes no rompen la calibración del universo."""
+        rng = np.random.default_rng(12)
+        df = pd.DataFrame({"A": rng.standard_t(4, size=300) * 0.01, "B": np.zeros(300)})
+        with warnings.catch_warnings():
+            warnings.simplefilter("error", RuntimeWarning)
+            self.assertTrue(np.isnan(fit_student_t(df.values)[2][1]))
+
+        # Solo la columna fallida pasa al MLE exacto; la constante FALLBACK_NU es el último recurso
+        strategy = StudentTStrategy()
+        with mock.patch("src.models.student_t.fit_student_t_mle", wraps=fit_student_t_mle) as mle:
+            strategy.train(df)
+        self.assertEqual(mle.call_count, 1)
+        np.testing.assert_array_equal(mle.call_args[0][0], df[["B"]].values)
+        self.assertTrue(StudentTStrategy.NU_BOUNDS[0] <= strategy.nu <= StudentTStrategy.NU_BOUNDS[1])
+
+        with mock.patch("src.models.student_t.fit_student_t_mle", return_value=np.array([np.nan])):
+            nus = StudentTStrategy()._fit_nu_batch(df)
+        self.assertEqual(nus[1], FALLBACK_NU)
+        np.testing.assert_allclose(nus[0], fit_student_t(df[["A"]].values)[2][0], rtol=1e-3)
+
+        with self.assertRaises(ValueError):
+            StudentTStrategy(nu_method="moments")
+
+
+class TestFusedKernel(unittest.TestCase):
+
+    def setUp(self):
+        self.returns = _dummy_returns()
+        self.prices = np.array([100.0, 50.0, 20.0])
+
+    def test_kernel_matches_reference_composition(self):
+        """simulate() reproduce exactamente shocks + drift -> cumsum -> exp del mismo stream."""
+        for strategy in (GeometricBrownianMotionStrategy(), StudentTStrategy()):
+            strategy.train(self.returns)
+            np.testing.assert_allclose(strategy.drift, strategy.mu - 0.5 * np.diag(strategy.chol_matrix @ strategy.chol_matrix.T))
+
+            paths = strategy.simulate(self.prices, horizon=25, n_sims=40, rng=np.random.default_rng(3))
+            shocks = strategy._sample_shocks(25, 40, np.random.default_rng(3))
+            reference = self.prices * np.exp(np.cumsum(shocks + strategy._daily_drift(), axis=0))
+            np.testing.assert_array_equal(paths, reference.transpose(1, 0, 2))
+            self.assertTrue(paths.flags["C_CONTIGUOUS"])
+
+            # Los derivados viajan con set_params (workers remotos)
+            blank = strategy.without_params()
+            self.assertIsNone(blank.drift)
+            np.testing.assert_array_equal(blank.set_params(strategy.get_params()).drift, strategy.drift)
+
+    def test_float32_precision(self):
+        full = StudentTStrategy()
+        single = StudentTStrategy(dtype=np.float32)
+        for strategy in (full, single):
+            strategy.train(self.returns)
+        reference = full.simulate(self.prices, horizon=60, n_sims=200, rng=np.random.default_rng(9))
+        paths = single.simulate(self.prices, horizon=60, n_sims=200, rng=np.random.default_rng(9))
+        self.assertEqual(paths.dtype, np.float32)
+        np.testing.assert_allclose(paths, reference, rtol=1e-4)
+
+
+class TestJitBackend(unittest.TestCase):
+
+    def test_backend_selection(self):
+        expected = "numba" if jit.NUMBA_AVAILABLE else "numpy"
+        self.assertEqual(StudentTStrategy(backend="numba").backend, expected)
+        self.assertEqual(GeometricBrownianMotionStrategy().backend, "numpy")
+        with self.assertRaises(ValueError):
+            GeometricBrownianMotionStrategy(backend="cuda")
+
+    def test_fused_kernel_matches_numpy_reference(self):
+        """El loop fusionado (compilado o, sin Numba, en Python puro) reproduce el backend NumPy."""
+        returns = _dummy_returns(n_assets=4)
+        prices = np.array([100.0, 50.0, 20.0, 5.0])
+        units = np.array([1.0, 2.0, 0.5, 3.0])
+        for strategy in (StudentTStrategy(sampler=AntitheticSampler()), GeometricBrownianMotionStrategy(),
+                         StudentTStrategy(covariance="factor", n_factors=2)):
+            strategy.train(returns)
+            for output in ("terminal", "portfolio"):
+                strategy.backend = "numpy"
+                reference = strategy.simulate_streaming(prices, horizon=12, n_sims=30, output=output, weights=units,
+                                                        block_days=5, rng=np.random.default_rng(4))
+                strategy.backend = "numba"
+                fused = strategy.simulate_streaming(prices, horizon=12, n_sims=30, output=output, weights=units,
+                                                    block_days=5, rng=np.random.default_rng(4))
+                np.testing.assert_allclose(fused, reference, rtol=1e-12)
+
+
+class TestFactorCovariance(unittest.TestCase):
+
+    def _factor_returns(self, n_days=120, n_assets=40, seed=11):
+        """Retornos con 3 factores comunes + ruido propio (más activos que la mitad de la ventana)."""
+        rng = np.random.default_rng(seed)
+        factors = rng.standard_normal((n_days, 3)) * 0.01
+        data = factors @ rng.standard_normal((3, n_assets)) + rng.standard_normal((n_days, n_assets)) * 0.005
+        return pd.DataFrame(data, columns=[f"A{i}" for i in range(n_assets)])
+
+    def test_ledoit_wolf_matches_definition(self):
+        X = self._factor_returns(n_days=40, n_assets=12).values
+        Xc = X - X.mean(axis=0)
+        S = np.cov(X, rowvar=False)
+        mu = np.trace(S) / len(S)
+        d_sq = ((S - mu * np.eye(len(S))) ** 2).sum()
+        b_sq = sum(((np.outer(x, x) - S) ** 2).sum() for x in Xc) / len(X) ** 2
+        self.assertAlmostEqual(covariance.ledoit_wolf_intensity(X), min(b_sq, d_sq) / d_sq, places=12)
+
+        shrunk = covariance.sample_covariance(X, shrinkage=True)
+        np.testing.assert_allclose(np.trace(shrunk), np.trace(S))
+
+    def test_factor_model_is_well_conditioned_with_short_history(self):
+        """Con más activos que días la covarianza muestral es singular; el modelo de factores no."""
+        returns = self._factor_returns(n_days=30, n_assets=80)
+        loadings, idio_var = covariance.factor_model(returns.values, n_factors=3)
+        self.assertEqual(loadings.shape, (80, 3))
+        np.testing.assert_allclose(np.einsum('ij,ij->i', loadings, loadings) + idio_var,
+                                   returns.var().values, rtol=1e-10)
+        sigma = loadings @ loadings.T + np.diag(idio_var)
+        self.assertGreater(np.linalg.eigvalsh(sigma).min(), 0)
+
+        for shrinkage in (False, True):
+            strategy = StudentTStrategy(covariance="factor", n_factors=3, shrinkage=shrinkage)
+            strategy.train(returns)
+            self.assertEqual(strategy.n_shocks, 3 + 80)
+            terminal = strategy.simulate_streaming(np.full(80, 10.0), horizon=5, n_sims=200,
+                                                   rng=np.random.default_rng(0))
+            self.assertTrue(np.isfinite(terminal).all())
+
+    def test_factor_shocks_reproduce_covariance(self):
+        strategy = GeometricBrownianMotionStrategy(covariance="factor", n_factors=3)
+        strategy.train(self._factor_returns())
+        Z = np.random.default_rng(5).standard_normal((1, 100000, strategy.n_shocks))
+        shocks = strategy._correlate(Z)[0]
+
+        target = strategy.chol_matrix @ strategy.chol_matrix.T + np.diag(strategy.idio_vol ** 2)
+        np.testing.assert_allclose(np.cov(shocks, rowvar=False), target, atol=0.02 * np.abs(target).max())
+        np.testing.assert_allclose(strategy.sigma_sq, np.diag(target))
+        # Muestreo por importancia: A^T e en el layout [factores | idiosincráticos]
+        exposure = np.linspace(1, 2, strategy.n_assets)
+        np.testing.assert_allclose(strategy.shock_exposure(exposure) @ strategy.shock_exposure(exposure),
+                                   exposure @ target @ exposure)
+
+    def test_factor_paths_match_streaming_and_cache_roundtrip(self):
+        returns = self._factor_returns(n_assets=6)
+        prices = np.full(6, 50.0)
+        strategy = StudentTStrategy(covariance="factor", n_factors=2)
+        strategy.train(returns)
+        paths = strategy.simulate(prices, horizon=8, n_sims=64, rng=np.random.default_rng(2))
+        terminal = strategy.simulate_streaming(prices, horizon=8, n_sims=64, block_days=8,
+                                               rng=np.random.default_rng(2))
+        np.testing.assert_allclose(paths[:, -1], terminal)
+
+        restored = StudentTStrategy(covariance="factor").set_params(strategy.get_params())
+        np.testing.assert_array_equal(restored.idio_vol, strategy.idio_vol)
+        with self.assertRaises(ValueError):
+            GeometricBrownianMotionStrategy(covariance="pca").train(returns)
+
+
+class TestOnlineCalibration(unittest.TestCase):
+
+    def setUp(self):
+        self.returns = _dummy_returns(n_days=300, n_assets=4)
+
+    def test_rank_one_update_and_downdate(self):
+        rng = np.random.default_rng(1)
+        A = rng.normal(size=(6, 6))
+        cov = A @ A.T + np.eye(6)
+        L = np.linalg.cholesky(cov)
+        x = rng.normal(size=6) * 0.5
+        np.testing.assert_allclose(cholesky_update(L, x), np.linalg.cholesky(cov + np.outer(x, x)), atol=1e-12)
+        np.testing.assert_allclose(cholesky_update(L, x, downdate=True),
+                                   np.linalg.cholesky(cov - np.outer(x, x)), atol=1e-12)
+        np.testing.assert_array_equal(L, np.linalg.cholesky(cov))  # la entrada no se modifica
+        with self.assertRaises(np.linalg.LinAlgError):
+            cholesky_update(L, 10 * x, downdate=True)
+
+    def test_rolling_window_matches_full_recalibration(self):
+        """train(ventana) + update(días nuevos) = train(ventana desplazada)."""
+        window, new_days = self.returns.iloc[:250], self.returns.iloc[250:]
+        rolled = self.returns.iloc[50:]
+        for strategy, reference in ((GeometricBrownianMotionStrategy(), GeometricBrownianMotionStrategy()),
+                                    (GeometricBrownianMotionStrategy(covariance="factor", n_factors=2),
+                                     GeometricBrownianMotionStrategy(covariance="factor", n_factors=2))):
+            strategy.train(window)
+            strategy.update(new_days.iloc[:1]).update(new_days.iloc[1:].values)
+            reference.train(rolled.reset_index(drop=True))
+            np.testing.assert_allclose(strategy.mu, reference.mu, atol=1e-15)
+            np.testing.assert_allclose(strategy.chol_matrix @ strategy.chol_matrix.T,
+                                       reference.chol_matrix @ reference.chol_matrix.T, atol=1e-15)
+            np.testing.assert_allclose(strategy.drift, reference.drift, atol=1e-15)
+
+        with self.assertRaises(ValueError):
+            strategy.update(np.zeros((1, 3)))
+
+    def test_cached_params_are_not_mutated(self):
+        """StudentT desde caché: update() reemplaza los arrays compartidos y conserva nu."""
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = CalibrationCache(cache_dir=tmp)
+            StudentTStrategy(cache=cache).train(self.returns.iloc[:250])
+            strategy = StudentTStrategy(cache=cache)
+            strategy.train(self.returns.iloc[:250])
+            shared = {name: np.copy(value) for name, value in strategy.get_params().items()}
+            cached_chol = strategy.chol_matrix
+            strategy.update(self.returns.iloc[250:])
+            np.testing.assert_array_equal(cached_chol, shared["chol_matrix"])
+            self.assertFalse(np.allclose(strategy.chol_matrix, shared["chol_matrix"]))
+            self.assertEqual(strategy.nu, shared["nu"])
+
+            blank = strategy.without_params().set_params(strategy.get_params())
+            with self.assertRaises(ValueError):
+                blank.update(self.returns.iloc[250:])
+
+    def test_ewma_updates_match_batch_estimate(self):
+        X = self.returns.to_numpy()
+        batch = OnlineMoments.from_returns(X, halflife=30)
+        streamed = OnlineMoments(4, halflife=30)
+        for x in X:
+            streamed.update(x)
+        np.testing.assert_allclose(streamed.mean, batch.mean, atol=1e-15)
+        np.testing.assert_allclose(streamed.cov, batch.cov, atol=1e-15)
+
+        strategy = StudentTStrategy(halflife=30)
+        strategy.train(self.returns.iloc[:250])
+        strategy.update(self.returns.iloc[250:])
+        np.testing.assert_allclose(strategy.mu, batch.mean, atol=1e-15)
+        np.testing.assert_allclose(strategy.chol_matrix, np.linalg.cholesky(batch.cov), atol=1e-12)
+        with self.assertRaises(ValueError):
+            GeometricBrownianMotionStrategy(covariance="factor", halflife=30).train(self.returns)
+
+
+if __name__ == '__main__':
+    unittest.main()
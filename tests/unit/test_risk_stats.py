@@ -0,0 +1,61 @@
+import unittest
+import numpy as np
+import os
+import sys
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.utils.risk_stats import TailBuffer, format_metrics, tail_metrics
+
+
+class TestRiskStats(unittest.TestCase):
+
+    def setUp(self):
+        self.pnl = np.random.default_rng(0).standard_t(4, size=10001) * 0.02
+
+    def test_single_pass_matches_percentile_and_mask(self):
+        """Una partición reproduce np.percentile + máscara booleana en todos los niveles."""
+        results = tail_metrics(self.pnl, (0.9, 0.95, 0.99))
+        for confidence, stats in results.items():
+            var_value = np.percentile(self.pnl, (1 - confidence) * 100)
+            self.assertAlmostEqual(stats["var"], var_value, places=12)
+            self.assertAlmostEqual(stats["cvar"], self.pnl[self.pnl <= var_value].mean(), places=12)
+            self.assertGreater(stats["tail_std"], 0)
+        self.assertEqual(list(format_metrics(results))[:2], ["VaR 90%", "CVaR 90%"])
+
+        # Etiquetas enteras (int(c*100)); 99.9% no colapsa sobre 99%
+        labels = format_metrics(tail_metrics(self.pnl, (0.975, 0.99, 0.999)))
+        self.assertEqual(list(labels)[::2], ["VaR 97%", "VaR 99%", "VaR 99.9%"])
+
+    def test_unit_weights_agree_with_unweighted(self):
+        plain = tail_metrics(self.pnl, (0.99,))[0.99]
+        weighted = tail_metrics(self.pnl, (0.99,), weights=np.ones_like(self.pnl))[0.99]
+        self.assertAlmostEqual(weighted["var"], plain["var"], delta=1e-3)
+        self.assertAlmostEqual(weighted["cvar"], plain["cvar"], delta=1e-3)
+
+    def test_tail_buffers_merge_exactly(self):
+        """Parciales por worker combinados == métricas sobre todos los escenarios."""
+        n = len(self.pnl)
+        weights = np.random.default_rng(1).uniform(0.5, 1.5, size=n)
+        expected = tail_metrics(self.pnl, (0.95, 0.99))
+        expected_w = tail_metrics(self.pnl, (0.95, 0.99), weights=weights)
+
+        merged = TailBuffer(0.05, n)
+        merged_w = TailBuffer(0.05, n, weighted=True)
+        for chunk in np.array_split(np.arange(n), 7):
+            merged.merge(TailBuffer(0.05, n).update(self.pnl[chunk]))
+            merged_w.merge(TailBuffer(0.05, n, weighted=True).update(self.pnl[chunk], weights[chunk]))
+
+        self.assertLess(len(merged.values), n // 10)
+        for confidence in (0.95, 0.99):
+            for key in ("var", "cvar", "tail_std"):
+                self.assertAlmostEqual(merged.metrics()[confidence][key], expected[confidence][key], places=12)
+                self.assertAlmostEqual(merged_w.metrics()[confidence][key], expected_w[confidence][key], places=12)
+
+        with self.assertRaises(ValueError):
+            merged.metrics((0.9,))
+
+
+if __name__ == '__main__':
+    unittest.main()
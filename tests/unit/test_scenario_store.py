@@ -0,0 +1,101 @@
+import unittest
+import os
+import sys
+import tempfile
+from unittest import mock
+import numpy as np
+import pandas as pd
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.data.scenario_store import ScenarioStore
+from src.models.gbm import GeometricBrownianMotionStrategy
+from src.models.student_t import StudentTStrategy
+from src.models.monte_carlo import MonteCarloEngine
+from src.models.sampling import ImportanceSampler
+from src.utils.reporter import RiskReporter
+
+
+def _dummy_returns(n_days=250, n_assets=3, seed=7):
+    rng = np.random.default_rng(seed)
+    data = rng.normal(0.0005, 0.01, size=(n_days, n_assets))
+    return pd.DataFrame(data, columns=[f"A{i}" for i in range(n_assets)])
+
+
+class TestScenarioStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.store = ScenarioStore(os.path.join(self.tmp.name, "scenarios"))
+        self.reporter = RiskReporter(output_dir=os.path.join(self.tmp.name, "output"),
+                                     gold_dir=os.path.join(self.tmp.name, "gold"))
+        self.returns = _dummy_returns()
+        self.prices = np.array([100.0, 50.0, 20.0])
+
+    def test_what_if_is_a_read(self):
+        """Portafolios nuevos sobre el set persistido = simulación batch con la misma semilla."""
+        engine = MonteCarloEngine(StudentTStrategy(), seed=4)
+        engine.train(self.returns)
+        scenarios = engine.simulate_to_store(self.store, self.prices, horizon=20, n_sims=2500)
+        self.assertEqual(len(scenarios), 3)
+        first, _ = next(scenarios.iter_chunks())
+        self.assertIsInstance(first, np.memmap)
+
+        positions = np.array([[1.0, 1.0, 1.0], [2.0, 0.0, 5.0]])
+        expected = self.reporter.calculate_batch_metrics(
+            engine.simulate_portfolios(self.prices, positions, horizon=20, n_sims=2500))
+        self.assertEqual(self.reporter.evaluate_scenarios(scenarios, positions), expected)
+
+        # Misma clave (parámetros + semilla + job): se lee, no se re-simula
+        with mock.patch.object(engine.strategy, "simulate_streaming", side_effect=AssertionError("re-simulación")):
+            again = engine.simulate_to_store(self.store, self.prices, horizon=20, n_sims=2500)
+        self.assertEqual(again.key, scenarios.key)
+        self.assertEqual(self.store.keys(), [scenarios.key])
+
+    def test_compressed_paths_and_weighted_sets(self):
+        store = ScenarioStore(os.path.join(self.tmp.name, "compressed"), compress=True)
+        engine = MonteCarloEngine(GeometricBrownianMotionStrategy(), seed=8)
+        engine.train(self.returns)
+        scenarios = engine.simulate_to_store(store, self.prices, horizon=6, n_sims=1500, mode="paths")
+        np.testing.assert_array_equal(scenarios.load(),
+                                      engine.simulate(self.prices, horizon=6, n_sims=1500, mode="paths"))
+
+        # Muestreo por importancia: los likelihood ratios viajan con cada chunk
+        engine = MonteCarloEngine(StudentTStrategy(sampler=ImportanceSampler()), seed=8)
+        engine.train(self.returns)
+        weighted = engine.simulate_to_store(store, self.prices, horizon=10, n_sims=1500)
+        self.assertTrue(weighted.weighted)
+        pnl = engine.simulate_pnl(self.prices, horizon=10, n_sims=1500)
+        log_weights = np.concatenate([lw for _, lw in weighted.iter_chunks()])
+        np.testing.assert_allclose(np.exp(log_weights), engine.weights)
+        self.assertEqual(self.reporter.evaluate_scenarios(weighted)[0],
+                         self.reporter.calculate_weighted_metrics(pnl, engine.weights))
+
+        with self.assertRaises(ValueError):
+            engine.simulate_to_store(store, self.prices, horizon=10, n_sims=1500, mode="paths")
+
+        # Otra inclinación = otros escenarios y pesos: no reutiliza el set anterior
+        engine.strategy.sampler = ImportanceSampler(shift=3.0)
+        tilted = engine.simulate_to_store(store, self.prices, horizon=10, n_sims=1500)
+        self.assertNotEqual(tilted.key, weighted.key)
+        engine.simulate_pnl(self.prices, horizon=10, n_sims=1500)
+        np.testing.assert_allclose(np.exp(np.concatenate([lw for _, lw in tilted.iter_chunks()])), engine.weights)
+
+    def test_failed_write_is_not_published(self):
+        with self.assertRaises(RuntimeError):
+            with self.store.writer("k", "terminal", self.prices, horizon=5, n_sims=10) as write:
+                write(0, np.ones((5, 3)))
+                raise RuntimeError("worker caído")
+        with self.assertRaises(ValueError):
+            with self.store.writer("k", "terminal", self.prices, horizon=5, n_sims=10) as write:
+                write(0, np.ones((5, 3)))
+        self.assertEqual(self.store.keys(), [])
+        self.assertEqual(os.listdir(self.store.root_dir), [])
+        with self.assertRaises(KeyError):
+            self.store.open("k")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import unittest
+import numpy as np
+import pandas as pd
+import os
+import sys
+from unittest import mock
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.config.settings import settings
+from src.models import scheduler
+from src.models.scheduler import AdaptiveMonteCarlo, tune_block_days
+from src.models.monte_carlo import MonteCarloEngine
+from src.models.student_t import StudentTStrategy
+from src.utils.risk_stats import format_metrics, tail_metrics
+
+
+def _returns(n_assets=3, seed=5):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(rng.standard_t(5, size=(300, n_assets)) * 0.01,
+                        columns=[f"A{i}" for i in range(n_assets)])
+
+
+class TestAdaptiveScheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.prices = np.array([100.0, 50.0, 20.0])
+        self.engine = AdaptiveMonteCarlo(StudentTStrategy(), seed=21, max_threads=4, allow_ray=False)
+        self.engine.train(_returns())
+
+    def test_plan_by_cost_and_memory(self):
+        """Jobs chicos en proceso, grandes en threads; la memoria acota los workers."""
+        small = self.engine.plan(horizon=10, n_sims=500)
+        self.assertEqual(small["backend"], "local")
+
+        with mock.patch.object(settings, "SCHEDULER_LOCAL_MAX_COST", 1e3):
+            large = self.engine.plan(horizon=50, n_sims=10_000)
+            self.assertEqual((large["backend"], large["workers"]), ("threads", 4))
+            self.assertEqual(large["block_days"], tune_block_days(3))
+            # Planificar no tiene efectos sobre el engine ni la estrategia
+            self.assertIsNone(self.engine.block_days)
+            self.assertEqual(self.engine.strategy.STREAM_BLOCK_DAYS, StudentTStrategy.STREAM_BLOCK_DAYS)
+
+            # Ray no permitido (workers de la API) o no aplicable: nunca se elige
+            with mock.patch.object(settings, "SCHEDULER_RAY_MIN_COST", 1e3):
+                self.assertEqual(self.engine.plan(50, 10_000)["backend"], "threads")
+
+            # Memoria para un solo working set: sin paralelismo
+            with mock.patch.object(scheduler, "available_memory", return_value=large["working_set"]):
+                self.assertEqual(self.engine.plan(50, 10_000)["backend"], "local")
+
+    def test_update_republishes_to_ray_pool(self):
+        """engine.update() recalibra la estrategia y publica la nueva versión al pool de Ray."""
+        distributed = mock.Mock()
+        self.engine._distributed = distributed
+        mu = self.engine.strategy.mu
+        self.engine.update(_returns(seed=6).iloc[:2])
+        self.assertFalse(np.array_equal(self.engine.strategy.mu, mu))
+        distributed._broadcast_params.assert_called_once_with()
+        self.engine._distributed = None
+
+    def test_block_days_fit_cache_budget(self):
+        self.assertEqual(tune_block_days(4, cache_bytes=2 * 1024 ** 2), 21)
+        self.assertEqual(tune_block_days(500, cache_bytes=2 * 1024 ** 2), 1)
+
+    def test_backend_does_not_change_results(self):
+        """Threads y proceso único consumen los mismos streams por bloque: resultado idéntico."""
+        with mock.patch.object(settings, "SCHEDULER_LOCAL_MAX_COST", 1e3):
+            threaded = self.engine.simulate_pnl(self.prices, horizon=30, n_sims=5000)
+            self.assertEqual(self.engine.last_plan["backend"], "threads")
+            metrics = self.engine.simulate_risk(self.prices, horizon=30, n_sims=5000)
+
+        self.assertEqual(self.engine.strategy.STREAM_BLOCK_DAYS, StudentTStrategy.STREAM_BLOCK_DAYS)
+
+        # Referencia independiente: estrategia nueva entrenada con los mismos datos
+        fresh = StudentTStrategy()
+        fresh.train(_returns())
+        local = MonteCarloEngine(fresh, seed=21, block_days=tune_block_days(3))
+        reference = local.simulate_pnl(self.prices, horizon=30, n_sims=5000)
+        np.testing.assert_array_equal(threaded, reference)
+        self.assertEqual(metrics, format_metrics(tail_metrics(reference)))
+
+
+if __name__ == '__main__':
+    unittest.main()
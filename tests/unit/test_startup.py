@@ -0,0 +1,192 @@
+import unittest
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from unittest import mock
+import numpy as np
+import pandas as pd
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from fastapi.testclient import TestClient
+from src.api.main import app
+from src.api.routers import simulation
+from src.api.services import risk
+from src.api.schemas.risk import RiskRequest
+from src.config.settings import settings
+from src.api.services.jobs import JobManager
+from src.models.calibration_cache import CalibrationCache
+from src.models.scheduler import AdaptiveMonteCarlo
+from src.models.student_t import StudentTStrategy
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+# Presupuesto de import del servidor (fastapi + pydantic ya rondan 0.5s en frío)
+IMPORT_BUDGET_SECONDS = 1.5
+HEAVY_MODULES = ("pandas", "scipy", "yfinance", "ray", "numba", "pyarrow")
+
+
+def _touch(path: str):
+    """Initializer de prueba (ejecutado en cada proceso del pool)."""
+    with open(os.path.join(path, str(os.getpid())), "w"):
+        pass
+
+
+class TestDailyRefresh(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        for name, value in (("_calibration_cache", CalibrationCache(cache_dir=self.tmp.name)),
+                            ("_live_engines", OrderedDict())):
+            patcher = mock.patch.object(risk, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        rng = np.random.default_rng(8)
+        self.returns = pd.DataFrame(rng.standard_t(5, size=(302, 2)) * 0.01, columns=["AAA", "BBB"],
+                                    index=pd.bdate_range("2023-01-02", periods=302))
+        self.prices = pd.Series([100.0, 50.0], index=["AAA", "BBB"])
+
+    def _run(self, window, seed=1):
+        """Pipeline real de la API sobre una ventana de Plata simulada."""
+        loader = mock.Mock()
+        loader.returns_store.version = f"{len(window)}-test"
+        with mock.patch.object(risk, "_market_data", return_value=(loader, window, self.prices, window.index[0],
+                                                                   window.index[-1])):
+            return risk.run_risk_pipeline(RiskRequest(tickers=["AAA", "BBB"], horizon=10, n_sims=1000,
+                                                      seed=seed).model_dump())
+
+    def test_next_day_request_updates_instead_of_retraining(self):
+        self._run(self.returns.iloc[:300])
+        (engine, _, _), = risk._live_engines.values()
+
+        # Día siguiente: la ventana se desplaza un día; solo ese día entra por engine.update()
+        today = self.returns.iloc[1:301]
+        with mock.patch.object(AdaptiveMonteCarlo, "train", side_effect=AssertionError("recalibración completa")), \
+                mock.patch.object(engine, "update", wraps=engine.update) as update:
+            response = self._run(today, seed=2)
+        self.assertEqual(response["status"], "success")
+        update.assert_called_once()
+        pd.testing.assert_frame_equal(update.call_args[0][0], today.iloc[-1:])
+        self.assertEqual(engine.seed, 2)
+
+        # Otro proceso (sin engine vivo) calibra la misma ventana desde cero: mismo nu y
+        # mismos escenarios salvo el redondeo de los rank-one (rtol 1e-9 sobre el PnL)
+        risk._live_engines.clear()
+        fresh_response = self._run(today, seed=2)
+        (fresh, _, _), = risk._live_engines.values()
+        self.assertIsNot(fresh, engine)
+        self.assertAlmostEqual(engine.strategy.nu, fresh.strategy.nu, places=12)
+        np.testing.assert_allclose(engine.strategy.chol_matrix, fresh.strategy.chol_matrix, rtol=1e-9)
+        np.testing.assert_allclose(engine.simulate_pnl(self.prices.values, horizon=10, n_sims=2000),
+                                   fresh.simulate_pnl(self.prices.values, horizon=10, n_sims=2000), rtol=1e-9)
+        self.assertEqual(response["metrics"], fresh_response["metrics"])
+
+        # Historial revisado (no es un desplazamiento): calibración completa
+        revised = today.copy()
+        revised.iloc[0, 0] += 0.01
+        with mock.patch.object(AdaptiveMonteCarlo, "update", side_effect=AssertionError("update sobre otra historia")):
+            self._run(revised)
+        (retrained, _, _), = risk._live_engines.values()
+        self.assertIsNot(retrained, fresh)
+
+    def test_calibration_window_follows_settings(self):
+        """La API calibra sobre la misma ventana que main.py (settings.YEARS_BACK)."""
+        with mock.patch.object(settings, "YEARS_BACK", 3), \
+                mock.patch("src.data.loader.MarketDataLoader") as loader_cls:
+            loader_cls.return_value.load_for_simulation.return_value = (None, None)
+            _, _, _, start_date, end_date = risk._market_data(["AAA"], ingest=False)
+        self.assertEqual(end_date - start_date, timedelta(days=3 * 365))
+        self.assertEqual(loader_cls.call_args[0][1:], (start_date, end_date))
+
+    def test_full_retrain_after_max_updates(self):
+        with mock.patch.object(settings, "API_MAX_INCREMENTAL_UPDATES", 1):
+            self._run(self.returns.iloc[:300])
+            self._run(self.returns.iloc[1:301])
+            (engine, _, updates), = risk._live_engines.values()
+            self.assertEqual(updates, 1)
+
+            with mock.patch.object(AdaptiveMonteCarlo, "update", side_effect=AssertionError("sin tope")):
+                self._run(self.returns.iloc[2:302])
+            (retrained, _, updates), = risk._live_engines.values()
+        self.assertIsNot(retrained, engine)
+        self.assertEqual(updates, 0)
+
+
+class TestImportBudget(unittest.TestCase):
+
+    def test_api_import_is_light(self):
+        """Importar la API (cada worker de uvicorn) no carga el núcleo de cálculo."""
+        script = ("import sys, time; start = time.perf_counter(); import src.api.main; "
+                  "print(time.perf_counter() - start, "
+                  f"','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules), sep='|')")
+        result = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True,
+                                cwd=REPO_ROOT, env={**os.environ, "PYTHONPATH": REPO_ROOT}, timeout=60)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        seconds, loaded = result.stdout.strip().splitlines()[-1].split("|")
+        self.assertEqual(loaded, "", f"Módulos pesados importados al arrancar: {loaded}")
+        self.assertLess(float(seconds), IMPORT_BUDGET_SECONDS)
+
+
+class TestWarmup(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        patcher = mock.patch.object(risk, "_calibration_cache", CalibrationCache(cache_dir=self.tmp.name))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_preload_fills_process_registry(self):
+        rng = np.random.default_rng(3)
+        returns = pd.DataFrame(rng.standard_t(5, size=(300, 2)) * 0.01, columns=["AAA", "BBB"],
+                               index=pd.bdate_range("2023-01-02", periods=300))
+
+        def market_data(tickers, ingest=True):
+            if tickers == ["NODATA"]:
+                raise ConnectionError("sin red")
+            return None, returns[tickers], None, None, None
+
+        with mock.patch.object(risk, "_market_data", side_effect=market_data):
+            warmed = risk.preload_hot_universes([["AAA", "BBB"], ["NODATA"]])
+        self.assertEqual(warmed, [["AAA", "BBB"]])
+
+        # El primer request del universo caliente sale del registro en memoria (sin MLE)
+        with mock.patch.object(StudentTStrategy, "_fit_nus", side_effect=AssertionError("calibración en frío")):
+            strategy = StudentTStrategy(cache=risk.get_calibration_cache())
+            strategy.train(returns)
+        self.assertIsNotNone(strategy.chol_matrix)
+
+    def test_pool_initializer_runs_on_start(self):
+        manager = JobManager(_touch, max_workers=2, initializer=_touch, initargs=(self.tmp.name,))
+        self.addCleanup(manager.shutdown)
+        manager.start()
+        deadline = time.time() + 30
+        while len([f for f in os.listdir(self.tmp.name) if f.isdigit()]) < 2 and time.time() < deadline:
+            time.sleep(0.05)
+        self.assertEqual(len([f for f in os.listdir(self.tmp.name) if f.isdigit()]), 2)
+
+    def test_lifespan_warms_up_in_background(self):
+        """/health responde aunque el warmup siga en curso."""
+        started, release = threading.Event(), threading.Event()
+
+        def slow_warm_up():
+            started.set()
+            release.wait(10)
+
+        with mock.patch.object(simulation, "warm_up", slow_warm_up), \
+                mock.patch.object(simulation, "job_manager", JobManager(_touch)):
+            with TestClient(app) as client:
+                self.assertTrue(started.wait(10))
+                self.assertEqual(client.get("/health").status_code, 200)
+                release.set()
+
+
+if __name__ == '__main__':
+    unittest.main()